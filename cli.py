@@ -1,8 +1,10 @@
 import asyncio
 import argparse
 import logging
+import signal
 import sys
 from src.services.processing_service import SocialMediaProcessor
+from src.scraper.core.urls import PLATFORM_HOSTS, detect_platform
 
 # Ensure terminal encoding handles emojis/UTF-8
 if sys.stdout.encoding.lower() != 'utf-8':
@@ -21,6 +23,36 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+def parse_platform_limits(raw: str) -> dict:
+    """
+    Parses 'instagram=2,twitter=4' into {'instagram': 2, 'twitter': 4}.
+    Used as an argparse type: an unknown platform (e.g. 'x=2') is a usage error.
+    """
+    limits = {}
+    if not raw:
+        return limits
+    for part in raw.split(','):
+        if '=' not in part:
+            continue
+        name, value = part.split('=', 1)
+        name = name.strip().lower()
+        value = value.strip()
+        if name not in PLATFORM_HOSTS:
+            raise argparse.ArgumentTypeError(f"unknown platform '{name}' (expected: {', '.join(PLATFORM_HOSTS)})")
+        if value.isdigit():
+            limits[name] = int(value)
+    return limits
+
+def install_stop_signals(stop_event: asyncio.Event):
+    """Sets stop_event on SIGTERM/SIGINT so the worker can finish in-flight links."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError):
+            # Windows event loops do not support add_signal_handler
+            signal.signal(sig, lambda *_: loop.call_soon_threadsafe(stop_event.set))
+
 async def main():
     parser = argparse.ArgumentParser(description='Social Media Processor CLI')
     subparsers = parser.add_subparsers(dest='command', help='Available commands')
@@ -31,6 +63,20 @@ async def main():
     process_parser.add_argument('--batch', action='store_true', help='Process a batch of links')
     process_parser.add_argument('--limit', type=int, default=10, help='Number of links to process in batch')
     process_parser.add_argument('--platform', type=str, help='Filter by platform (Instagram, Twitter, Facebook)')
+    process_parser.add_argument('--concurrency', type=int, default=1, help='Max links processed at the same time in batch mode')
+    process_parser.add_argument('--per-platform', type=parse_platform_limits, help='Per-platform concurrency caps, e.g. instagram=2,twitter=4,facebook=2')
+    process_parser.add_argument('--refresh', action='store_true', help='Ignore the capture cache and capture again')
+    process_parser.add_argument('--request-policy', choices=['on', 'off'], help='Request-blocking policy for this run (overrides REQUEST_POLICY)')
+
+    # Worker command
+    worker_parser = subparsers.add_parser('worker', help='Keep the browser warm and process the queue continuously')
+    worker_parser.add_argument('--interval', type=float, default=30, help='Seconds between queue polls when idle')
+    worker_parser.add_argument('--limit', type=int, default=10, help='Number of links fetched per poll')
+    worker_parser.add_argument('--platform', type=str, help='Filter by platform (Instagram, Twitter, Facebook)')
+    worker_parser.add_argument('--concurrency', type=int, default=1, help='Max links processed at the same time')
+    worker_parser.add_argument('--per-platform', type=parse_platform_limits, help='Per-platform concurrency caps, e.g. instagram=2,twitter=4,facebook=2')
+    worker_parser.add_argument('--refresh', action='store_true', help='Ignore the capture cache and capture again')
+    worker_parser.add_argument('--request-policy', choices=['on', 'off'], help='Request-blocking policy for this run (overrides REQUEST_POLICY)')
 
     # Verify command
     verify_parser = subparsers.add_parser('verify', help='Verify database connection')
@@ -44,9 +90,18 @@ async def main():
     queue_parser.add_argument('--limit', type=int, default=10, help='Number of links to show')
     queue_parser.add_argument('--platform', type=str, help='Filter by platform')
 
+    # Captures command
+    captures_parser = subparsers.add_parser('captures', help='Manage stored captures')
+    captures_parser.add_argument('action', choices=['gc'], help='gc: prune captures past retention or already confirmed')
+    captures_parser.add_argument('--dry-run', action='store_true', help='Only report what would be removed')
+    captures_parser.add_argument('--days', type=int, help='Retention in days (default: CAPTURE_RETENTION_DAYS)')
+    captures_parser.add_argument('--keep-confirmed', action='store_true', help='Do not prune captures of confirmed links')
+
     args = parser.parse_args()
 
-    processor = SocialMediaProcessor()
+    processor = SocialMediaProcessor(force_refresh=getattr(args, 'refresh', False))
+    if getattr(args, 'request_policy', None):
+        processor.settings.REQUEST_POLICY = args.request_policy
 
     try:
         if args.command == 'process':
@@ -69,10 +124,27 @@ async def main():
                     print(f"🚀 Processing link {lid}...")
                     await processor.process_link(lid)
             elif args.batch:
-                await processor.process_batch(limit=args.limit, platform=args.platform)
+                await processor.process_batch(
+                    limit=args.limit,
+                    platform=args.platform,
+                    concurrency=args.concurrency,
+                    platform_limits=args.per_platform
+                )
             else:
                 print("Please specify --id or --batch")
         
+        elif args.command == 'worker':
+            stop_event = asyncio.Event()
+            install_stop_signals(stop_event)
+            await processor.run_worker(
+                interval=args.interval,
+                limit=args.limit,
+                platform=args.platform,
+                concurrency=args.concurrency,
+                platform_limits=args.per_platform,
+                stop_event=stop_event
+            )
+
         elif args.command == 'verify':
             from src.database.connection import DatabaseConnection
             db = DatabaseConnection()
@@ -95,6 +167,7 @@ async def main():
 
             for lid in target_ids:
                 processor.repo.delete_materia_by_link(lid)
+                processor.repo.clear_retry_schedule(lid)
                 processor.repo.update_link_status(lid, 1)
                 print(f"✅ Link {lid} fully reset to Pending (1).")
         
@@ -108,14 +181,24 @@ async def main():
                 print("-" * 60)
                 for link in links:
                     url = link['LIMW_TX_LINK']
-                    # Simple platform detection
-                    plat = "Unknown"
-                    if "facebook.com" in url: plat = "Facebook"
-                    elif "twitter.com" in url or "x.com" in url: plat = "Twitter"
-                    elif "instagram.com" in url: plat = "Instagram"
+                    plat = (detect_platform(url) or "unknown").capitalize()
                     
                     print(f"{link['LIMW_CD_LINK_MIDIA_SOCIAL_WEB']:<10} | {plat:<12} | {url[:80]}...")
         
+        elif args.command == 'captures':
+            from src.storage.capture_store import CaptureStore
+            settings = processor.settings
+            store = CaptureStore(
+                settings.CAPTURES_DIR,
+                retention_days=args.days if args.days is not None else settings.CAPTURE_RETENTION_DAYS,
+                prune_confirmed=settings.CAPTURE_PRUNE_CONFIRMED and not args.keep_confirmed
+            )
+            report = store.gc(link_statuses=processor.repo.get_link_statuses, dry_run=args.dry_run)
+            verb = "Seriam removidos" if args.dry_run else "Removidos"
+            print(f"🧹 {verb} {report['files']} arquivos ({report['bytes'] / 1024 ** 2:.1f}MB): "
+                  f"{report['days']} dias fora da retenção de {store.retention_days} dias, "
+                  f"{report['confirmed']} arquivos de links confirmados.")
+
         else:
             parser.print_help()
 
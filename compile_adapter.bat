@@ -15,6 +15,7 @@ echo Compiling LegacyAdapter...
  /reference:System.Xml.Linq.dll ^
  /reference:Microsoft.CSharp.dll ^
  /reference:System.Net.Http.dll ^
+ /reference:System.Web.Extensions.dll ^
  src\legacy_adapter\Program.cs
 
 if %errorlevel% neq 0 (
@@ -6,6 +6,7 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
 
 from src.scraper.core.browser import BrowserManager
+from src.scraper.core.account_pool import platform_accounts
 
 async def manual_login_flow():
     print("Iniciando Modo de Login Manual Unificado...")
@@ -28,10 +29,21 @@ async def manual_login_flow():
         print("4. Nenhuma (Limpo)")
         choice = await asyncio.to_thread(input, "Escolha (1-4): ")
         
-        base_state = None
-        if choice == "1": base_state = "twitter_state.json"
-        elif choice == "2": base_state = "instagram_state.json"
-        elif choice == "3": base_state = "facebook_state.json"
+        platform = {"1": "twitter", "2": "instagram", "3": "facebook"}.get(choice)
+
+        # Arquivo de sessão de cada rede: a conta padrão, ou a conta escolhida (ACCOUNTS no .env)
+        state_files = {p: platform_accounts(manager.settings, p)[0]["state_file"] for p in ("twitter", "instagram", "facebook")}
+        if platform:
+            accounts = platform_accounts(manager.settings, platform)
+            if len(accounts) > 1:
+                print(f"\nContas de {platform}:")
+                for i, account in enumerate(accounts, 1):
+                    print(f"{i}. {account['name']} ({account['state_file']})")
+                account_choice = await asyncio.to_thread(input, f"Escolha (1-{len(accounts)}): ")
+                if account_choice.isdigit() and 1 <= int(account_choice) <= len(accounts):
+                    state_files[platform] = accounts[int(account_choice) - 1]["state_file"]
+
+        base_state = state_files[platform] if platform else None
         
         if base_state and not os.path.exists(base_state):
             print(f"Arquivo {base_state} nao encontrado. Iniciando limpo.")
@@ -62,10 +74,10 @@ async def manual_login_flow():
         save_choice = save_choice.upper()
 
         files_to_save = []
-        if save_choice == "T": files_to_save = ["twitter_state.json", "instagram_state.json", "facebook_state.json"]
-        elif save_choice == "F": files_to_save = ["facebook_state.json"]
-        elif save_choice == "X": files_to_save = ["twitter_state.json"]
-        elif save_choice == "I": files_to_save = ["instagram_state.json"]
+        if save_choice == "T": files_to_save = [state_files["twitter"], state_files["instagram"], state_files["facebook"]]
+        elif save_choice == "F": files_to_save = [state_files["facebook"]]
+        elif save_choice == "X": files_to_save = [state_files["twitter"]]
+        elif save_choice == "I": files_to_save = [state_files["instagram"]]
         
         for f in files_to_save:
             await context.storage_state(path=f)
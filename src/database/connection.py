@@ -15,6 +15,133 @@ class Settings(BaseSettings):
     INSTAGRAM_PASS: str = ""
     FACEBOOK_USER: str = ""
     FACEBOOK_PASS: str = ""
+
+    # Vários processos Chromium (0 = um por núcleo), com verificação de saúde e reinício automático
+    BROWSER_POOL: bool = False
+    BROWSER_POOL_SIZE: int = 0
+    BROWSER_HEALTH_INTERVAL: int = 30
+    BROWSER_HEALTH_TIMEOUT: int = 15
+
+    # Contas por plataforma (JSON: {"instagram": [{"name", "state_file", "user", "password"}, ...]}; vazio usa
+    # a conta única *_USER/*_PASS), rotação "lru" ou "round_robin" e cooldown inicial (s) após um bloqueio
+    ACCOUNTS: dict = {}
+    ACCOUNT_ROTATION: str = "lru"
+    ACCOUNT_COOLDOWN: int = 900
+
+    # Watchdog de memória: amostra a cada N links (0 desliga); limites em MB para reciclar contextos (renderer),
+    # reiniciar o navegador (árvore do Chromium) e alertar (processo Python); quadros do tracemalloc (0 desliga)
+    WATCHDOG_EVERY_LINKS: int = 25
+    WATCHDOG_RENDERER_MAX_MB: int = 1024
+    WATCHDOG_BROWSER_MAX_MB: int = 3072
+    WATCHDOG_PYTHON_MAX_MB: int = 0
+    WATCHDOG_TRACEMALLOC_FRAMES: int = 0
+
+    # Sessões: segundos em que um login verificado dispensa nova verificação (depois, verifica em segundo plano)
+    SESSION_TTL: int = 1800
+
+    # Bloqueio de requisições por plataforma (rastreadores, terceiros, segmentos de vídeo): "on" ou "off"
+    # (A/B), e nomes de regras a ignorar (ver src/scraper/core/request_policy.py). Interceptar aplica também as
+    # regras de terceiros, prefetch e vídeo, mas desliga o cache HTTP dos contextos reaproveitados
+    REQUEST_POLICY: str = "on"
+    REQUEST_POLICY_SKIP_RULES: list = []
+    REQUEST_POLICY_INTERCEPT: bool = False
+
+    # Esperas por eventos no lugar de pausas fixas (elemento visível, imagens decodificadas, layout estável,
+    # rede quieta): liga/desliga, limite total (s) e silêncio de rede exigido (ms)
+    READINESS_WAITS: bool = True
+    READINESS_MAX_WAIT: float = 6.0
+    READINESS_QUIET_MS: int = 300
+
+    # Dados do post pelas respostas da API/GraphQL (antes do DOM): liga/desliga, espera máxima (s) pelo payload
+    # depois da captura e pasta para gravar os payloads como fixtures (vazio = não grava)
+    NETWORK_CAPTURE: bool = True
+    NETWORK_CAPTURE_WAIT: float = 2.0
+    NETWORK_CAPTURE_RECORD_DIR: str = ""
+
+    # Prefetch: quantos links à frente já abrem e navegam a página enquanto os atuais são capturados
+    # (0 desliga) e idade máxima (s) de uma página pré-carregada
+    PREFETCH_DEPTH: int = 2
+    PREFETCH_MAX_AGE: int = 120
+
+    # Pool de contextos do navegador: contextos ociosos guardados por arquivo de sessão e páginas até reciclar
+    BROWSER_CONTEXT_POOL_SIZE: int = 4
+    BROWSER_CONTEXT_MAX_PAGES: int = 50
+
+    # Fila compartilhada entre workers (requer migrations/001_link_lease.sql)
+    QUEUE_LEASES: bool = False
+    LEASE_SECONDS: int = 600
+
+    # Pipeline de processamento em lote (o número de workers de scraping vem de --concurrency)
+    PIPELINE_FETCH_WORKERS: int = 2
+    PIPELINE_ADAPTER_WORKERS: int = 2
+    PIPELINE_STATUS_WORKERS: int = 1
+    PIPELINE_QUEUE_SIZE: int = 4
+
+    # LegacyAdapter.exe: processos simultâneos e tempo máximo (segundos) por execução
+    ADAPTER_MAX_PARALLEL: int = 2
+    ADAPTER_TIMEOUT: int = 180
+    # Mantém processos "LegacyAdapter.exe --serve" vivos entre links (cai para o modo por link se não suportado)
+    ADAPTER_PERSISTENT: bool = False
+
+    # Limite de navegações por minuto, por plataforma e por conta (reduzido automaticamente ao detectar bloqueios)
+    RATE_LIMITS_PER_MINUTE: dict = {"instagram": 10, "twitter": 30, "facebook": 15}
+    RATE_LIMIT_BURST: int = 3
+    # Limite por plataforma somando todas as contas (o que a plataforma vê vindo desta máquina)
+    RATE_LIMITS_PER_MINUTE_PLATFORM: dict = {"instagram": 20, "twitter": 60, "facebook": 30}
+
+    # Retentativas agendadas (status 9, requer migrations/002_link_retry.sql): liga/desliga, tentativas
+    # máximas e backoff exponencial em segundos
+    RETRY_SCHEDULING: bool = False
+    RETRY_MAX_ATTEMPTS: int = 5
+    RETRY_BASE_DELAY: int = 60
+    RETRY_MAX_DELAY: int = 6 * 3600
+    # Sem retentativas agendadas: tentativas na hora (com espera exponencial em segundos, entre o mínimo e o
+    # máximo) antes do status 3
+    RETRY_INLINE_ATTEMPTS: int = 3
+    RETRY_INLINE_DELAY: int = 4
+    RETRY_INLINE_MAX_DELAY: int = 10
+
+    # Circuit breaker por plataforma: falhas seguidas / login walls seguidos até pausar, e pausa inicial (s)
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_LOGIN_WALL_THRESHOLD: int = 2
+    BREAKER_COOLDOWN: int = 300
+
+    # Portão de qualidade das capturas: liga/desliga, pasta de referências ruins (<pasta>/<plataforma>/*.png),
+    # entropia mínima (bits), fração máxima de um só tom e distância máxima de dHash para casar uma referência.
+    # Os limites só recusam quadros praticamente vazios (duas linhas de texto num fundo branco ainda passam)
+    QUALITY_GATE: bool = False
+    QUALITY_REFS_DIR: str = "quality_refs"
+    QUALITY_MIN_ENTROPY: float = 0.05
+    QUALITY_BLANK_MAX: float = 0.998
+    QUALITY_HASH_DISTANCE: int = 6
+
+    # Armazenamento das capturas: pasta raiz (<raiz>/AAAA-MM-DD/<hh>/...), dias de retenção e se o
+    # "captures gc" também apaga capturas de links já confirmados (status 2)
+    CAPTURES_DIR: str = "captures"
+    CAPTURE_RETENTION_DAYS: int = 30
+    CAPTURE_PRUNE_CONFIRMED: bool = True
+
+    # Codificação das capturas: formato ("png" ou "jpeg"; "webp" é recusado na inicialização, o LegacyAdapter não o lê), qualidade,
+    # dimensões máximas (px, 0 = sem limite), orçamento por imagem (KB, 0 = sem limite) e processos do codificador
+    CAPTURE_FORMAT: str = "png"
+    CAPTURE_QUALITY: int = 85
+    CAPTURE_MAX_WIDTH: int = 0
+    CAPTURE_MAX_HEIGHT: int = 0
+    CAPTURE_MAX_KB: int = 0
+    CAPTURE_ENCODE_WORKERS: int = 2
+
+    # Cache de capturas por URL canônica: validade (s, 0 desliga), tamanho máximo (MB) e pasta
+    CAPTURE_CACHE_TTL: int = 24 * 3600
+    CAPTURE_CACHE_MAX_MB: int = 2048
+    CAPTURE_CACHE_DIR: str = "captures/cache"
+
+    # Escalonador do lote: janela de candidatos (x limite), pesos por cliente/plataforma (JSON) e
+    # prioridade para links publicados nas últimas N horas (0 desliga as faixas)
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_WINDOW_FACTOR: int = 5
+    SCHEDULER_CLIENT_WEIGHTS: dict = {}
+    SCHEDULER_PLATFORM_WEIGHTS: dict = {}
+    SCHEDULER_PRIORITY_HOURS: int = 24
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,18 @@
+-- Lease columns used by SocialMediaRepository.claim_pending_links.
+-- Status 5 = "Em processamento": the link is held by LIMW_TX_WORKER until LIMW_DT_LEASE_EXPIRA.
+-- Expired leases (worker crashed or was killed) are claimable again.
+
+IF COL_LENGTH('TopClipPreProducao.dbo.Link_MidiaSocial_Web', 'LIMW_TX_WORKER') IS NULL
+    ALTER TABLE TopClipPreProducao.dbo.Link_MidiaSocial_Web ADD LIMW_TX_WORKER VARCHAR(100) NULL;
+GO
+
+IF COL_LENGTH('TopClipPreProducao.dbo.Link_MidiaSocial_Web', 'LIMW_DT_LEASE_EXPIRA') IS NULL
+    ALTER TABLE TopClipPreProducao.dbo.Link_MidiaSocial_Web ADD LIMW_DT_LEASE_EXPIRA DATETIME NULL;
+GO
+
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'IX_LIMW_STATUS_LEASE'
+               AND object_id = OBJECT_ID('TopClipPreProducao.dbo.Link_MidiaSocial_Web'))
+    CREATE INDEX IX_LIMW_STATUS_LEASE
+        ON TopClipPreProducao.dbo.Link_MidiaSocial_Web (LIMW_IN_STATUS, LIMW_DT_LEASE_EXPIRA)
+        INCLUDE (LIMW_TX_LINK, LIMW_DT_DATA_PUBLICAÇÃO);
+GO
@@ -0,0 +1,16 @@
+-- Retry scheduling columns used by SocialMediaRepository.schedule_retry.
+-- Failed links go to status 9 with an attempt counter and the earliest time they may be retried;
+-- get_pending_links / claim_pending_links only return them once LIMW_DT_PROXIMA_TENTATIVA has passed.
+
+IF COL_LENGTH('TopClipPreProducao.dbo.Link_MidiaSocial_Web', 'LIMW_NR_TENTATIVAS') IS NULL
+    ALTER TABLE TopClipPreProducao.dbo.Link_MidiaSocial_Web ADD LIMW_NR_TENTATIVAS INT NOT NULL
+        CONSTRAINT DF_LIMW_NR_TENTATIVAS DEFAULT 0;
+GO
+
+IF COL_LENGTH('TopClipPreProducao.dbo.Link_MidiaSocial_Web', 'LIMW_DT_PROXIMA_TENTATIVA') IS NULL
+    ALTER TABLE TopClipPreProducao.dbo.Link_MidiaSocial_Web ADD LIMW_DT_PROXIMA_TENTATIVA DATETIME NULL;
+GO
+
+IF COL_LENGTH('TopClipPreProducao.dbo.Link_MidiaSocial_Web', 'LIMW_TX_ULTIMO_ERRO') IS NULL
+    ALTER TABLE TopClipPreProducao.dbo.Link_MidiaSocial_Web ADD LIMW_TX_ULTIMO_ERRO VARCHAR(500) NULL;
+GO
@@ -1,10 +1,38 @@
 from src.database.connection import DatabaseConnection
 import pyodbc
+import threading
+
+# Status used while a worker holds the lease on a link (see claim_pending_links)
+STATUS_IN_PROGRESS = 5
+
+# Columns added by the migrations (see missing_columns)
+LEASE_COLUMNS = ("LIMW_TX_WORKER", "LIMW_DT_LEASE_EXPIRA")  # migrations/001_link_lease.sql
+RETRY_COLUMNS = ("LIMW_NR_TENTATIVAS", "LIMW_DT_PROXIMA_TENTATIVA", "LIMW_TX_ULTIMO_ERRO")  # migrations/002_link_retry.sql
 
 class SocialMediaRepository:
-    def __init__(self):
-        self._db = DatabaseConnection()
+    def __init__(self, db: DatabaseConnection = None, retry_columns: bool = False):
+        """
+        retry_columns: read and write the retry schedule (requires migrations/002_link_retry.sql).
+        Each thread gets its own connection (pyodbc connections are not shared across threads),
+        so the async pipeline can call the repository through asyncio.to_thread.
+        """
+        self._db = db or DatabaseConnection()
+        self._local = threading.local()
+        self._connections = []  # Every thread's connection, for close()
         self.conn = self._db.get_connection()
+        self.retry_columns = retry_columns
+
+    @property
+    def conn(self):
+        """This thread's connection (opened on first use)."""
+        if getattr(self._local, "conn", None) is None:
+            self.conn = self._db.get_connection()
+        return self._local.conn
+
+    @conn.setter
+    def conn(self, connection):
+        self._local.conn = connection
+        self._connections.append(connection)
     
     def _ensure_connection(self):
         """Checks if connection is alive and attempts to reconnect if not."""
@@ -36,10 +64,10 @@ class SocialMediaRepository:
             CLIE_CD_CLIENTE, 
             LIMW_DT_DATA_PUBLICAÇÃO,
             LIMW_IN_STATUS,
-            MATE_CD_MATERIA
+            MATE_CD_MATERIA{retry_select}
         FROM TopClipPreProducao.dbo.Link_MidiaSocial_Web
         WHERE LIMW_CD_LINK_MIDIA_SOCIAL_WEB = ?
-        """
+        """.format(retry_select=self._retry_select())
         try:
             cursor.execute(query, (link_id,))
             row = cursor.fetchone()
@@ -50,50 +78,68 @@ class SocialMediaRepository:
         finally:
             cursor.close()
     
-    def get_pending_links(self, limit: int = 10, client_id: int = None, platform: str = None):
+    def get_pending_links(self, limit: int = 10, client_id: int = None, platform: str = None, exclude_platforms: list = None, include_expired_leases: bool = False, per_client: int = None):
         """
         Fetches pending links from Link_MidiaSocial_Web.
-        Status 1 = Pending, 9 = Retry.
+        Status 1 = Pending, 9 = Retry (with retry_columns, only once LIMW_DT_PROXIMA_TENTATIVA is due).
         Platform: 'instagram', 'facebook', or None (all)
+        exclude_platforms: platforms to leave out (e.g. paused by a circuit breaker)
+        include_expired_leases: also list links whose lease expired (claimable again, see claim_pending_links)
+        per_client: at most this many (newest) links per client, taken round-robin across clients,
+        so a client with thousands of pending links cannot fill the whole window (scheduler candidates)
         """
         self._ensure_connection()
         cursor = self.conn.cursor()
         
-        # Base query
-        query = """
-        SELECT TOP (?) 
+        columns = """
             LIMW_CD_LINK_MIDIA_SOCIAL_WEB, 
             LIMW_TX_LINK, 
             VEIC_CD_VEICULO, 
             CANA_CD_CANAL, 
             CLIE_CD_CLIENTE, 
-            CLIE_CD_CLIENTE, 
             LIMW_DT_DATA_PUBLICAÇÃO,
-            MATE_CD_MATERIA
+            MATE_CD_MATERIA{retry_select}""".format(retry_select=self._retry_select())
+        # Base query
+        query = """
+        SELECT {top}{columns}{client_rank}
         FROM TopClipPreProducao.dbo.Link_MidiaSocial_Web
-        WHERE LIMW_IN_STATUS IN (1, 9) 
+        WHERE {status_filter}
           AND LIMW_DT_DATA_PUBLICAÇÃO >= DATEADD(day, -15, GETDATE())
-        """
+        """ + self._retry_due_filter()
         
-        params = [limit]
+        params = [] if per_client else [limit]
+        if include_expired_leases:
+            status_filter = "(LIMW_IN_STATUS IN (1, 9) OR (LIMW_IN_STATUS = ? AND LIMW_DT_LEASE_EXPIRA < GETDATE()))"
+            params.append(STATUS_IN_PROGRESS)
+        else:
+            status_filter = "LIMW_IN_STATUS IN (1, 9)"
+        query = query.format(
+            top="" if per_client else "TOP (?) ",
+            columns=columns,
+            client_rank=(",\n            ROW_NUMBER() OVER (PARTITION BY CLIE_CD_CLIENTE "
+                         "ORDER BY LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC) AS CLIENT_RANK") if per_client else "",
+            status_filter=status_filter
+        )
         
-        if platform:
-            plat_lower = platform.lower()
-            if 'twitter' in plat_lower or 'x.com' in plat_lower:
-                query += " AND (LIMW_TX_LINK LIKE '%twitter.com%' OR LIMW_TX_LINK LIKE '%x.com%')"
-            elif 'instagram' in plat_lower:
-                query += " AND LIMW_TX_LINK LIKE '%instagram.com%'"
-            elif 'facebook' in plat_lower:
-                query += " AND (LIMW_TX_LINK LIKE '%facebook.com%' OR LIMW_TX_LINK LIKE '%fb.com%' OR LIMW_TX_LINK LIKE '%fb.watch%')"
-            else:
-                query += " AND LIMW_TX_LINK LIKE ?"
-                params.append(f"%{platform}%")
+        platform_sql, platform_params = self._platform_filter(platform, exclude_platforms)
+        query += platform_sql
+        params.extend(platform_params)
             
         if client_id:
             query += " AND CLIE_CD_CLIENTE = ?"
             params.append(client_id)
             
-        query += " ORDER BY LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC"
+        if per_client:
+            # Each client's newest links first, then everyone's second newest, and so on
+            query = """
+        SELECT TOP (?) {columns}
+        FROM ({ranked}) ranked
+        WHERE CLIENT_RANK <= ?
+        ORDER BY CLIENT_RANK, LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC
+        """.format(columns=columns, ranked=query)
+            params = [limit] + params + [per_client]
+        else:
+            query += " ORDER BY LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC"
         
         try:
             cursor.execute(query, params)
@@ -103,8 +149,171 @@ class SocialMediaRepository:
                 results.append(dict(zip(columns, row)))
             return results
         except Exception as e:
+            # Never report a broken query as an empty queue
             print(f"Error fetching links: {e}")
-            return []
+            raise
+        finally:
+            cursor.close()
+
+    def _retry_select(self) -> str:
+        return ",\n            LIMW_NR_TENTATIVAS" if self.retry_columns else ""
+
+    def _retry_due_filter(self) -> str:
+        if not self.retry_columns:
+            return ""
+        return "          AND (LIMW_DT_PROXIMA_TENTATIVA IS NULL OR LIMW_DT_PROXIMA_TENTATIVA <= GETDATE())\n"
+
+    def missing_columns(self, columns) -> list:
+        """Columns of Link_MidiaSocial_Web (e.g. LEASE_COLUMNS, RETRY_COLUMNS) that do not exist yet."""
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+        try:
+            missing = []
+            for column in columns:
+                cursor.execute("SELECT COL_LENGTH('TopClipPreProducao.dbo.Link_MidiaSocial_Web', ?)", (column,))
+                if cursor.fetchone()[0] is None:
+                    missing.append(column)
+            return missing
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _platform_condition(platform: str):
+        """Returns the (sql, params) condition that matches the links of a platform."""
+        plat_lower = platform.lower()
+        if 'twitter' in plat_lower or 'x.com' in plat_lower:
+            return "(LIMW_TX_LINK LIKE '%twitter.com%' OR LIMW_TX_LINK LIKE '%x.com%')", []
+        elif 'instagram' in plat_lower:
+            return "LIMW_TX_LINK LIKE '%instagram.com%'", []
+        elif 'facebook' in plat_lower:
+            return "(LIMW_TX_LINK LIKE '%facebook.com%' OR LIMW_TX_LINK LIKE '%fb.com%' OR LIMW_TX_LINK LIKE '%fb.watch%')", []
+        return "LIMW_TX_LINK LIKE ?", [f"%{platform}%"]
+
+    @classmethod
+    def _platform_filter(cls, platform: str = None, exclude_platforms: list = None):
+        """Returns the (sql, params) fragment that keeps `platform` and drops `exclude_platforms`."""
+        sql, params = "", []
+        if platform:
+            condition, condition_params = cls._platform_condition(platform)
+            sql += f" AND {condition}"
+            params.extend(condition_params)
+        for excluded in exclude_platforms or []:
+            condition, condition_params = cls._platform_condition(excluded)
+            sql += f" AND NOT {condition}"
+            params.extend(condition_params)
+        return sql, params
+
+    def claim_pending_links(self, worker_id: str, limit: int = 10, lease_seconds: int = 600, client_id: int = None, platform: str = None, exclude_platforms: list = None, link_ids: list = None):
+        """
+        Atomically claims up to `limit` pending links for `worker_id`.
+        link_ids: only claim these links (picked by the scheduler); those taken by
+        another worker in the meantime are simply not returned.
+        Claimed rows move to STATUS_IN_PROGRESS with a lease expiry; rows whose lease
+        expired (crashed/killed worker) are claimable again.
+        UPDLOCK + READPAST make concurrent claimers skip each other's rows instead of
+        blocking or reading the same ones, so a link is never handed out twice.
+        Requires src/database/migrations/001_link_lease.sql.
+        Errors are raised (after a rollback), never reported as an empty queue.
+        """
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+
+        query = """
+        WITH candidates AS (
+            SELECT TOP (?) *
+            FROM TopClipPreProducao.dbo.Link_MidiaSocial_Web WITH (UPDLOCK, READPAST, ROWLOCK)
+            WHERE (LIMW_IN_STATUS IN (1, 9)
+                   OR (LIMW_IN_STATUS = ? AND LIMW_DT_LEASE_EXPIRA < GETDATE()))
+              AND LIMW_DT_DATA_PUBLICAÇÃO >= DATEADD(day, -15, GETDATE())
+        """ + self._retry_due_filter()
+        params = [limit, STATUS_IN_PROGRESS]
+
+        platform_sql, platform_params = self._platform_filter(platform, exclude_platforms)
+        query += platform_sql
+        params.extend(platform_params)
+
+        if client_id:
+            query += " AND CLIE_CD_CLIENTE = ?"
+            params.append(client_id)
+
+        if link_ids:
+            query += f" AND LIMW_CD_LINK_MIDIA_SOCIAL_WEB IN ({', '.join('?' for _ in link_ids)})"
+            params.extend(link_ids)
+
+        query += """
+            ORDER BY LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC
+        )
+        UPDATE candidates
+        SET LIMW_IN_STATUS = ?,
+            LIMW_TX_WORKER = ?,
+            LIMW_DT_LEASE_EXPIRA = DATEADD(second, ?, GETDATE())
+        OUTPUT
+            inserted.LIMW_CD_LINK_MIDIA_SOCIAL_WEB,
+            inserted.LIMW_TX_LINK,
+            inserted.VEIC_CD_VEICULO,
+            inserted.CANA_CD_CANAL,
+            inserted.CLIE_CD_CLIENTE,
+            inserted.LIMW_DT_DATA_PUBLICAÇÃO,
+            inserted.MATE_CD_MATERIA{retry_output};
+        """.format(retry_output=",\n            inserted.LIMW_NR_TENTATIVAS" if self.retry_columns else "")
+        params.extend([STATUS_IN_PROGRESS, worker_id, lease_seconds])
+
+        try:
+            cursor.execute(query, params)
+            columns = [column[0] for column in cursor.description]
+            results = [dict(zip(columns, row)) for row in cursor.fetchall()]
+            self.conn.commit()
+            return results
+        except Exception as e:
+            print(f"Error claiming links: {e}")
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def renew_lease(self, link_id: int, worker_id: str, lease_seconds: int = 600) -> bool:
+        """
+        Extends the lease of a link still held by `worker_id`.
+        Returns False when the lease was lost (expired and reclaimed by another worker).
+        """
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+        query = """
+        UPDATE TopClipPreProducao.dbo.Link_MidiaSocial_Web
+        SET LIMW_DT_LEASE_EXPIRA = DATEADD(second, ?, GETDATE())
+        WHERE LIMW_CD_LINK_MIDIA_SOCIAL_WEB = ? AND LIMW_IN_STATUS = ? AND LIMW_TX_WORKER = ?
+        """
+        try:
+            cursor.execute(query, (lease_seconds, link_id, STATUS_IN_PROGRESS, worker_id))
+            renewed = cursor.rowcount > 0
+            self.conn.commit()
+            return renewed
+        except Exception as e:
+            print(f"Error renewing lease for {link_id}: {e}")
+            self.conn.rollback()
+            return False
+        finally:
+            cursor.close()
+
+    def release_links(self, link_ids: list, worker_id: str, status: int = 1):
+        """Returns links claimed by `worker_id` but never started back to the queue."""
+        if not link_ids:
+            return
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+        placeholders = ", ".join("?" for _ in link_ids)
+        query = f"""
+        UPDATE TopClipPreProducao.dbo.Link_MidiaSocial_Web
+        SET LIMW_IN_STATUS = ?, LIMW_TX_WORKER = NULL, LIMW_DT_LEASE_EXPIRA = NULL
+        WHERE LIMW_IN_STATUS = ? AND LIMW_TX_WORKER = ?
+          AND LIMW_CD_LINK_MIDIA_SOCIAL_WEB IN ({placeholders})
+        """
+        try:
+            cursor.execute(query, [status, STATUS_IN_PROGRESS, worker_id, *link_ids])
+            self.conn.commit()
+        except Exception as e:
+            print(f"Error releasing links {link_ids}: {e}")
+            self.conn.rollback()
         finally:
             cursor.close()
 
@@ -128,6 +337,54 @@ class SocialMediaRepository:
         finally:
             cursor.close()
 
+    def schedule_retry(self, link_id: int, delay_seconds: int, error: str = None):
+        """
+        Moves a failed link to status 9 (retry), increments its attempt counter and sets
+        the earliest time it may be picked up again. Requires migrations/002_link_retry.sql;
+        without retry_columns the link only goes to status 9.
+        """
+        if not self.retry_columns:
+            self.update_link_status(link_id, 9)
+            return
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+        query = """
+        UPDATE TopClipPreProducao.dbo.Link_MidiaSocial_Web
+        SET LIMW_IN_STATUS = 9,
+            LIMW_NR_TENTATIVAS = ISNULL(LIMW_NR_TENTATIVAS, 0) + 1,
+            LIMW_DT_PROXIMA_TENTATIVA = DATEADD(second, ?, GETDATE()),
+            LIMW_TX_ULTIMO_ERRO = ?
+        WHERE LIMW_CD_LINK_MIDIA_SOCIAL_WEB = ?
+        """
+        try:
+            cursor.execute(query, (delay_seconds, (error or "")[:500], link_id))
+            self.conn.commit()
+        except Exception as e:
+            print(f"Error scheduling retry for {link_id}: {e}")
+            self.conn.rollback()
+        finally:
+            cursor.close()
+
+    def clear_retry_schedule(self, link_id: int):
+        """Resets the attempt counter and retry time (used when a link is manually reset)."""
+        if not self.retry_columns:
+            return
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+        query = """
+        UPDATE TopClipPreProducao.dbo.Link_MidiaSocial_Web
+        SET LIMW_NR_TENTATIVAS = 0, LIMW_DT_PROXIMA_TENTATIVA = NULL, LIMW_TX_ULTIMO_ERRO = NULL
+        WHERE LIMW_CD_LINK_MIDIA_SOCIAL_WEB = ?
+        """
+        try:
+            cursor.execute(query, (link_id,))
+            self.conn.commit()
+        except Exception as e:
+            print(f"Error clearing retry schedule for {link_id}: {e}")
+            self.conn.rollback()
+        finally:
+            cursor.close()
+
     def check_existing_url(self, url: str):
         """Checks if a URL already exists."""
         self._ensure_connection()
@@ -172,5 +429,32 @@ class SocialMediaRepository:
         finally:
             cursor.close()
 
+    def get_link_statuses(self, link_ids: list, chunk_size: int = 500) -> dict:
+        """Returns {link_id: status} for the given links (queried in chunks)."""
+        self._ensure_connection()
+        cursor = self.conn.cursor()
+        statuses = {}
+
+        try:
+            for start in range(0, len(link_ids), chunk_size):
+                chunk = list(link_ids[start:start + chunk_size])
+                placeholders = ", ".join("?" for _ in chunk)
+                cursor.execute(f"""
+                    SELECT LIMW_CD_LINK_MIDIA_SOCIAL_WEB, LIMW_IN_STATUS
+                    FROM TopClipPreProducao.dbo.Link_MidiaSocial_Web
+                    WHERE LIMW_CD_LINK_MIDIA_SOCIAL_WEB IN ({placeholders})
+                """, chunk)
+                for link_id, status in cursor.fetchall():
+                    statuses[link_id] = status
+            return statuses
+        finally:
+            cursor.close()
+
     def close(self):
-        self.conn.close()
+        for connection in self._connections:
+            try:
+                connection.close()
+            except pyodbc.Error:
+                pass
+        self._connections.clear()
+        self._local = threading.local()
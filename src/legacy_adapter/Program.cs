@@ -1,8 +1,10 @@
 using System;
+using System.Collections.Generic;
 using System.IO;
 using System.Linq;
 using System.Drawing;
 using System.Runtime.Serialization.Formatters.Binary;
+using System.Web.Script.Serialization;
 using DadosColeta;
 using ManagerDB;
 
@@ -13,6 +15,13 @@ namespace LegacyAdapter
         static void Main(string[] args)
         {
             // Usage: LegacyAdapter.exe <LinkID> <FilePath> <Text> <Date> <VeiculoCode> <CanalCode> <ClientCode>
+            //        LegacyAdapter.exe --serve   (persistent mode, JSON lines over stdin/stdout)
+            if (args.Length == 1 && args[0] == "--serve")
+            {
+                Serve();
+                return;
+            }
+
             if (args.Length < 7)
             {
                 Console.WriteLine("Error: Missing arguments. Expected: LinkID FilePath Text Date(yyyy-MM-dd) Veiculo Canal Client");
@@ -21,20 +30,108 @@ namespace LegacyAdapter
 
             try
             {
-                int linkId = int.Parse(args[0]);
-                string imagePath = args[1];
-                string text = File.ReadAllText(args[2], System.Text.Encoding.UTF8); // Use UTF8 explicitly
-                DateTime pubDate = DateTime.Parse(args[3]);
-                int veiculo = int.Parse(args[4]);
-                int canal = int.Parse(args[5]);
-                int cliente = int.Parse(args[6]);
-
-                Console.WriteLine("Processing Link " + linkId + "...");
-
-                // 1. Initialize Contexts
-                // Replaced DadosMidiaSocial9 with ColetaProducaoEntities based on code analysis
-                ColetaProducaoEntities midia = new ColetaProducaoEntities();
-                Manager mana = new Manager();
+                ProcessLink(
+                    int.Parse(args[0]),
+                    args[1],
+                    args[2],
+                    DateTime.Parse(args[3]),
+                    int.Parse(args[4]),
+                    int.Parse(args[5]),
+                    int.Parse(args[6]));
+
+                Console.WriteLine("SUCCESS");
+            }
+            catch (Exception ex)
+            {
+                Console.WriteLine("ERROR: " + ex.Message);
+                Console.WriteLine(ex.StackTrace);
+                Environment.Exit(1);
+            }
+        }
+
+        // Persistent mode: EntityFramework, ManagerDB and the DB connections are loaded once
+        // and reused for every job.
+        // Protocol (one JSON object per line):
+        //   out: {"ready": true}                                   once, after startup
+        //   in:  {"id": 1, "link_id": 123, "image_path": "...", "text_path": "...",
+        //         "pub_date": "yyyy-MM-dd", "veiculo": 1, "canal": 2, "cliente": 3}
+        //   out: {"id": 1, "link_id": 123, "success": true, "materia_id": 456, "error": null, "output": "..."}
+        // The process exits when stdin is closed.
+        static void Serve()
+        {
+            var serializer = new JavaScriptSerializer();
+            TextWriter protocol = Console.Out;
+            protocol.NewLine = "\n";
+
+            // Warm up: builds the EF model and opens the connection pool before the first job arrives
+            using (var warmup = new ColetaProducaoEntities())
+            {
+                warmup.Link_MidiaSocial_Web.Any(x => x.LIMW_CD_LINK_MIDIA_SOCIAL_WEB == 0);
+            }
+
+            protocol.WriteLine(serializer.Serialize(new Dictionary<string, object> { { "ready", true } }));
+            protocol.Flush();
+
+            string line;
+            while ((line = Console.In.ReadLine()) != null)
+            {
+                if (line.Trim().Length == 0) continue;
+
+                var response = new Dictionary<string, object>();
+                var output = new StringWriter();
+                Console.SetOut(output); // Job logs go to the response, not to the protocol stream
+                try
+                {
+                    var job = serializer.Deserialize<Dictionary<string, object>>(line);
+                    response["id"] = job["id"];
+                    response["link_id"] = job["link_id"];
+
+                    int codMat = ProcessLink(
+                        Convert.ToInt32(job["link_id"]),
+                        Convert.ToString(job["image_path"]),
+                        Convert.ToString(job["text_path"]),
+                        DateTime.Parse(Convert.ToString(job["pub_date"])),
+                        Convert.ToInt32(job["veiculo"]),
+                        Convert.ToInt32(job["canal"]),
+                        Convert.ToInt32(job["cliente"]));
+
+                    response["success"] = true;
+                    response["materia_id"] = codMat;
+                    response["error"] = null;
+                }
+                catch (Exception ex)
+                {
+                    output.WriteLine("ERROR: " + ex.Message);
+                    output.WriteLine(ex.StackTrace);
+                    response["success"] = false;
+                    response["materia_id"] = null;
+                    response["error"] = ex.Message;
+                }
+                finally
+                {
+                    Console.SetOut(protocol);
+                }
+
+                response["output"] = output.ToString();
+                protocol.WriteLine(serializer.Serialize(response));
+                protocol.Flush();
+            }
+        }
+
+        static int ProcessLink(int linkId, string imagePath, string textPath, DateTime pubDate, int veiculo, int canal, int cliente)
+        {
+            string text = File.ReadAllText(textPath, System.Text.Encoding.UTF8); // Use UTF8 explicitly
+
+            Console.WriteLine("Processing Link " + linkId + "...");
+
+            // 1. Initialize Contexts
+            // Replaced DadosMidiaSocial9 with ColetaProducaoEntities based on code analysis
+            // The process may serve many jobs (--serve): the context, the Manager and their
+            // connections are released on every path, failed jobs included
+            ColetaProducaoEntities midia = new ColetaProducaoEntities();
+            Manager mana = new Manager();
+            try
+            {
                 mana.OnERRO += (ex) => {
                     Console.WriteLine("MANAGER ERROR: " + ex.Message);
                     Console.WriteLine(ex.StackTrace);
@@ -44,7 +141,7 @@ namespace LegacyAdapter
                 // sp_materia_web_insert_auto(Titulo, Data, Veiculo)
                 // Using first 100 chars of text as Title if needed, or generic title
                 string title = text.Length > 100 ? text.Substring(0, 100) : text;
-                
+            
                 Console.WriteLine("Inserting Materia...");
                 var re = midia.sp_materia_web_insert_auto(title, pubDate, veiculo);
                 int? codigoMateria = re.FirstOrDefault();
@@ -59,11 +156,11 @@ namespace LegacyAdapter
 
                 // 3. Link Materia to Cliente
                 // sp_materia_cliente_insert_coleta(CodMat, CodCli, 4, 0, fluxo, "", NumServico)
-                
+            
                 // Values derived from legacy Processa.cs GravarMateria method
                 byte[] fluxo = new byte[] { 8 };
                 byte numServico = 8;
-                
+            
                 // Explicit casts to help compiler resolve overload if needed
                 midia.sp_materia_cliente_insert_coleta(codMat, cliente, (byte)4, (byte)0, fluxo, "", numServico);
                 midia.sp_Materia_Cliente_Canal_Virtual_Insert(codMat, cliente, canal, (byte)90); // 90 = confidence?
@@ -121,13 +218,16 @@ namespace LegacyAdapter
                 }
                 */
 
-                Console.WriteLine("SUCCESS");
+                return codMat;
             }
-            catch (Exception ex)
+            finally
             {
-                Console.WriteLine("ERROR: " + ex.Message);
-                Console.WriteLine(ex.StackTrace);
-                Environment.Exit(1);
+                midia.Dispose();
+                IDisposable disposableManager = mana as IDisposable;
+                if (disposableManager != null)
+                {
+                    disposableManager.Dispose();
+                }
             }
         }
     }
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import time
+import logging
+from src.legacy_adapter.run_adapter import AdapterNotFoundError, default_adapter_exe, build_adapter_args
+from src.legacy_adapter.adapter_server import AdapterServer, AdapterProtocolError, run_on_server
+
+logger = logging.getLogger(__name__)
+
+class AdapterPool:
+    """
+    Runs LegacyAdapter.exe without blocking the event loop.
+
+    - At most `max_parallel` adapter processes run at the same time.
+    - Each invocation is killed after `timeout` seconds (a hung adapter no longer stalls the batch).
+    - Every run returns a report with exit code, stdout/stderr and wall time.
+    - persistent=True keeps up to `max_parallel` `LegacyAdapter.exe --serve` processes alive
+      and sends them jobs as JSON lines, so the .NET/EntityFramework startup is paid once.
+      If the executable does not support --serve, the pool falls back to one-shot runs.
+
+    `command` replaces the executable (e.g. [sys.executable, "fake_adapter.py"] for a stand-in);
+    the link arguments (or --serve) are appended to it exactly as for LegacyAdapter.exe.
+    """
+
+    def __init__(self, max_parallel: int = 2, timeout: float = 180, command: list = None,
+                 persistent: bool = False, startup_timeout: float = 60):
+        self.max_parallel = max(1, max_parallel)
+        self.timeout = timeout
+        self.command = command or [default_adapter_exe()]
+        self.persistent = persistent
+        self.startup_timeout = startup_timeout
+        self._slots = asyncio.Semaphore(self.max_parallel)
+        self._idle_servers = []
+
+    async def run(self, link_id, image_path, text_path, pub_date, veiculo, canal, cliente) -> dict:
+        """
+        Runs the adapter for one link. Raises AdapterNotFoundError when the executable
+        is missing and FileNotFoundError when the capture files are missing; any other
+        failure is reported in the result.
+        """
+        if not os.path.exists(self.command[-1]):
+            raise AdapterNotFoundError(f"LegacyAdapter not found at {self.command[-1]}")
+
+        args = build_adapter_args(link_id, image_path, text_path, pub_date, veiculo, canal, cliente)
+
+        async with self._slots:
+            report = None
+            if self.persistent:
+                try:
+                    report = await self._run_persistent(link_id, args)
+                except AdapterProtocolError as e:
+                    logger.warning(f"⚠️ Persistent LegacyAdapter unavailable ({e}). Falling back to one-shot mode.")
+                    self.persistent = False
+            if report is None:
+                report = await self._run_once(link_id, args)
+
+        self._log_report(report)
+        return report
+
+    async def close(self):
+        """Stops the persistent adapter processes."""
+        servers, self._idle_servers = self._idle_servers, []
+        for server in servers:
+            await server.close()
+
+    async def _run_persistent(self, link_id, args: list) -> dict:
+        """Runs the job on an idle --serve process (starting one if needed)."""
+        server = None
+        while self._idle_servers and server is None:
+            server = self._idle_servers.pop()
+            if not server.alive:
+                # Exited while idle (crash, killed from outside): replace it
+                logger.warning(f"⚠️ Persistent LegacyAdapter (pid {server.process.pid}) exited with code {server.process.returncode} while idle.")
+                server = None
+        if server is None:
+            server = AdapterServer(self.command, startup_timeout=self.startup_timeout)
+            await server.start()
+
+        logger.info(f"🔄 sending link {link_id} to persistent LegacyAdapter (pid {server.process.pid})")
+        try:
+            report = await run_on_server(server, link_id, args, self.timeout)
+        except AdapterProtocolError as e:
+            # The server died or misbehaved mid-job: fail this link, start a fresh server next time
+            server.kill()
+            report = {
+                "link_id": link_id,
+                "success": False,
+                "exit_code": server.process.returncode,
+                "stdout": "",
+                "stderr": str(e),
+                "duration": 0.0,
+                "timed_out": False,
+                "materia_id": None,
+            }
+        finally:
+            if server.alive:
+                self._idle_servers.append(server)
+        return report
+
+    async def _run_once(self, link_id, args: list) -> dict:
+        """One-shot mode: one LegacyAdapter.exe process per link."""
+        cmd = self.command + args
+        report = {
+            "link_id": link_id,
+            "success": False,
+            "exit_code": None,
+            "stdout": "",
+            "stderr": "",
+            "duration": 0.0,
+            "timed_out": False,
+            "materia_id": None,
+        }
+
+        logger.info(f"🔄 invoking LegacyAdapter: {' '.join(cmd)}")
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=self.timeout)
+        except asyncio.TimeoutError:
+            report["timed_out"] = True
+            process.kill()
+            stdout, stderr = await process.communicate()
+        except asyncio.CancelledError:
+            # Never leave an orphan adapter behind a cancelled batch
+            process.kill()
+            raise
+        finally:
+            report["duration"] = round(time.perf_counter() - started, 3)
+
+        report["exit_code"] = process.returncode
+        report["stdout"] = stdout.decode("utf-8", errors="replace") if stdout else ""
+        report["stderr"] = stderr.decode("utf-8", errors="replace") if stderr else ""
+        report["success"] = not report["timed_out"] and process.returncode == 0
+        return report
+
+    def _log_report(self, report: dict):
+        link_id = report["link_id"]
+        if report["timed_out"]:
+            logger.error(f"❌ [Link {link_id}] LegacyAdapter hung and was killed after {self.timeout}s.")
+        elif report["success"]:
+            logger.info(f"✅ [Link {link_id}] LegacyAdapter finished in {report['duration']}s.")
+        else:
+            logger.error(f"❌ [Link {link_id}] LegacyAdapter failed (Exit Code {report['exit_code']}) in {report['duration']}s.")
+
+        if not report["success"]:
+            output = (report["stdout"] + report["stderr"]).strip()
+            if output:
+                logger.error(f"LegacyAdapter output for link {link_id}:\n{output[-2000:]}")
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+class AdapterProtocolError(Exception):
+    """The persistent adapter did not start or did not speak the JSON lines protocol."""
+
+class AdapterServer:
+    """
+    Client for one long-lived `LegacyAdapter.exe --serve` process.
+
+    EntityFramework, ManagerDB and the DB connections are loaded once when the
+    process starts; afterwards each job is one JSON line on stdin and one JSON
+    line on stdout (see Program.Serve). Jobs are sent one at a time: callers must
+    not share a server between concurrent tasks (AdapterPool checks them out).
+    """
+
+    def __init__(self, command: list, startup_timeout: float = 60):
+        self.command = command
+        self.startup_timeout = startup_timeout
+        self.process = None
+        self._next_id = 0
+        self._stderr_task = None
+        self._killed = False
+
+    @property
+    def alive(self) -> bool:
+        return self.process is not None and self.process.returncode is None and not self._killed
+
+    async def start(self):
+        self.process = await asyncio.create_subprocess_exec(
+            *self.command, "--serve",
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=16 * 1024 * 1024  # Responses carry the job log
+        )
+        self._stderr_task = asyncio.create_task(self._drain_stderr())
+        try:
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout=self.startup_timeout)
+            if not json.loads(line or b"{}").get("ready"):
+                raise AdapterProtocolError(f"unexpected handshake: {line[:200]!r}")
+        except (asyncio.TimeoutError, ValueError, AdapterProtocolError) as e:
+            self.kill()
+            raise AdapterProtocolError(f"LegacyAdapter --serve did not become ready: {e}") from e
+        logger.info(f"🟢 Persistent LegacyAdapter started (pid {self.process.pid}).")
+
+    async def submit(self, job: dict, timeout: float) -> dict:
+        """
+        Sends one job and waits for its result. On timeout the process is killed
+        (a hung adapter cannot be trusted with the next job) and TimeoutError is raised.
+        """
+        self._next_id += 1
+        request = dict(job, id=self._next_id)
+        try:
+            self.process.stdin.write((json.dumps(request) + "\n").encode("utf-8"))
+            await self.process.stdin.drain()
+            line = await asyncio.wait_for(self.process.stdout.readline(), timeout=timeout)
+        except ConnectionError as e:
+            self.kill()
+            raise AdapterProtocolError(f"LegacyAdapter pipe closed: {e}") from e
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            # A pending response would be read as the answer to the next job
+            self.kill()
+            raise
+
+        if not line:
+            # stdout closes before the exit is reported: wait briefly for the exit code
+            try:
+                await asyncio.wait_for(self.process.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+            self.kill()
+            raise AdapterProtocolError(f"LegacyAdapter exited (code {self.process.returncode}) while processing a job")
+        try:
+            response = json.loads(line)
+        except ValueError as e:
+            self.kill()
+            raise AdapterProtocolError(f"invalid response line: {line[:200]!r}") from e
+        if response.get("id") != request["id"]:
+            self.kill()
+            raise AdapterProtocolError(f"out-of-order response {response.get('id')} for job {request['id']}")
+        return response
+
+    async def close(self, timeout: float = 10):
+        """Closes stdin (the server exits after the current job) and waits; kills if needed."""
+        if not self.alive:
+            return
+        try:
+            self.process.stdin.close()
+            await asyncio.wait_for(self.process.wait(), timeout=timeout)
+        except (asyncio.TimeoutError, ConnectionError):
+            self.kill()
+
+    def kill(self):
+        if self.alive:
+            self._killed = True
+            self.process.kill()
+
+    async def _drain_stderr(self):
+        while True:
+            line = await self.process.stderr.readline()
+            if not line:
+                break
+            logger.info(f"[LegacyAdapter] {line.decode('utf-8', errors='replace').rstrip()}")
+
+async def run_on_server(server: AdapterServer, link_id, args: list, timeout: float) -> dict:
+    """Runs one job on a persistent server and returns an AdapterPool-style report."""
+    image_path, text_path, pub_date, veiculo, canal, cliente = args[1:]
+    job = {
+        "link_id": int(link_id),
+        "image_path": image_path,
+        "text_path": text_path,
+        "pub_date": pub_date,
+        "veiculo": int(veiculo),
+        "canal": int(canal),
+        "cliente": int(cliente),
+    }
+    report = {
+        "link_id": link_id,
+        "success": False,
+        "exit_code": None,
+        "stdout": "",
+        "stderr": "",
+        "duration": 0.0,
+        "timed_out": False,
+        "materia_id": None,
+    }
+    started = time.perf_counter()
+    try:
+        response = await server.submit(job, timeout)
+    except asyncio.TimeoutError:
+        report["timed_out"] = True
+        return report
+    finally:
+        report["duration"] = round(time.perf_counter() - started, 3)
+
+    report["success"] = bool(response.get("success"))
+    report["exit_code"] = 0 if report["success"] else 1
+    report["stdout"] = response.get("output") or ""
+    report["stderr"] = response.get("error") or ""
+    report["materia_id"] = response.get("materia_id")
+    return report
@@ -3,18 +3,19 @@ import subprocess
 import os
 import sys
 
-def run_legacy_adapter(link_id, image_path, text_path, pub_date, veiculo, canal, cliente):
+class AdapterNotFoundError(FileNotFoundError):
+    """LegacyAdapter.exe is missing: retrying will not help until it is built."""
+
+def default_adapter_exe():
+    """Absolute path to the compiled LegacyAdapter.exe."""
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    return os.path.join(base_dir, "bin", "Debug", "LegacyAdapter.exe")
+
+def build_adapter_args(link_id, image_path, text_path, pub_date, veiculo, canal, cliente):
     """
-    Invokes the C# LegacyAdapter.exe with the provided arguments.
+    Validates the capture files and returns the LegacyAdapter.exe arguments
+    (everything after the executable).
     """
-    
-    # Resolve absolute path to the executable
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    adapter_exe = os.path.join(base_dir, "bin", "Debug", "LegacyAdapter.exe")
-    
-    if not os.path.exists(adapter_exe):
-        raise FileNotFoundError(f"LegacyAdapter.exe not found at {adapter_exe}")
-        
     # Ensure text file exists
     if not os.path.exists(text_path):
          raise FileNotFoundError(f"Content text file not found at {text_path}")
@@ -23,8 +24,7 @@ def run_legacy_adapter(link_id, image_path, text_path, pub_date, veiculo, canal,
     if not os.path.exists(image_path):
         raise FileNotFoundError(f"Image file not found at {image_path}")
 
-    cmd = [
-        adapter_exe,
+    return [
         str(link_id),
         image_path,
         text_path,
@@ -33,17 +33,34 @@ def run_legacy_adapter(link_id, image_path, text_path, pub_date, veiculo, canal,
         str(canal),
         str(cliente)
     ]
+
+def run_legacy_adapter(link_id, image_path, text_path, pub_date, veiculo, canal, cliente, timeout=None):
+    """
+    Invokes the C# LegacyAdapter.exe with the provided arguments.
+    Blocking; inside the event loop use AdapterPool (adapter_pool.py) instead.
+    """
+    
+    # Resolve absolute path to the executable
+    adapter_exe = default_adapter_exe()
+    
+    if not os.path.exists(adapter_exe):
+        raise AdapterNotFoundError(f"LegacyAdapter.exe not found at {adapter_exe}")
+        
+    cmd = [adapter_exe] + build_adapter_args(link_id, image_path, text_path, pub_date, veiculo, canal, cliente)
     
     print(f"🔄 invoking LegacyAdapter: {' '.join(cmd)}")
     
     try:
         # Run without capture_output to stream directly to stdout/stderr
-        result = subprocess.run(cmd, check=True, text=True) 
+        result = subprocess.run(cmd, check=True, text=True, timeout=timeout) 
         print("✅ LegacyAdapter Finished")
         return True
     except subprocess.CalledProcessError as e:
         print(f"❌ LegacyAdapter Failed (Exit Code {e.returncode})")
         return False
+    except subprocess.TimeoutExpired:
+        print(f"❌ LegacyAdapter killed after {timeout}s timeout")
+        return False
         
 if __name__ == "__main__":
     # Test execution
@@ -0,0 +1,151 @@
+import logging
+import os
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Conta padrão de cada plataforma (a configuração antiga: um state file e um par de credenciais)
+DEFAULT_STATE_FILES = {
+    "instagram": "instagram_state.json",
+    "twitter": "twitter_state.json",
+    "facebook": "facebook_state.json",
+}
+DEFAULT_CREDENTIALS = {
+    "instagram": ("INSTAGRAM_USER", "INSTAGRAM_PASS"),
+    "twitter": ("TWITTER_USER", "TWITTER_PASS"),
+    "facebook": ("FACEBOOK_USER", "FACEBOOK_PASS"),
+}
+
+def platform_accounts(settings, platform: str) -> list:
+    """
+    Accounts configured for a platform: ACCOUNTS[platform] (JSON list of
+    {"name", "state_file", "user", "password"}) or, when empty, the single
+    legacy account (<platform>_state.json + <PLATFORM>_USER/PASS).
+    """
+    configured = (settings.ACCOUNTS or {}).get(platform) or []
+    accounts = []
+    for i, item in enumerate(configured):
+        name = item.get("name") or f"{platform}_{i + 1}"
+        accounts.append({
+            "platform": platform,
+            "name": name,
+            "state_file": item.get("state_file") or f"{platform}_{name}_state.json",
+            "user": item.get("user", ""),
+            "password": item.get("password", ""),
+        })
+    if not accounts:
+        user_key, pass_key = DEFAULT_CREDENTIALS[platform]
+        accounts.append({
+            "platform": platform,
+            "name": "default",
+            "state_file": DEFAULT_STATE_FILES[platform],
+            "user": getattr(settings, user_key, ""),
+            "password": getattr(settings, pass_key, ""),
+        })
+    return accounts
+
+class AccountPool:
+    """
+    Rotates the accounts (state file + credentials) of one platform.
+
+    - strategy 'lru' hands out the account used longest ago; 'round_robin' cycles in order.
+    - report(account, 'rate_limited' / 'login_wall') puts the account on cooldown
+      (growing with consecutive throttles); 'challenge' removes it from rotation.
+    - A removed account comes back when its state file changes on disk
+      (e.g. refreshed with manual_login.py).
+    """
+
+    def __init__(self, platform: str, accounts: list, strategy: str = "lru", cooldown: float = 900, max_cooldown: float = 6 * 3600):
+        self.platform = platform
+        self.strategy = strategy
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.accounts = [
+            dict(account, last_used=0.0, cooldown_until=0.0, throttles=0, successes=0, in_use=0,
+                 disabled=False, disabled_mtime=None)
+            for account in accounts
+        ]
+        self._next = 0
+
+    @classmethod
+    def from_settings(cls, settings, platform: str) -> "AccountPool":
+        return cls(
+            platform,
+            platform_accounts(settings, platform),
+            strategy=settings.ACCOUNT_ROTATION,
+            cooldown=settings.ACCOUNT_COOLDOWN
+        )
+
+    def checkout(self) -> Optional[dict]:
+        """
+        Returns the next usable account. When every account is cooling down, the one that
+        leaves cooldown first (its rate limiter bucket is paused anyway); None only when
+        all accounts were removed.
+        """
+        now = time.monotonic()
+        available = [a for a in self.accounts if self._usable(a, now)]
+        if not available:
+            waiting = [a for a in self.accounts if not a["disabled"]]
+            if not waiting:
+                return None
+            available = [min(waiting, key=lambda a: a["cooldown_until"])]
+        if self.strategy == "round_robin":
+            for _ in range(len(self.accounts)):
+                account = self.accounts[self._next % len(self.accounts)]
+                self._next += 1
+                if account in available:
+                    break
+        else:
+            account = min(available, key=lambda a: (a["in_use"], a["last_used"]))
+        account["last_used"] = now
+        account["in_use"] += 1
+        return account
+
+    def release(self, account: dict):
+        account["in_use"] = max(0, account["in_use"] - 1)
+
+    def report_success(self, account: dict):
+        account["throttles"] = 0
+        account["successes"] += 1
+
+    def report(self, account: dict, signal: str):
+        """Records a throttle signal detected while using `account`."""
+        if signal == "challenge":
+            account["disabled"] = True
+            account["disabled_mtime"] = self._mtime(account["state_file"])
+            logger.error(f"🚫 [{self.platform}/{account['name']}] Challenge detected. Account removed from rotation "
+                         f"until {account['state_file']} is refreshed (manual_login.py).")
+            return
+        account["throttles"] += 1
+        cooldown = min(self.max_cooldown, self.base_cooldown * 2 ** (account["throttles"] - 1))
+        account["cooldown_until"] = time.monotonic() + cooldown
+        logger.warning(f"🧊 [{self.platform}/{account['name']}] {signal}: account cooling down for {cooldown:.0f}s.")
+
+    def _usable(self, account: dict, now: float) -> bool:
+        if account["disabled"]:
+            if self._mtime(account["state_file"]) == account["disabled_mtime"]:
+                return False
+            # Sessão renovada em disco: volta para a rotação
+            account["disabled"] = False
+            account["throttles"] = 0
+            account["cooldown_until"] = 0.0
+            logger.info(f"♻️ [{self.platform}/{account['name']}] State file refreshed. Account back in rotation.")
+        return account["cooldown_until"] <= now
+
+    @staticmethod
+    def _mtime(path: str):
+        return os.path.getmtime(path) if path and os.path.exists(path) else None
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            account["name"]: {
+                "disabled": account["disabled"],
+                "cooldown_for": round(max(0.0, account["cooldown_until"] - now), 1),
+                "throttles": account["throttles"],
+                "successes": account["successes"],
+                "in_use": account["in_use"],
+            }
+            for account in self.accounts
+        }
@@ -1,20 +1,39 @@
+import asyncio
+import logging
 import os
+import time
 from typing import Optional
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page, Playwright
 from src.database.connection import get_settings
+from src.scraper.core.request_policy import RequestPolicy, RequestStats
+from src.scraper.core.resource_watchdog import chromium_root_pids
+
+logger = logging.getLogger(__name__)
 
 class BrowserManager:
-    def __init__(self):
+    def __init__(self, playwright: Optional[Playwright] = None, request_stats: Optional[RequestStats] = None):
         self.settings = get_settings()
-        self.playwright: Optional[Playwright] = None
+        # Contadores das políticas de bloqueio de requisições (compartilhados no BrowserPool)
+        self.request_stats = request_stats or RequestStats()
+        # Um Playwright recebido de fora (BrowserPool) é compartilhado e não é parado em close()
+        self.playwright: Optional[Playwright] = playwright
+        self._owns_playwright = playwright is None
         self.browser: Optional[Browser] = None
         self.context: Optional[BrowserContext] = None
+        # Pool de contextos por arquivo de sessão: {storage_state: [entry, ...]} (ver acquire_page)
+        self._idle_contexts = {}
+        self._leased_pages = {}
+        # Processo principal do Chromium (amostrado pelo ResourceWatchdog) e trava de novas páginas durante um reinício
+        self.browser_pid: Optional[int] = None
+        self._accepting = asyncio.Event()
+        self._accepting.set()
 
     async def start(self):
         if not self.playwright:
             self.playwright = await async_playwright().start()
 
         if not self.browser:
+            known_pids = chromium_root_pids()
             # Argumentos de inicialização focados em ocultar a automação e habilitar vídeo
             self.browser = await self.playwright.chromium.launch(
                 headless=self.settings.HEADLESS,
@@ -32,6 +51,8 @@ class BrowserManager:
                     "--password-store=basic"
                 ]
             )
+            new_pids = chromium_root_pids() - known_pids
+            self.browser_pid = new_pids.pop() if len(new_pids) == 1 else None
 
     async def new_context(self, storage_state: Optional[str] = None) -> BrowserContext:
         if not self.browser:
@@ -98,7 +119,145 @@ class BrowserManager:
             self.context = await self.new_context()
         return await self.context.new_page()
 
-    async def close(self):
+    # ------------------------------------------------------------------
+    # Pool de contextos: cada spider pega uma página de um contexto já logado e
+    # aquecido (cookies, cache) e a devolve no fim. O contexto é reciclado depois de
+    # BROWSER_CONTEXT_MAX_PAGES páginas, em erro/bloqueio, ou quando o arquivo de
+    # sessão muda em disco (ex.: manual_login.py).
+    # ------------------------------------------------------------------
+
+    async def acquire_page(self, storage_state: Optional[str] = None, platform: Optional[str] = None) -> Page:
+        """
+        Opens a page on a pooled context for `storage_state`. Give it back with release_page().
+        `platform` selects the request-blocking policy installed on new contexts.
+        """
+        await self._accepting.wait()
+        entry = await self._checkout_context(storage_state, platform)
+        try:
+            page = await entry["context"].new_page()
+        except Exception:
+            # Contexto morto (ex.: navegador reiniciado): descarta e tenta com um novo
+            await self._close_entry(entry)
+            entry = await self._new_entry(storage_state, platform)
+            page = await entry["context"].new_page()
+        if entry["policy"]:
+            await entry["policy"].prepare_page(page)
+        entry["pages"] += 1
+        self._leased_pages[page] = entry
+        return page
+
+    async def release_page(self, page: Page, recycle: bool = False):
+        """Closes the page and returns its context to the pool (or closes it when `recycle` or worn out)."""
+        entry = self._leased_pages.pop(page, None)
+        try:
+            await page.close()
+        except Exception:
+            pass
+        if entry is None:
+            return
+
+        idle = self._idle_contexts.setdefault(entry["storage_state"], [])
+        if (recycle or entry["closed"] or entry["recycle"]
+                or entry["pages"] >= self.settings.BROWSER_CONTEXT_MAX_PAGES
+                or entry["state_mtime"] != self._state_mtime(entry["storage_state"])
+                or len(idle) >= self.settings.BROWSER_CONTEXT_POOL_SIZE):
+            await self._close_entry(entry)
+        else:
+            idle.append(entry)
+
+    async def _checkout_context(self, storage_state: Optional[str], platform: Optional[str] = None) -> dict:
+        idle = self._idle_contexts.setdefault(storage_state, [])
+        while idle:
+            entry = idle.pop()
+            if not entry["closed"] and entry["state_mtime"] == self._state_mtime(storage_state):
+                return entry
+            await self._close_entry(entry)
+        return await self._new_entry(storage_state, platform)
+
+    async def _new_entry(self, storage_state: Optional[str], platform: Optional[str] = None) -> dict:
+        entry = {
+            "storage_state": storage_state,
+            "state_mtime": self._state_mtime(storage_state),
+            "context": await self.new_context(storage_state=storage_state),
+            "pages": 0,
+            "closed": False,
+            "recycle": False,
+            "policy": None,
+        }
+        entry["context"].on("close", lambda _: entry.update(closed=True))
+        if platform:
+            entry["policy"] = RequestPolicy(
+                platform,
+                self.request_stats,
+                enabled=self.settings.REQUEST_POLICY != "off",
+                skip_rules=self.settings.REQUEST_POLICY_SKIP_RULES,
+                intercept=self.settings.REQUEST_POLICY_INTERCEPT
+            )
+            await entry["policy"].install(entry["context"])
+        return entry
+
+    async def _close_entry(self, entry: dict):
+        if entry["closed"]:
+            return
+        entry["closed"] = True
+        try:
+            await entry["context"].close()
+        except Exception as e:
+            logger.warning(f"Failed to close browser context ({entry['storage_state']}): {e}")
+
+    async def recycle_contexts(self):
+        """Closes the idle pooled contexts now and the leased ones when their page is given back (watchdog)."""
+        for idle in self._idle_contexts.values():
+            while idle:
+                await self._close_entry(idle.pop())
+        for entry in self._leased_pages.values():
+            entry["recycle"] = True
+
+    async def restart_browser(self, pids: Optional[list] = None, drain_timeout: float = 120):
+        """
+        Relaunches Chromium (watchdog). New pages wait; the pages in use get up to
+        `drain_timeout` seconds to be given back before the browser is closed.
+        """
+        self._accepting.clear()
+        try:
+            deadline = time.monotonic() + drain_timeout
+            while self._leased_pages and time.monotonic() < deadline:
+                await asyncio.sleep(0.5)
+            await self._close_browser()
+            await self.start()
+        finally:
+            self._accepting.set()
+
+    @property
+    def open_contexts(self) -> int:
+        leased = {id(entry) for entry in self._leased_pages.values()}
+        return len(leased) + sum(len(idle) for idle in self._idle_contexts.values()) + (1 if self.context else 0)
+
+    def interrupted(self) -> bool:
+        """A single browser has no instance to fail over to (see BrowserPool.interrupted)."""
+        return False
+
+    @property
+    def leased_pages(self) -> int:
+        return len(self._leased_pages)
+
+    @staticmethod
+    def _state_mtime(storage_state: Optional[str]):
+        if storage_state and os.path.exists(storage_state):
+            return os.path.getmtime(storage_state)
+        return None
+
+    async def _close_browser(self):
+        for entry in list(self._leased_pages.values()) + [e for idle in self._idle_contexts.values() for e in idle]:
+            await self._close_entry(entry)
+        self._leased_pages.clear()
+        self._idle_contexts.clear()
         if self.context: await self.context.close()
         if self.browser: await self.browser.close()
-        if self.playwright: await self.playwright.stop()
+        self.context = None
+        self.browser = None
+        self.browser_pid = None
+
+    async def close(self):
+        await self._close_browser()
+        if self.playwright and self._owns_playwright: await self.playwright.stop()
@@ -0,0 +1,180 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+from playwright.async_api import async_playwright, BrowserContext, Page, Playwright
+from src.database.connection import get_settings
+from src.scraper.core.browser import BrowserManager
+from src.scraper.core.request_policy import RequestStats
+
+logger = logging.getLogger(__name__)
+
+class BrowserPool:
+    """
+    N independent Chromium processes behind the BrowserManager interface
+    (acquire_page / release_page / new_context), so the spiders do not change.
+
+    - Each page goes to the instance with the fewest pages in use.
+    - A health loop probes every instance (open and close a context) every
+      `health_interval` seconds; an instance that disconnects (crash) or does not
+      answer within `health_timeout` is killed and relaunched.
+    - Pages that were open on a failed instance are marked as interrupted: the
+      caller asks interrupted() after a failed scrape and runs it again on a
+      healthy instance instead of counting it as a link failure.
+    """
+
+    def __init__(self, size: int = 0, health_interval: float = 30, health_timeout: float = 15):
+        self.settings = get_settings()
+        self.size = size if size and size > 0 else (os.cpu_count() or 1)
+        self.health_interval = health_interval
+        self.health_timeout = health_timeout
+        self.playwright: Optional[Playwright] = None
+        self.instances = []
+        self.restarts = 0
+        self.request_stats = RequestStats()
+        self._owners = {}          # page -> (instance index, manager, task)
+        self._interrupted = set()  # tasks whose page was on an instance that failed
+        self._restarting = set()
+        self._health_task = None
+        # Lançamentos em série: o PID de cada Chromium é o processo novo que apareceu (ver BrowserManager.start)
+        self._launch_lock = asyncio.Lock()
+
+    async def start(self):
+        if self.instances:
+            return
+        self.playwright = await async_playwright().start()
+        self.instances = await asyncio.gather(*(self._launch(i) for i in range(self.size)))
+        self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f"🧩 Browser pool started with {self.size} Chromium instances.")
+
+    async def _launch(self, index: int) -> BrowserManager:
+        manager = BrowserManager(self.playwright, self.request_stats)
+        async with self._launch_lock:
+            await manager.start()
+        manager.browser.on("disconnected", lambda _: self._on_disconnected(index, manager))
+        return manager
+
+    def _on_disconnected(self, index: int, manager: BrowserManager):
+        # Ignora instâncias já substituídas ou fechadas de propósito
+        if index < len(self.instances) and self.instances[index] is manager and index not in self._restarting:
+            logger.error(f"💥 Chromium instance {index} disconnected (crash). Restarting...")
+            asyncio.create_task(self._restart(index, manager))
+
+    async def acquire_page(self, storage_state: Optional[str] = None, platform: Optional[str] = None) -> Page:
+        if not self.instances:
+            await self.start()
+        index = self._least_loaded()
+        manager = self.instances[index]
+        page = await manager.acquire_page(storage_state, platform)
+        self._owners[page] = (index, manager, asyncio.current_task())
+        return page
+
+    async def release_page(self, page: Page, recycle: bool = False):
+        owner = self._owners.pop(page, None)
+        if owner is None:
+            return
+        _, manager, _ = owner
+        try:
+            await asyncio.wait_for(manager.release_page(page, recycle=recycle), timeout=self.health_timeout)
+        except Exception as e:
+            logger.warning(f"Failed to release page on a browser instance: {e}")
+
+    def interrupted(self) -> bool:
+        """True (once) when the current task's page was on an instance that crashed or hung."""
+        task = asyncio.current_task()
+        if task in self._interrupted:
+            self._interrupted.discard(task)
+            return True
+        return False
+
+    async def new_context(self, storage_state: Optional[str] = None) -> BrowserContext:
+        if not self.instances:
+            await self.start()
+        return await self.instances[self._least_loaded()].new_context(storage_state=storage_state)
+
+    def _least_loaded(self) -> int:
+        healthy = [i for i in range(len(self.instances)) if i not in self._restarting] or list(range(len(self.instances)))
+        return min(healthy, key=lambda i: self.instances[i].leased_pages)
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for index, manager in enumerate(list(self.instances)):
+                if index in self._restarting:
+                    continue
+                try:
+                    await asyncio.wait_for(self._probe(manager), timeout=self.health_timeout)
+                except Exception as e:
+                    logger.error(f"🩺 Chromium instance {index} failed its health check ({str(e) or 'timeout'}). Restarting...")
+                    await self._restart(index, manager)
+
+    @staticmethod
+    async def _probe(manager: BrowserManager):
+        if not manager.browser or not manager.browser.is_connected():
+            raise RuntimeError("browser disconnected")
+        context = await manager.browser.new_context()
+        await context.close()
+
+    async def _restart(self, index: int, manager: BrowserManager):
+        if index in self._restarting or self.instances[index] is not manager:
+            return
+        self._restarting.add(index)
+        try:
+            # Links em andamento nesta instância serão refeitos em outra
+            for page, (_, owner, task) in list(self._owners.items()):
+                if owner is manager:
+                    self._interrupted.add(task)
+                    self._owners.pop(page, None)
+            try:
+                await asyncio.wait_for(manager.close(), timeout=self.health_timeout)
+            except Exception as e:
+                logger.warning(f"Chromium instance {index} did not close cleanly: {e}")
+            self.instances[index] = await self._launch(index)
+            self.restarts += 1
+            logger.info(f"🔁 Chromium instance {index} restarted (total restarts: {self.restarts}).")
+        except Exception as e:
+            logger.error(f"Failed to restart Chromium instance {index}: {e}")
+        finally:
+            self._restarting.discard(index)
+
+    async def recycle_contexts(self):
+        for manager in self.instances:
+            await manager.recycle_contexts()
+
+    async def restart_browser(self, pids: Optional[list] = None):
+        """Restarts the instances whose Chromium process is in `pids` (all of them when None)."""
+        for index, manager in enumerate(list(self.instances)):
+            if pids is None or manager.browser_pid in pids:
+                await self._restart(index, manager)
+
+    @property
+    def open_contexts(self) -> int:
+        return sum(manager.open_contexts for manager in self.instances)
+
+    @property
+    def leased_pages(self) -> int:
+        return sum(manager.leased_pages for manager in self.instances)
+
+    def snapshot(self) -> dict:
+        return {
+            "instances": len(self.instances),
+            "pages_in_use": [manager.leased_pages for manager in self.instances],
+            "restarts": self.restarts,
+        }
+
+    async def close(self):
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        # Fechamento proposital: não dispara reinício
+        self._restarting.update(range(len(self.instances)))
+        for manager in self.instances:
+            try:
+                await asyncio.wait_for(manager.close(), timeout=self.health_timeout)
+            except Exception as e:
+                logger.warning(f"Chromium instance did not close cleanly: {e}")
+        self.instances = []
+        self._restarting.clear()
+        if self.playwright:
+            await self.playwright.stop()
+            self.playwright = None
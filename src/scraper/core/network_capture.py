@@ -0,0 +1,309 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Optional
+from playwright.async_api import Page, Response
+from src.scraper.core.page_extractor import POLL_MS, extract_post
+
+logger = logging.getLogger(__name__)
+
+# Respostas (xhr/fetch) que trazem os dados do post, por plataforma
+RESPONSE_URL_PATTERNS = {
+    "instagram": (r"/graphql/query", r"/api/graphql", r"/api/v1/media/\d+/info"),
+    "twitter": (r"/i/api/graphql/[^/]+/(TweetDetail|TweetResultByRestId)",),
+    "facebook": (r"/api/graphql/",),
+}
+# Identificador do post na URL da página (o payload é procurado por ele)
+POST_ID_PATTERNS = {
+    "instagram": r"/(?:p|reels?|tv)/([\w-]+)",
+    "twitter": r"/status(?:es)?/(\d+)",
+    "facebook": r"(?:story_fbid=|/posts/|/videos/|fbid=)(\d+)",
+}
+# Prefixo anti-JSON-hijacking das respostas do Facebook
+JSON_PREFIX = "for (;;);"
+# Campos do post que o payload pode trazer (sobrepõem os do DOM em merge_post)
+POST_FIELDS = ("caption", "author", "location", "media", "published_at")
+# Com todos estes no payload, o DOM não precisa esperar o post renderizar
+REQUIRED_FIELDS = ("caption", "author", "published_at")
+
+def post_id_from_url(platform: str, url: str) -> Optional[str]:
+    match = re.search(POST_ID_PATTERNS[platform], url or "")
+    return match.group(1) if match else None
+
+def load_payloads(body: str) -> list:
+    """JSON documents in a response body (GraphQL responses may stream one document per line)."""
+    body = body.strip()
+    if body.startswith(JSON_PREFIX):
+        body = body[len(JSON_PREFIX):]
+    try:
+        return [json.loads(body)]
+    except ValueError:
+        pass
+    payloads = []
+    for line in body.splitlines():
+        line = line.strip()
+        if line.startswith(JSON_PREFIX):
+            line = line[len(JSON_PREFIX):]
+        try:
+            payloads.append(json.loads(line))
+        except ValueError:
+            continue
+    return payloads
+
+def _walk(node):
+    """Every dict inside a JSON document, depth first."""
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            yield node
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+
+def _iso(timestamp) -> Optional[str]:
+    if not timestamp:
+        return None
+    return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).isoformat()
+
+def parse_instagram(payload, post_id: Optional[str]) -> Optional[dict]:
+    """Media from /api/v1/media/<id>/info or GraphQL (xdt_shortcode_media / web_info items)."""
+    for node in _walk(payload):
+        code = node.get("code") or node.get("shortcode")
+        if not code or (post_id and code != post_id):
+            continue
+        if "user" in node and "media_type" in node:
+            # API v1 / xdt_api__v1__media__shortcode__web_info
+            caption = (node.get("caption") or {}).get("text") or ""
+            media = {1: "image", 2: "video", 8: "carousel"}.get(node.get("media_type"))
+            return {
+                "caption": caption,
+                "author": (node.get("user") or {}).get("username") or "",
+                "location": (node.get("location") or {}).get("name") or "",
+                "media": media,
+                "published_at": _iso(node.get("taken_at")),
+            }
+        if "owner" in node and ("edge_media_to_caption" in node or "taken_at_timestamp" in node):
+            # GraphQL antigo (xdt_shortcode_media)
+            edges = (node.get("edge_media_to_caption") or {}).get("edges") or []
+            caption = edges[0]["node"].get("text", "") if edges else ""
+            media = "carousel" if "Sidecar" in (node.get("__typename") or "") else ("video" if node.get("is_video") else "image")
+            return {
+                "caption": caption,
+                "author": (node.get("owner") or {}).get("username") or "",
+                "location": (node.get("location") or {}).get("name") or "",
+                "media": media,
+                "published_at": _iso(node.get("taken_at_timestamp")),
+            }
+    return None
+
+def parse_twitter(payload, post_id: Optional[str]) -> Optional[dict]:
+    """Tweet from TweetDetail / TweetResultByRestId (the one whose rest_id is the status id)."""
+    for node in _walk(payload):
+        legacy = node.get("legacy")
+        if not isinstance(legacy, dict) or "full_text" not in legacy:
+            continue
+        if post_id and node.get("rest_id") != post_id:
+            continue
+        # Tweets longos vêm inteiros em note_tweet; full_text termina com o link t.co da mídia
+        note = ((node.get("note_tweet") or {}).get("note_tweet_results") or {}).get("result") or {}
+        text = note.get("text")
+        if not text:
+            start, end = legacy.get("display_text_range") or (0, len(legacy["full_text"]))
+            text = legacy["full_text"][start:end]
+        user = ((node.get("core") or {}).get("user_results") or {}).get("result") or {}
+        screen_name = (user.get("core") or {}).get("screen_name") or (user.get("legacy") or {}).get("screen_name")
+        media = ((legacy.get("extended_entities") or {}).get("media") or [{}])[0].get("type")
+        published = None
+        if legacy.get("created_at"):
+            published = datetime.strptime(legacy["created_at"], "%a %b %d %H:%M:%S %z %Y").isoformat()
+        return {
+            "caption": text,
+            "author": f"@{screen_name}" if screen_name else "",
+            "location": "",
+            "media": {"photo": "image", "animated_gif": "video"}.get(media, media),
+            "published_at": published,
+        }
+    return None
+
+def parse_facebook(payload, post_id: Optional[str]) -> Optional[dict]:
+    """First story with a message (matching post_id when the URL has a numeric id). Best effort: the schema changes often."""
+    for node in _walk(payload):
+        message = node.get("message")
+        if not isinstance(message, dict) or not message.get("text"):
+            continue
+        if post_id and post_id not in (str(node.get("post_id")), str(node.get("id"))):
+            continue
+        actors = node.get("actors") or []
+        creation = next((n["creation_time"] for n in _walk(node) if isinstance(n.get("creation_time"), int)), None)
+        attachment = json.dumps(node.get("attachments") or [])
+        media = "video" if '"Video"' in attachment else ("image" if '"Photo"' in attachment else None)
+        return {
+            "caption": message["text"],
+            "author": actors[0].get("name", "") if actors else "",
+            "location": "",
+            "media": media,
+            "published_at": _iso(creation),
+        }
+    return None
+
+PARSERS = {"instagram": parse_instagram, "twitter": parse_twitter, "facebook": parse_facebook}
+
+def parse_body(platform: str, body: str, post_id: Optional[str] = None) -> Optional[dict]:
+    """Post data found in a raw response body, or None (pure: used by the listener and on recorded fixtures)."""
+    for payload in load_payloads(body):
+        try:
+            post = PARSERS[platform](payload, post_id)
+        except (KeyError, TypeError, ValueError, IndexError, AttributeError):
+            continue
+        if post and post["caption"]:
+            return post
+    return None
+
+class PayloadListener:
+    """
+    Listens to the page's API/GraphQL responses (RESPONSE_URL_PATTERNS) from before the
+    navigation and parses the post out of them: caption, author, media type and publication
+    date usually arrive here before the DOM is hydrated. The spider reads it first
+    (read_post); the DOM extraction only fills what it left out.
+
+    With `record_dir`, every matching body is also saved there, to be replayed with
+    `python -m src.scraper.core.network_capture <platform> <file> [post_id]`.
+    """
+
+    def __init__(self, page: Page, platform: str, url: str, record_dir: str = ""):
+        self.page = page
+        self.platform = platform
+        self.post_id = post_id_from_url(platform, url)
+        self.record_dir = record_dir
+        self.patterns = [re.compile(p) for p in RESPONSE_URL_PATTERNS[platform]]
+        self.post = None
+        self.responses = 0
+        self._found = asyncio.Event()
+        self._tasks = set()
+        self._started = time.monotonic()
+
+    def attach(self):
+        self.page.on("response", self._on_response)
+
+    def detach(self):
+        try:
+            self.page.remove_listener("response", self._on_response)
+        except Exception:
+            pass
+        for task in self._tasks:
+            task.cancel()
+
+    def _on_response(self, response: Response):
+        if self.post is not None or response.request.resource_type not in ("xhr", "fetch"):
+            return
+        if not any(p.search(response.url) for p in self.patterns):
+            return
+        task = asyncio.create_task(self._read(response))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _read(self, response: Response):
+        try:
+            body = await response.text()
+        except Exception:
+            return # Resposta descartada (página fechada, redirecionamento)
+        self.responses += 1
+        if self.record_dir:
+            self._record(body)
+        post = parse_body(self.platform, body, self.post_id)
+        if post and self.post is None:
+            post["source"] = "network"
+            post["ms"] = round((time.monotonic() - self._started) * 1000)
+            self.post = post
+            self._found.set()
+            logger.info(f"📡 [{self.platform}] Post data from API payload after {post['ms']}ms ({post['media'] or 'media unknown'}).")
+
+    def _record(self, body: str):
+        try:
+            os.makedirs(self.record_dir, exist_ok=True)
+            name = f"{self.platform}_{self.post_id or 'unknown'}_{self.responses}.json"
+            with open(os.path.join(self.record_dir, name), "w", encoding="utf-8") as f:
+                f.write(body)
+        except OSError as e:
+            logger.warning(f"Could not record payload: {e}")
+
+    async def result(self, timeout: float = 0) -> Optional[dict]:
+        """The parsed post, waiting up to `timeout` seconds for a response still on its way."""
+        if self.post is None and timeout > 0:
+            try:
+                await asyncio.wait_for(self._found.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.post
+
+def merge_post(dom: dict, network: Optional[dict]) -> dict:
+    """DOM extraction (extract_post) with the network payload's fields on top; DOM values fill the gaps."""
+    if not network:
+        return dict(dom, source="dom")
+    merged = dict(dom, source="network")
+    for field in POST_FIELDS:
+        if network.get(field):
+            merged[field] = network[field]
+    if network.get("caption"):
+        merged["caption_source"] = "network"
+    return merged
+
+def fill_gaps(post: dict, dom: dict, min_caption: int = 0) -> dict:
+    """`post` with the fields it still lacks taken from a later DOM read (a caption up to `min_caption` chars counts as missing)."""
+    filled = dict(post)
+    for field in POST_FIELDS:
+        if not filled.get(field) and dom.get(field):
+            filled[field] = dom[field]
+    if len(filled.get("caption") or "") <= min_caption and len(dom.get("caption") or "") > len(filled.get("caption") or ""):
+        filled["caption"], filled["caption_source"] = dom["caption"], dom["caption_source"]
+    return filled
+
+async def read_post(page: Page, platform: str, payload: Optional[PayloadListener], wait: float, timeout: float) -> dict:
+    """
+    Payload first: waits up to `wait` seconds for the post's API/GraphQL response while
+    re-checking the page state every POLL_MS (extract_post with no wait), so a 404, login
+    wall or challenge returns at once instead of after the whole wait; a post the DOM
+    already shows in full stops the wait too. Only when the payload left REQUIRED_FIELDS
+    missing does the DOM read wait (up to `timeout` ms) for the post to render; its
+    values fill the gaps and never replace the payload's (merge_post).
+    """
+    if payload is None:
+        return merge_post(await extract_post(page, platform, timeout=timeout), None)
+    deadline = time.monotonic() + wait
+    while True:
+        dom = await extract_post(page, platform)
+        network = payload.post
+        if dom["state"] not in ("ok", "empty"):
+            return merge_post(dom, network) # Não encontrado ou bloqueio: não adianta esperar o payload
+        if network is not None or (dom["ready"] and _complete(dom)):
+            break # O payload chegou (não muda mais) ou o DOM já mostra o post inteiro
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        await payload.result(min(remaining, POLL_MS / 1000)) # Acorda assim que o payload chega
+
+    if _complete(network) or dom["ready"]:
+        post = merge_post(dom, network)
+    else:
+        post = merge_post(await extract_post(page, platform, timeout=timeout), payload.post)
+    if _complete(network) and post["state"] == "empty":
+        post["state"] = "ok" # O post chegou pela API: a página só ainda não renderizou
+    return post
+
+def _complete(post: Optional[dict]) -> bool:
+    return bool(post) and all(post.get(field) for field in REQUIRED_FIELDS)
+
+if __name__ == "__main__":
+    # Reprocessa um payload gravado (NETWORK_CAPTURE_RECORD_DIR) sem navegador
+    if len(sys.argv) < 3:
+        print("Uso: python -m src.scraper.core.network_capture <plataforma> <arquivo.json> [post_id]")
+        sys.exit(1)
+    with open(sys.argv[2], encoding="utf-8") as f:
+        parsed = parse_body(sys.argv[1], f.read(), sys.argv[3] if len(sys.argv) > 3 else None)
+    print(json.dumps(parsed, ensure_ascii=False, indent=2))
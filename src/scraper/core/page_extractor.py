@@ -0,0 +1,193 @@
+import logging
+import re
+import time
+from playwright.async_api import Page
+from src.scraper.core.rate_limiter import THROTTLE_URL_PATTERNS, THROTTLE_TEXT_PATTERNS
+from src.scraper.core.session_manager import LOGGED_OUT_SELECTORS, LOGIN_URL_FRAGMENTS
+
+logger = logging.getLogger(__name__)
+
+# Intervalo entre leituras enquanto o post não renderiza (ms)
+POLL_MS = 150
+
+# Seletores por plataforma. Listas são tentadas em ordem; "ready" diz que o post já renderizou
+# e "content" ausente no fim da espera vira o estado "empty" (página vazia do X)
+PLATFORM_FIELDS = {
+    "instagram": {
+        "ready": "article h1, article span._ap30, article time[datetime]",
+        "author": ["header a[role='link']"],
+        "location": ["header a[href*='/explore/locations/']"],
+        "caption": ["article h1, article span._ap30"],
+        "caption_min": 0,
+        "meta_caption": True, # Sem legenda no DOM: usa o og:description ("... : legenda")
+        "date": "article time[datetime]",
+        "not_found": ["Sorry, this page isn't available", "Esta página não está disponível"],
+    },
+    "twitter": {
+        "ready": "[data-testid='tweetText'], [data-testid='error-detail']",
+        "content": "article, [data-testid='error-detail']",
+        "author": ["article[data-testid='tweet'] [data-testid='User-Name']"],
+        "author_handle": True, # "Nome @usuario · 2h" -> "@usuario"
+        "caption": ["[data-testid='tweetText']"],
+        "caption_min": 0,
+        "date": "article[data-testid='tweet'] time[datetime]",
+        "not_found": [
+            "Hmm...this page doesn't exist",
+            "Página não encontrada",
+            "Ih, esta página não existe",
+            "Esta conta não existe",
+            "This account doesn't exist",
+        ],
+    },
+    "facebook": {
+        "ready": "[role='dialog'], div[role='main'], article, div[data-ad-preview='message']",
+        "author": ["[role='dialog'] h2 strong, [role='dialog'] h3 strong", "div[role='article'] h2 strong, div[role='article'] h3 strong"],
+        "caption": [
+            "[role='dialog'] [data-ad-preview='message']",
+            "[role='dialog'] div[dir='auto']",
+            "div[data-ad-preview='message']",
+            "div[role='article'] div[dir='auto']",
+        ],
+        "caption_min": 5, # Textos curtos (botões, "Curtir") não param a busca
+        "date": "[role='dialog'] time[datetime], [role='dialog'] abbr[data-utime], abbr[data-utime]",
+        "not_found": ["This content isn't available right now", "Este conteúdo não está disponível no momento"],
+    },
+}
+
+# Estado da página e metadados do post numa única ida ao navegador. Relê a cada POLL_MS até
+# o estado ficar claro (bloqueio, 404, post renderizado) ou o timeout acabar.
+_EXTRACT_JS = """
+async (cfg) => {
+    const norm = s => (s || '').replace(/\\s+/g, ' ').trim().toLowerCase();
+    const text = el => el ? (el.innerText || el.textContent || '').trim() : '';
+    const first = selectors => {
+        for (const selector of selectors || []) {
+            const value = text(document.querySelector(selector));
+            if (value) return value;
+        }
+        return '';
+    };
+
+    const pageState = () => {
+        const url = location.href;
+        for (const [fragment, signal] of cfg.throttle_urls) if (url.includes(fragment)) return signal;
+        for (const fragment of cfg.login_urls) if (url.includes(fragment)) return 'login_wall';
+        const body = norm(document.body ? document.body.innerText : '');
+        for (const pattern of cfg.not_found) if (body.includes(norm(pattern))) return 'not_found';
+        for (const [pattern, signal] of cfg.throttle_texts) if (body.includes(norm(pattern))) return signal;
+        if (cfg.logged_out_css && document.querySelector(cfg.logged_out_css)) return 'login_wall';
+        for (const [tag, label] of cfg.logged_out_texts) {
+            if (Array.from(document.querySelectorAll(tag)).some(el => norm(el.innerText).includes(norm(label)))) return 'login_wall';
+        }
+        return null;
+    };
+
+    const fields = () => {
+        let caption = '', source = null;
+        for (const selector of cfg.caption) {
+            const value = text(document.querySelector(selector));
+            if (!value) continue;
+            caption = value;
+            source = selector;
+            if (value.length > cfg.caption_min) break;
+        }
+        if (!caption && cfg.meta_caption) {
+            const meta = document.querySelector('meta[property="og:description"]');
+            const content = meta && meta.getAttribute('content');
+            if (content && content.includes(':')) {
+                caption = content.split(':').slice(1).join(':').trim();
+                source = 'og:description';
+            }
+        }
+        let author = first(cfg.author);
+        if (author && cfg.author_handle) {
+            const handle = author.match(/@\\w+/);
+            author = handle ? handle[0] : author;
+        }
+        let published = null;
+        const dateEl = cfg.date && document.querySelector(cfg.date);
+        if (dateEl) {
+            const utime = dateEl.getAttribute('data-utime');
+            published = dateEl.getAttribute('datetime') || (utime ? new Date(Number(utime) * 1000).toISOString() : null);
+        }
+        const dialog = document.querySelector("[role='dialog']");
+        const root = dialog || document.querySelector('article') || document;
+        const media = root.querySelector('video') ? 'video' : (root.querySelector('img') ? 'image' : null);
+        return {author, location: first(cfg.location), caption, caption_source: source,
+                published_at: published, media, dialog: !!dialog, url: location.href};
+    };
+
+    const deadline = Date.now() + cfg.timeout;
+    while (true) {
+        const state = pageState();
+        const ready = !!(cfg.ready && document.querySelector(cfg.ready));
+        if (state || ready || Date.now() >= deadline) {
+            let final = state || 'ok';
+            if (!state && cfg.content && !document.querySelector(cfg.content)) final = 'empty';
+            return {state: final, ready, ...fields()};
+        }
+        await new Promise(resolve => setTimeout(resolve, cfg.poll));
+    }
+}
+"""
+
+def _split_logged_out(selector: str) -> tuple:
+    """Splits a Playwright selector list into plain CSS and (tag, text) pairs for `tag:has-text('text')`."""
+    css, texts = [], []
+    for part in (selector or "").split(","):
+        part = part.strip()
+        match = re.fullmatch(r"(\w+):has-text\('([^']*)'\)", part)
+        if match:
+            texts.append([match.group(1), match.group(2)])
+        elif part:
+            css.append(part)
+    return ", ".join(css), texts
+
+def _config(platform: str) -> dict:
+    fields = PLATFORM_FIELDS[platform]
+    logged_out_css, logged_out_texts = _split_logged_out(LOGGED_OUT_SELECTORS.get(platform))
+    return {
+        "ready": fields.get("ready"),
+        "content": fields.get("content"),
+        "author": fields.get("author", []),
+        "author_handle": fields.get("author_handle", False),
+        "location": fields.get("location", []),
+        "caption": fields.get("caption", []),
+        "caption_min": fields.get("caption_min", 0),
+        "meta_caption": fields.get("meta_caption", False),
+        "date": fields.get("date"),
+        "not_found": fields.get("not_found", []),
+        "throttle_urls": list(THROTTLE_URL_PATTERNS.get(platform, {}).items()),
+        "throttle_texts": list(THROTTLE_TEXT_PATTERNS.get(platform, {}).items()),
+        "login_urls": list(LOGIN_URL_FRAGMENTS.get(platform, ())),
+        "logged_out_css": logged_out_css,
+        "logged_out_texts": logged_out_texts,
+        "poll": POLL_MS,
+    }
+
+_CONFIGS = {platform: _config(platform) for platform in PLATFORM_FIELDS}
+
+async def extract_post(page: Page, platform: str, timeout: float = 0) -> dict:
+    """
+    Reads the page state and the post metadata in a single page.evaluate.
+
+    Returns {"state", "ready", "author", "location", "caption", "caption_source",
+    "published_at", "media", "dialog", "url", "ms"}. `state` is "ok", "not_found",
+    a throttle signal ("login_wall", "challenge", "rate_limited") or "empty".
+    With `timeout` (ms) the page is re-read in place until the post renders or a
+    state other than "ok" shows up.
+    """
+    started = time.perf_counter()
+    config = dict(_CONFIGS[platform], timeout=timeout)
+    try:
+        post = await page.evaluate(_EXTRACT_JS, config)
+    except Exception as e:
+        # Redirecionamento (login, checkpoint) durante a leitura: lê de novo na página nova
+        if "context was destroyed" not in str(e):
+            raise
+        await page.wait_for_load_state("domcontentloaded")
+        post = await page.evaluate(_EXTRACT_JS, config)
+    post["ms"] = round((time.perf_counter() - started) * 1000)
+    logger.debug(f"[{platform}] Page state {post['state']} in {post['ms']}ms "
+                 f"(caption via {post['caption_source']}, author {post['author']!r}, date {post['published_at']})")
+    return post
@@ -0,0 +1,178 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# Sinais de bloqueio por plataforma: trechos de URL (redirecionamentos) e textos exibidos na página
+THROTTLE_URL_PATTERNS = {
+    "instagram": {"/accounts/login": "login_wall", "/challenge": "challenge", "/accounts/suspended": "challenge"},
+    "twitter": {"/login": "login_wall", "/account/access": "challenge", "/i/flow/login": "login_wall"},
+    "facebook": {"/login": "login_wall", "/checkpoint": "challenge"},
+}
+THROTTLE_TEXT_PATTERNS = {
+    "instagram": {
+        "Please wait a few minutes before you try again": "rate_limited",
+        "Aguarde alguns minutos antes de tentar novamente": "rate_limited",
+    },
+    "twitter": {
+        "Something went wrong. Try reloading.": "rate_limited",
+        "Algo deu errado. Tente recarregar.": "rate_limited",
+        "Rate limit exceeded": "rate_limited",
+    },
+    "facebook": {
+        "You're Temporarily Blocked": "rate_limited",
+        "Você está temporariamente bloqueado": "rate_limited",
+    },
+}
+
+# Chave do bucket da plataforma inteira (somado entre todas as contas)
+PLATFORM_WIDE = "*"
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, up to `burst` stored."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """Waits for a token and returns how long the caller waited."""
+        started = time.monotonic()
+        # The lock keeps waiters in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return time.monotonic() - started
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AdaptiveRateLimiter:
+    """
+    Token buckets per (platform, account), shared by all spiders, plus one platform-wide
+    bucket per platform (`platform_limits_per_minute`): every navigation needs a token from
+    both, so adding accounts does not multiply the traffic the platform sees from this host.
+
+    - report_throttle(): halves the rate (down to `min_factor` of the configured one) and
+      pauses the bucket for an exponentially growing cooldown. "rate_limited" is a signal
+      about the whole platform, so it also slows down the platform-wide bucket.
+    - report_success(): after `recover_after` consecutive successes, the rate climbs back
+      by 10% of the configured value until it is reached again.
+
+    Platforms missing from a limits dict are not paced by that bucket.
+    """
+
+    def __init__(self, limits_per_minute: dict = None, burst: int = 3, min_factor: float = 0.1,
+                 recover_after: int = 10, base_backoff: float = 30, max_backoff: float = 900,
+                 platform_limits_per_minute: dict = None):
+        self.limits_per_minute = {k.lower(): v for k, v in (limits_per_minute or {}).items()}
+        self.platform_limits_per_minute = {k.lower(): v for k, v in (platform_limits_per_minute or {}).items()}
+        self.burst = burst
+        self.min_factor = min_factor
+        self.recover_after = recover_after
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._buckets = {}
+        self._state = {}
+        self.events = deque(maxlen=200)
+
+    def _configured(self, platform: str, account: str) -> Optional[float]:
+        limits = self.platform_limits_per_minute if account == PLATFORM_WIDE else self.limits_per_minute
+        return limits.get(platform)
+
+    def _bucket(self, platform: str, account: str) -> Optional[TokenBucket]:
+        per_minute = self._configured(platform, account)
+        if not per_minute:
+            return None
+        key = (platform, account)
+        if key not in self._buckets:
+            self._buckets[key] = TokenBucket(per_minute / 60.0, self.burst)
+            self._state[key] = {"successes": 0, "throttles": 0, "consecutive_throttles": 0}
+        return self._buckets[key]
+
+    async def acquire(self, platform: str, account: str = "default"):
+        """Waits for a token of the account bucket and then of the platform-wide one."""
+        for key in (account, PLATFORM_WIDE):
+            bucket = self._bucket(platform, key)
+            if bucket is None:
+                continue
+            waited = await bucket.acquire()
+            if waited > 1:
+                logger.info(f"⏱️ [{platform}/{key}] aguardou {waited:.1f}s pelo limite de taxa.")
+
+    def report_throttle(self, platform: str, account: str = "default", reason: str = "throttled"):
+        self._slow_down(platform, account, reason)
+        if reason == "rate_limited":
+            self._slow_down(platform, PLATFORM_WIDE, reason)
+
+    def _slow_down(self, platform: str, account: str, reason: str):
+        bucket = self._bucket(platform, account)
+        if bucket is None:
+            return
+        state = self._state[(platform, account)]
+        base_rate = self._configured(platform, account) / 60.0
+        state["throttles"] += 1
+        state["consecutive_throttles"] += 1
+        state["successes"] = 0
+
+        bucket.rate = max(base_rate * self.min_factor, bucket.rate * 0.5)
+        backoff = min(self.max_backoff, self.base_backoff * 2 ** (state["consecutive_throttles"] - 1))
+        bucket.paused_until = time.monotonic() + backoff
+        bucket.tokens = 0
+
+        event = {
+            "time": time.time(),
+            "platform": platform,
+            "account": account,
+            "reason": reason,
+            "rate_per_minute": round(bucket.rate * 60, 2),
+            "backoff_seconds": backoff,
+        }
+        self.events.append(event)
+        logger.warning(f"🐢 [{platform}/{account}] Bloqueio detectado ({reason}). Taxa reduzida para "
+                       f"{event['rate_per_minute']}/min, pausa de {backoff:.0f}s.")
+
+    def report_success(self, platform: str, account: str = "default"):
+        for key in (account, PLATFORM_WIDE):
+            self._recover(platform, key)
+
+    def _recover(self, platform: str, account: str):
+        bucket = self._bucket(platform, account)
+        if bucket is None:
+            return
+        state = self._state[(platform, account)]
+        base_rate = self._configured(platform, account) / 60.0
+        state["consecutive_throttles"] = 0
+        state["successes"] += 1
+        if bucket.rate < base_rate and state["successes"] >= self.recover_after:
+            bucket.rate = min(base_rate, bucket.rate + base_rate * 0.1)
+            state["successes"] = 0
+            logger.info(f"🚀 [{platform}/{account}] Recuperando taxa: {bucket.rate * 60:.2f}/min.")
+
+    def snapshot(self) -> dict:
+        """Current limits per (platform, account) and per platform ("<platform>/*"), for logging and tuning."""
+        now = time.monotonic()
+        return {
+            f"{platform}/{account}": {
+                "rate_per_minute": round(bucket.rate * 60, 2),
+                "configured_per_minute": self._configured(platform, account),
+                "paused_for": round(max(0.0, bucket.paused_until - now), 1),
+                "throttles": self._state[(platform, account)]["throttles"],
+            }
+            for (platform, account), bucket in self._buckets.items()
+        }
@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import time
+from typing import Optional
+from playwright.async_api import Page
+from src.database.connection import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Requisições que mudam o screenshot; xhr/fetch (long polling) e mídia (streaming) nunca "terminam"
+SETTLE_RESOURCE_TYPES = ("image", "stylesheet", "font")
+# Quadros de animação seguidos com o mesmo layout para considerar a página estável
+STABLE_FRAMES = 3
+
+# Imagens decodificadas e vídeos com o primeiro quadro, dentro do elemento alvo
+_MEDIA_READY_JS = """
+async (selector) => {
+    const root = (selector && document.querySelector(selector)) || document;
+    const images = Array.from(root.querySelectorAll('img')).filter(img => img.loading !== 'lazy' || img.complete);
+    const videos = Array.from(root.querySelectorAll('video'));
+    await Promise.all([
+        ...images.map(img => img.decode().catch(() => {})),
+        ...videos.map(video => video.readyState >= 2 ? null : new Promise(resolve => {
+            video.addEventListener('loadeddata', resolve, {once: true});
+            video.addEventListener('error', resolve, {once: true});
+        })),
+    ]);
+    return true;
+}
+"""
+
+# Posição/tamanho do alvo e altura do documento iguais por N quadros seguidos
+_LAYOUT_STABLE_JS = """
+([selector, frames]) => new Promise(resolve => {
+    const el = (selector && document.querySelector(selector)) || document.body;
+    let last = null, stable = 0;
+    const tick = () => {
+        const r = el.getBoundingClientRect();
+        const key = [r.x, r.y, r.width, r.height, document.documentElement.scrollHeight].join();
+        stable = key === last ? stable + 1 : 0;
+        last = key;
+        if (stable >= frames) return resolve(true);
+        requestAnimationFrame(tick);
+    };
+    requestAnimationFrame(tick);
+})
+"""
+
+class _InflightRequests:
+    """Tracks the page's in-flight requests of SETTLE_RESOURCE_TYPES (only those started after attach)."""
+
+    def __init__(self, page: Page):
+        self.page = page
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+
+    def attach(self):
+        self.page.on("request", self._on_request)
+        self.page.on("requestfinished", self._on_done)
+        self.page.on("requestfailed", self._on_done)
+
+    def detach(self):
+        for event, handler in (("request", self._on_request), ("requestfinished", self._on_done), ("requestfailed", self._on_done)):
+            try:
+                self.page.remove_listener(event, handler)
+            except Exception:
+                pass
+
+    def _on_request(self, request):
+        if request.resource_type in SETTLE_RESOURCE_TYPES:
+            self.inflight.add(request)
+            self.last_activity = time.monotonic()
+
+    def _on_done(self, request):
+        if request in self.inflight:
+            self.inflight.discard(request)
+            self.last_activity = time.monotonic()
+
+    async def wait_quiet(self, quiet: float):
+        while self.inflight or time.monotonic() - self.last_activity < quiet:
+            await asyncio.sleep(0.05)
+
+async def wait_until_ready(
+    page: Page,
+    selector: Optional[str] = None,
+    fallback: float = 1.0,
+    label: str = "",
+    media: bool = True,
+    layout: bool = True,
+    network: bool = True,
+    max_wait: Optional[float] = None,
+) -> bool:
+    """
+    Waits for the page to be ready for a capture instead of a fixed sleep:
+    `selector` visible, images decoded / first video frame, layout stable for a few
+    animation frames and no image/CSS/font request in flight for READINESS_QUIET_MS.
+
+    Everything shares one cap (READINESS_MAX_WAIT). If a condition is not met in time,
+    it falls back to the old fixed delay (`fallback`, minus the time already spent).
+    With READINESS_WAITS off it is just the old sleep. Returns True when the page was ready.
+    """
+    settings = get_settings()
+    if not settings.READINESS_WAITS:
+        await asyncio.sleep(fallback)
+        return True
+
+    cap = max_wait if max_wait is not None else settings.READINESS_MAX_WAIT
+    started = time.monotonic()
+    deadline = started + cap
+    tracker = _InflightRequests(page) if network else None
+    if tracker:
+        tracker.attach()
+
+    steps = []
+    if selector:
+        steps.append(("selector", lambda: page.wait_for_selector(selector, state="visible", timeout=max(1, (deadline - time.monotonic()) * 1000))))
+    if media:
+        steps.append(("media", lambda: page.evaluate(_MEDIA_READY_JS, selector)))
+    if layout:
+        steps.append(("layout", lambda: page.evaluate(_LAYOUT_STABLE_JS, [selector, STABLE_FRAMES])))
+    if tracker:
+        steps.append(("network", lambda: tracker.wait_quiet(settings.READINESS_QUIET_MS / 1000)))
+
+    failed = None
+    try:
+        for name, step in steps:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                failed = name
+                break
+            try:
+                await asyncio.wait_for(step(), timeout=remaining)
+            except Exception:
+                failed = name
+                break
+    finally:
+        if tracker:
+            tracker.detach()
+
+    elapsed = time.monotonic() - started
+    if failed:
+        extra = max(0.0, fallback - elapsed)
+        logger.warning(f"⏱️ [{label}] Not ready after {elapsed:.2f}s (waiting on {failed}); falling back to the fixed {fallback:.1f}s delay.")
+        await asyncio.sleep(extra)
+        return False
+    logger.info(f"⏱️ [{label}] Ready in {elapsed:.2f}s (fixed delay was {fallback:.1f}s).")
+    return True
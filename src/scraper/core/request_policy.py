@@ -0,0 +1,200 @@
+import logging
+import re
+import weakref
+from collections import defaultdict
+from urllib.parse import urlsplit
+from playwright.async_api import BrowserContext, Page, Request, Response, Route
+
+logger = logging.getLogger(__name__)
+
+# Domínios próprios de cada plataforma (o resto é "terceiro")
+FIRST_PARTY_DOMAINS = {
+    "instagram": ("instagram.com", "cdninstagram.com", "fbcdn.net", "facebook.com"),
+    "twitter": ("x.com", "twitter.com", "twimg.com"),
+    "facebook": ("facebook.com", "fbcdn.net", "fbsbx.com"),
+}
+
+# Regras de bloqueio. Há dois tipos:
+# - blocked_urls (curingas "*" do CDP): bloqueadas pelo próprio Chromium (Network.setBlockedURLs),
+#   sem passar pelo Python e sem desligar o cache HTTP do contexto.
+# - As demais precisam interceptar cada requisição (context.route), avaliadas em ordem; a primeira
+#   que casar decide. Campos: name, action ('block'/'allow'), resource_types, url_patterns (regex),
+#   third_party (só domínios de terceiros), header (nome, trecho do valor), first_per_page (deixa
+#   passar as N primeiras por página, bloqueia o resto). Só valem com intercept=True
+#   (REQUEST_POLICY_INTERCEPT), porque o Playwright desliga o cache HTTP do contexto ao interceptar.
+# Imagens e CSS da própria plataforma nunca são bloqueados: o screenshot precisa deles.
+COMMON_RULES = [
+    {"name": "analytics", "action": "block", "blocked_urls": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*scorecardresearch.com*",
+        "*/logging/*", "*/browser_metrics/*", "*/ajax/bz*", "*/i/jot*", "*/1.1/jot/*", "*client_event*",
+    ]},
+    {"name": "prefetch", "action": "block", "header": ("sec-purpose", "prefetch")},
+    {"name": "third_party", "action": "block", "third_party": True,
+     "resource_types": ["script", "font", "xhr", "fetch", "websocket", "eventsource", "media", "other"]},
+    # Vídeo: o primeiro pedaço traz o primeiro quadro; os segmentos seguintes só gastam banda
+    {"name": "media_segments", "action": "block", "resource_types": ["media"], "first_per_page": 1},
+    {"name": "video_segments_xhr", "action": "block", "resource_types": ["xhr", "fetch"],
+     "url_patterns": [r"\.mp4", r"\.m4s", r"/vid/", r"bytestart="], "first_per_page": 1},
+]
+
+PLATFORM_RULES = {
+    "instagram": [],
+    "twitter": [
+        {"name": "twitter_live_pipeline", "action": "block", "blocked_urls": ["*/live_pipeline/*", "*/1.1/promoted_content/*"]},
+    ],
+    "facebook": [
+        {"name": "facebook_telemetry", "action": "block", "blocked_urls": ["*/ajax/webstorage/*", "*/ajax/qm/*", "*/security/hsts-pixel*"]},
+    ],
+}
+
+class RequestStats:
+    """Hit counters per rule and downloaded bytes per resource type, shared by all contexts of a run."""
+
+    def __init__(self):
+        self.rule_hits = defaultdict(int)
+        self.requests = defaultdict(int)
+        self.bytes = defaultdict(int)
+
+    def record_response(self, platform: str, resource_type: str, size: int):
+        self.requests[(platform, resource_type)] += 1
+        self.bytes[(platform, resource_type)] += size
+
+    def snapshot(self) -> dict:
+        """
+        Allowed requests/bytes per platform and type, and hits per rule with the bytes
+        they likely saved (hits x average size of that type when it was allowed).
+        """
+        average = {key: self.bytes[key] / n for key, n in self.requests.items() if n}
+        blocked = defaultdict(lambda: {"hits": 0, "est_bytes_saved": 0})
+        for (platform, rule, resource_type), hits in self.rule_hits.items():
+            entry = blocked[f"{platform}/{rule}"]
+            entry["hits"] += hits
+            entry["est_bytes_saved"] += int(hits * average.get((platform, resource_type), 0))
+        return {
+            "downloaded": {f"{p}/{t}": {"requests": n, "bytes": self.bytes[(p, t)]} for (p, t), n in self.requests.items()},
+            "blocked": dict(blocked),
+        }
+
+    def totals(self) -> dict:
+        return {
+            "requests": sum(self.requests.values()),
+            "bytes": sum(self.bytes.values()),
+            "blocked": sum(self.rule_hits.values()),
+        }
+
+# Erro de rede das requisições barradas por Network.setBlockedURLs
+BLOCKED_BY_CLIENT = "net::ERR_BLOCKED_BY_CLIENT"
+
+def _glob_regex(pattern: str):
+    """CDP URL pattern ("*" wildcards) as a compiled regex, to tell which rule blocked a request."""
+    return re.compile("^" + ".*".join(re.escape(part) for part in pattern.split("*")) + "$")
+
+class RequestPolicy:
+    """
+    Request-blocking policy for one platform, installed on a browser context.
+
+    URL rules (blocked_urls) are handed to Chromium per page through CDP
+    (Network.setBlockedURLs, see prepare_page): no Python round trip per request
+    and the context's HTTP cache keeps working, which is what makes a pooled,
+    warm context fast. Rules that need the resource type, headers or per-page
+    counts only apply with intercept=True, through context.route; Playwright
+    then intercepts every request of the context (whatever the route glob) and
+    disables its HTTP cache, so the saved third-party/video bytes are paid for
+    with platform scripts and CSS downloaded again on every page.
+
+    With enabled=False nothing is blocked, but downloaded bytes are still counted,
+    so a run with the policy off is the baseline for an A/B comparison.
+    """
+
+    def __init__(self, platform: str, stats: RequestStats, enabled: bool = True, skip_rules: list = None, intercept: bool = False):
+        self.platform = platform
+        self.stats = stats
+        self.enabled = enabled
+        self.intercept = intercept
+        skip = set(skip_rules or [])
+        rules = [rule for rule in COMMON_RULES + PLATFORM_RULES.get(platform, []) if rule["name"] not in skip]
+        self.url_rules = [
+            dict(rule, compiled=[_glob_regex(p) for p in rule["blocked_urls"]])
+            for rule in rules if rule.get("blocked_urls")
+        ]
+        self.blocked_urls = [pattern for rule in self.url_rules for pattern in rule["blocked_urls"]]
+        self.rules = [
+            dict(rule, compiled=[re.compile(p) for p in rule.get("url_patterns", [])])
+            for rule in rules if not rule.get("blocked_urls")
+        ]
+        self._page_hits = weakref.WeakKeyDictionary()
+
+    async def install(self, context: BrowserContext):
+        context.on("response", self._on_response)
+        context.on("requestfailed", self._on_request_failed)
+        if self.enabled and self.intercept and self.rules:
+            await context.route("**/*", self._handle)
+
+    async def prepare_page(self, page: Page):
+        """Blocks the URL rules on a new page of the context (Chromium only; a failure just leaves them off)."""
+        if not (self.enabled and self.blocked_urls):
+            return
+        try:
+            session = await page.context.new_cdp_session(page)
+            await session.send("Network.enable")
+            await session.send("Network.setBlockedURLs", {"urls": self.blocked_urls})
+        except Exception as e:
+            logger.warning(f"[{self.platform}] Could not set blocked URLs on the page: {e}")
+
+    async def _handle(self, route: Route):
+        request = route.request
+        rule = self._match(request)
+        if rule and rule["action"] == "block":
+            self.stats.rule_hits[(self.platform, rule["name"], request.resource_type)] += 1
+            await route.abort()
+        else:
+            await route.fallback()
+
+    def _match(self, request):
+        url = request.url
+        for rule in self.rules:
+            if rule.get("resource_types") and request.resource_type not in rule["resource_types"]:
+                continue
+            if rule["compiled"] and not any(p.search(url) for p in rule["compiled"]):
+                continue
+            if rule.get("third_party") and not self._is_third_party(url):
+                continue
+            if rule.get("header"):
+                name, fragment = rule["header"]
+                if fragment not in (request.headers.get(name) or ""):
+                    continue
+            if rule.get("first_per_page") and self._count_on_page(request, rule["name"]) <= rule["first_per_page"]:
+                continue
+            return rule
+        return None
+
+    def _count_on_page(self, request, rule_name: str) -> int:
+        """Counts this rule's matches on the request's page (including this one)."""
+        try:
+            page = request.frame.page
+        except Exception:
+            return 1
+        counts = self._page_hits.setdefault(page, defaultdict(int))
+        counts[rule_name] += 1
+        return counts[rule_name]
+
+    def _is_third_party(self, url: str) -> bool:
+        host = (urlsplit(url).hostname or "").lower()
+        if not host or url.startswith(("data:", "blob:")):
+            return False
+        return not any(host == d or host.endswith("." + d) for d in FIRST_PARTY_DOMAINS.get(self.platform, ()))
+
+    def _on_request_failed(self, request: Request):
+        if BLOCKED_BY_CLIENT not in (request.failure or ""):
+            return
+        for rule in self.url_rules:
+            if any(p.match(request.url) for p in rule["compiled"]):
+                self.stats.rule_hits[(self.platform, rule["name"], request.resource_type)] += 1
+                return
+
+    def _on_response(self, response: Response):
+        try:
+            size = int(response.headers.get("content-length") or 0)
+        except ValueError:
+            size = 0
+        self.stats.record_response(self.platform, response.request.resource_type, size)
@@ -0,0 +1,170 @@
+import asyncio
+import logging
+import os
+import tracemalloc
+from collections import deque
+from typing import Optional
+
+try:
+    import psutil
+except ImportError: # Sem psutil não há amostra de RSS (o watchdog só registra o heap Python)
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+def _is_chromium(proc) -> bool:
+    name = (proc.name() or "").lower()
+    return "chrom" in name or "headless_shell" in name
+
+def chromium_root_pids() -> set:
+    """PIDs of the Chromium browser processes (not renderers/GPU/utility) started by this Python process."""
+    if psutil is None:
+        return set()
+    roots = set()
+    try:
+        children = psutil.Process().children(recursive=True)
+    except psutil.Error:
+        return roots
+    for proc in children:
+        try:
+            if _is_chromium(proc) and not any(arg.startswith("--type=") for arg in proc.cmdline()):
+                roots.add(proc.pid)
+        except psutil.Error:
+            continue
+    return roots
+
+def sample_browser(pid: int) -> Optional[dict]:
+    """RSS (MB) of one Chromium process tree: total, main process and each renderer."""
+    try:
+        root = psutil.Process(pid)
+        procs = [root] + root.children(recursive=True)
+    except psutil.Error:
+        return None
+    sample = {"pid": pid, "total_mb": 0.0, "browser_mb": 0.0, "renderers": {}}
+    for proc in procs:
+        try:
+            rss = proc.memory_info().rss / MB
+            kind = next((arg[7:] for arg in proc.cmdline() if arg.startswith("--type=")), "browser")
+        except psutil.Error:
+            continue
+        sample["total_mb"] += rss
+        if proc.pid == pid:
+            sample["browser_mb"] = rss
+        elif kind == "renderer":
+            sample["renderers"][proc.pid] = round(rss, 1)
+    sample["total_mb"] = round(sample["total_mb"], 1)
+    sample["browser_mb"] = round(sample["browser_mb"], 1)
+    return sample
+
+class ResourceWatchdog:
+    """
+    Samples memory every `every_links` finished links and acts before the worker is OOM-killed.
+
+    - Chromium: RSS of each browser process tree and of each renderer (needs psutil).
+      A renderer above `renderer_max_mb` recycles the pooled contexts (closed when idle or
+      when their page is given back); a browser tree above `browser_max_mb` restarts that browser.
+    - Python: process RSS and, with `tracemalloc_frames` > 0, the top allocators and what grew
+      since the previous sample. Above `python_max_mb` it only warns (nothing to recycle).
+    - Each check logs the trend since the first sample of the run.
+    """
+
+    def __init__(self, every_links: int = 25, renderer_max_mb: int = 1024, browser_max_mb: int = 3072,
+                 python_max_mb: int = 0, tracemalloc_frames: int = 0, top: int = 5):
+        self.every_links = every_links
+        self.renderer_max_mb = renderer_max_mb
+        self.browser_max_mb = browser_max_mb
+        self.python_max_mb = python_max_mb
+        self.tracemalloc_frames = tracemalloc_frames
+        self.top = top
+        self.links_done = 0
+        self.history = deque(maxlen=50)
+        self.actions = {"context_recycles": 0, "browser_restarts": 0}
+        self._task = None
+        self._heap_snapshot = None
+        if tracemalloc_frames > 0 and not tracemalloc.is_tracing():
+            tracemalloc.start(tracemalloc_frames)
+        if psutil is None:
+            logger.warning("psutil not installed: resource watchdog will not sample Chromium memory.")
+
+    def link_done(self, browser_manager):
+        """Counts a finished link; every `every_links` starts a check in the background (one at a time)."""
+        if self.every_links <= 0:
+            return
+        self.links_done += 1
+        if self.links_done % self.every_links == 0 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self.check(browser_manager))
+
+    async def check(self, browser_manager):
+        try:
+            sample = await asyncio.to_thread(self.sample)
+            sample["open_contexts"] = browser_manager.open_contexts
+            sample["pages_in_use"] = browser_manager.leased_pages
+            self.history.append(sample)
+            self._log_trend(sample)
+            await self._act(sample, browser_manager)
+        except Exception as e:
+            logger.error(f"Resource watchdog check failed: {e}")
+
+    def sample(self) -> dict:
+        sample = {"links": self.links_done, "python_mb": None, "browsers": []}
+        if psutil is not None:
+            sample["python_mb"] = round(psutil.Process().memory_info().rss / MB, 1)
+            sample["browsers"] = [s for s in (sample_browser(pid) for pid in sorted(chromium_root_pids())) if s]
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+                tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            ))
+            sample["heap_top"] = [self._format_stat(stat) for stat in snapshot.statistics("lineno")[:self.top]]
+            if self._heap_snapshot is not None:
+                sample["heap_growth"] = [self._format_stat(stat, diff=True) for stat in snapshot.compare_to(self._heap_snapshot, "lineno")[:self.top]]
+            self._heap_snapshot = snapshot
+        return sample
+
+    @staticmethod
+    def _format_stat(stat, diff: bool = False) -> str:
+        frame = stat.traceback[0]
+        size = f"{stat.size_diff / 1024:+.0f}" if diff else f"{stat.size / 1024:.0f}"
+        return f"{os.path.basename(frame.filename)}:{frame.lineno} {size}KiB"
+
+    def _log_trend(self, sample: dict):
+        chromium_mb = sum(b["total_mb"] for b in sample["browsers"])
+        first = self.history[0]
+        first_chromium = sum(b["total_mb"] for b in first["browsers"])
+        per_100 = ""
+        links = sample["links"] - first["links"]
+        if links > 0:
+            per_100 = f", {(chromium_mb - first_chromium) * 100 / links:+.0f}MB Chromium per 100 links"
+        biggest = max((mb for b in sample["browsers"] for mb in b["renderers"].values()), default=0)
+        logger.info(
+            f"🩻 Resources after {sample['links']} links: Chromium {chromium_mb:.0f}MB in {len(sample['browsers'])} browser(s) "
+            f"(largest renderer {biggest:.0f}MB), Python {sample['python_mb']}MB, "
+            f"{sample['open_contexts']} contexts / {sample['pages_in_use']} pages open{per_100}."
+        )
+        if sample.get("heap_top"):
+            logger.info(f"Python heap top: {sample['heap_top']}")
+        if sample.get("heap_growth"):
+            logger.info(f"Python heap growth since last sample: {sample['heap_growth']}")
+
+    async def _act(self, sample: dict, browser_manager):
+        bloated = [b["pid"] for b in sample["browsers"] if self.browser_max_mb and b["total_mb"] > self.browser_max_mb]
+        if bloated:
+            logger.warning(f"🧯 Chromium above {self.browser_max_mb}MB (pids {bloated}). Restarting browser...")
+            await browser_manager.restart_browser(bloated)
+            self.actions["browser_restarts"] += 1
+            return
+        renderers = [mb for b in sample["browsers"] for mb in b["renderers"].values()]
+        if self.renderer_max_mb and any(mb > self.renderer_max_mb for mb in renderers):
+            logger.warning(f"🧯 Renderer above {self.renderer_max_mb}MB ({max(renderers):.0f}MB). Recycling browser contexts...")
+            await browser_manager.recycle_contexts()
+            self.actions["context_recycles"] += 1
+        if self.python_max_mb and sample["python_mb"] and sample["python_mb"] > self.python_max_mb:
+            logger.warning(f"🧯 Python process at {sample['python_mb']}MB (limit {self.python_max_mb}MB). "
+                           f"Set WATCHDOG_TRACEMALLOC_FRAMES to see the top allocators.")
+
+    async def close(self):
+        if self._task and not self._task.done():
+            self._task.cancel()
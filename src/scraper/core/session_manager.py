@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+# Elementos que só aparecem para visitantes deslogados, por plataforma
+LOGGED_OUT_SELECTORS = {
+    "instagram": "a[href*='/accounts/login'], button:has-text('Log in'), button:has-text('Entrar')",
+    "twitter": "[data-testid='loginButton']",
+    "facebook": "form#login_form, input[name='email'][type='text']",
+}
+LOGIN_URL_FRAGMENTS = {
+    "instagram": ("/accounts/login",),
+    "twitter": ("/login", "/i/flow/login"),
+    "facebook": ("/login",),
+}
+
+class SessionManager:
+    """
+    Remembers when each (platform, account) session was last known to be valid,
+    so spiders do not load the home page before every post.
+
+    unknown -> never verified in this run: the first link runs the login probe
+               (others wait for that same probe).
+    fresh   -> verified less than `ttl` seconds ago: no probe.
+    stale   -> older than `ttl`: a probe runs in the background, links go on.
+    expired -> a real navigation showed a login wall: a refresh runs in the
+               background and new links wait for it.
+
+    Every successful capture counts as a verification (mark_valid).
+    """
+
+    def __init__(self, ttl: float = 1800):
+        self.ttl = ttl
+        self._verified_at = {}
+        self._expired = set()
+        self._refreshing = {}
+
+    async def ensure(self, platform: str, account: str, refresher):
+        """Makes sure the session is usable before a navigation. `refresher` is an async callable returning bool."""
+        key = (platform, account)
+        task = self._refreshing.get(key)
+        if key not in self._verified_at or key in self._expired:
+            if not task or task.done():
+                task = self._start_refresh(key, refresher)
+            await asyncio.shield(task)
+        elif time.monotonic() - self._verified_at[key] > self.ttl and (not task or task.done()):
+            self._start_refresh(key, refresher)
+
+    def mark_valid(self, platform: str, account: str):
+        self._verified_at[(platform, account)] = time.monotonic()
+        self._expired.discard((platform, account))
+
+    def mark_expired(self, platform: str, account: str, refresher):
+        """Called when a real navigation hit a login wall: refreshes the session in the background."""
+        key = (platform, account)
+        if key not in self._expired:
+            logger.warning(f"🔑 [{platform}/{account}] Session expired (login wall on navigation). Refreshing in background...")
+        self._expired.add(key)
+        task = self._refreshing.get(key)
+        if not task or task.done():
+            self._start_refresh(key, refresher)
+
+    def _start_refresh(self, key: tuple, refresher) -> asyncio.Task:
+        task = asyncio.create_task(self._refresh(key, refresher))
+        self._refreshing[key] = task
+        return task
+
+    async def _refresh(self, key: tuple, refresher):
+        platform, account = key
+        started = time.monotonic()
+        try:
+            ok = await refresher()
+        except Exception as e:
+            logger.error(f"[{platform}/{account}] Session refresh failed: {e}")
+            ok = False
+        if ok:
+            self.mark_valid(platform, account)
+            logger.info(f"🔓 [{platform}/{account}] Session verified in {time.monotonic() - started:.1f}s.")
+        else:
+            # Sem sessão válida: os links seguem (sem nova verificação por link) e o
+            # circuit breaker/retentativas cuidam das falhas
+            self._verified_at[key] = time.monotonic()
+            self._expired.discard(key)
+            logger.warning(f"⚠️ [{platform}/{account}] Could not verify the session.")
+
+    def snapshot(self) -> dict:
+        now = time.monotonic()
+        return {
+            f"{platform}/{account}": {
+                "verified_ago": round(now - verified_at, 1),
+                "expired": (platform, account) in self._expired,
+            }
+            for (platform, account), verified_at in self._verified_at.items()
+        }
+
+    async def close(self):
+        for task in self._refreshing.values():
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,83 @@
+import re
+from typing import Optional
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+# Hosts de cada plataforma (sem "www.", "m.", "mobile.")
+PLATFORM_HOSTS = {
+    "instagram": ("instagram.com", "instagr.am"),
+    "twitter": ("twitter.com", "x.com"),
+    "facebook": ("facebook.com", "fb.com", "fb.watch"),
+}
+
+# Host usado na URL canônica de cada plataforma
+CANONICAL_HOSTS = {
+    "instagram": "www.instagram.com",
+    "twitter": "x.com",
+    "facebook": "www.facebook.com",
+}
+
+# No Facebook o post às vezes está na query string (story.php, photo.php, watch)
+FACEBOOK_KEPT_PARAMS = ("story_fbid", "fbid", "id", "v", "set")
+
+_INSTAGRAM_POST = re.compile(r"^/(?:[^/]+/)?(?:p|reel|reels|tv)/([^/]+)")
+# /<usuário>/status/<id>, /i/web/status/<id>, /i/status/<id>
+_TWITTER_STATUS = re.compile(r"^/(?:[^/]+|i/web)/status(?:es)?/(\d+)")
+
+def _split(url: str):
+    url = (url or "").strip()
+    if not re.match(r"^[a-zA-Z][a-zA-Z0-9+.-]*://", url):
+        url = "https://" + url
+    return urlsplit(url)
+
+def _bare_host(host: str) -> str:
+    host = (host or "").lower().split(":")[0]
+    for prefix in ("www.", "m.", "mobile.", "web."):
+        if host.startswith(prefix):
+            return host[len(prefix):]
+    return host
+
+def detect_platform(url: str) -> Optional[str]:
+    """Returns the spider key ('instagram', 'twitter', 'facebook') for a URL, or None."""
+    host = _bare_host(_split(url).hostname)
+    for platform, hosts in PLATFORM_HOSTS.items():
+        if any(host == h or host.endswith("." + h) for h in hosts):
+            return platform
+    return None
+
+def canonical_url(url: str) -> str:
+    """
+    Normalizes a post URL so the same post always maps to the same string:
+    - https, canonical host (twitter.com -> x.com, m./mobile./www. unified)
+    - Instagram: /reel/, /reels/, /tv/ and /<user>/p/ -> /p/<code>/ (stable capture layout)
+    - X: /i/web/status/<id> (the user in the path is dropped: /i/web/status/<id> links carry none,
+      and X opens the tweet under its author's URL either way; /photo/1, /analytics... dropped)
+    - query string and fragment dropped (Facebook keeps the params that identify the post)
+    Unknown URLs are returned stripped, otherwise untouched.
+    """
+    platform = detect_platform(url)
+    if not platform:
+        return (url or "").strip()
+
+    parts = _split(url)
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    query = ""
+
+    if platform == "instagram":
+        match = _INSTAGRAM_POST.match(path)
+        if match:
+            path = f"/p/{match.group(1)}/"
+    elif platform == "twitter":
+        match = _TWITTER_STATUS.match(path)
+        if match:
+            path = f"/i/web/status/{match.group(1)}"
+    elif platform == "facebook":
+        params = sorted((k, v) for k, v in parse_qsl(parts.query) if k in FACEBOOK_KEPT_PARAMS)
+        query = urlencode(params)
+        if _bare_host(parts.hostname) == "fb.watch":
+            # Link curto: não dá para resolver sem rede, mantém o host original
+            return f"https://fb.watch{path}"
+        if len(path) > 1:
+            path = path.rstrip("/")
+
+    canonical = f"https://{CANONICAL_HOSTS[platform]}{path}"
+    return f"{canonical}?{query}" if query else canonical
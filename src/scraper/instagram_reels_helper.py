@@ -1,11 +1,13 @@
 import asyncio
 from playwright.async_api import Page
+from src.scraper.core.readiness import wait_until_ready
 
-async def handle_reel_capture(page: Page, url: str, output_path: str) -> bool:
+async def handle_reel_capture(page: Page, url: str, output_path: str, navigate: bool = True) -> bool:
     """
     Captura Inteligente: 
     - Para VÍDEOS: Captura instantânea (sleep 0.0) para evitar bloqueio.
     - Para IMAGENS: Aguarda carregamento completo para garantir qualidade.
+    navigate=False: a página já está no post (o spider navegou), não carrega de novo.
     """
     try:
         print(f"🚀 [Instagram] Iniciando captura inteligente: {url}")
@@ -15,7 +17,8 @@ async def handle_reel_capture(page: Page, url: str, output_path: str) -> bool:
         await page.route("**/browser_metrics/*", lambda route: route.abort())
 
         # 2. Navegação veloz
-        await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+        if navigate:
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
 
         # 3. Detecção de tipo de mídia
         # Esperamos até que um vídeo ou uma imagem de post apareça
@@ -34,21 +37,9 @@ async def handle_reel_capture(page: Page, url: str, output_path: str) -> bool:
             await asyncio.sleep(0.0)
         else:
             print("📸 Imagem detectada! Aguardando carregamento completo...")
-            # Para imagens, garantimos que a foto carregou 100% (sem borrão)
-            # Esperamos o atributo 'complete' da imagem via JS
-            await page.evaluate("""
-                async () => {
-                    const img = document.querySelector('article img');
-                    if (img && !img.complete) {
-                        await new Promise(resolve => {
-                            img.onload = resolve;
-                            img.onerror = resolve;
-                            setTimeout(resolve, 3000); // Timeout de segurança
-                        });
-                    }
-                }
-            """)
-            await asyncio.sleep(1.0) # Estabilização extra para imagens
+            # Para imagens, garantimos que a foto carregou 100% (sem borrão): imagens decodificadas e
+            # layout estável, em vez da pausa fixa de 1s
+            await wait_until_ready(page, "article", fallback=1.0, label="instagram")
 
         # 5. Screenshot do Contêiner (Vídeo/Imagem + Legenda)
         target = page.locator("article").first
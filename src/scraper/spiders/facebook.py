@@ -1,80 +1,148 @@
 import asyncio
-import os
 from playwright.async_api import Page, TimeoutError
 from src.scraper.core.browser import BrowserManager
 from src.database.connection import get_settings
+from src.scraper.core.rate_limiter import AdaptiveRateLimiter
+from src.scraper.core.page_extractor import PLATFORM_FIELDS, extract_post
+from src.scraper.core.network_capture import PayloadListener, fill_gaps, read_post
+from src.scraper.core.urls import canonical_url
+from src.scraper.core.account_pool import AccountPool
+from src.storage.capture_store import CaptureStore
+from src.scraper.core.readiness import wait_until_ready
+from src.scraper.core.session_manager import SessionManager
 
 class FacebookSpider:
-    def __init__(self, manager: BrowserManager):
+    def __init__(self, manager: BrowserManager, rate_limiter: AdaptiveRateLimiter = None, sessions: SessionManager = None, accounts: AccountPool = None):
         self.manager = manager
         self.settings = get_settings()
-        self.state_file = "facebook_state.json"
+        # Contas da plataforma (state file + credenciais), em rotação a cada post
+        self.accounts = accounts or AccountPool.from_settings(self.settings, "facebook")
+        self.state_file = self.accounts.accounts[0]["state_file"] # Conta padrão
+        self.store = CaptureStore(self.settings.CAPTURES_DIR)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.sessions = sessions or SessionManager()
 
-    async def ensure_login(self, page: Page):
-        """Garante que o usuário está logado no Facebook."""
+    async def ensure_login(self, page: Page, account: dict = None) -> bool:
+        """Garante que o usuário está logado no Facebook. Retorna True se a sessão está ativa."""
+        account = account or self.accounts.accounts[0]
         try:
             await page.goto("https://www.facebook.com/", wait_until="domcontentloaded" )
             if await page.locator("input[placeholder*='Pesquisar'], a[href*='/me/']").count() > 0:
-                return
+                return True
 
             print("🔑 Iniciando fluxo de login no Facebook...")
-            await page.fill("input[id='email']", self.settings.FACEBOOK_USER)
-            await page.fill("input[id='pass']", self.settings.FACEBOOK_PASS)
+            await page.fill("input[id='email']", account["user"])
+            await page.fill("input[id='pass']", account["password"])
             await page.click("button[name='login']")
             
             await page.wait_for_selector("a[href*='/me/']", timeout=30000)
-            await page.context.storage_state(path=self.state_file)
+            await page.context.storage_state(path=account["state_file"])
             print("✅ Login realizado e sessão salva.")
+            return True
         except Exception as e:
             print(f"⚠️ Aviso no login do Facebook: {e}")
+            return False
+
+    async def refresh_session(self, account: dict) -> bool:
+        """Verificação/renovação do login numa página própria (chamada pelo SessionManager)."""
+        await self.rate_limiter.acquire("facebook", account["state_file"])
+        page = await self.manager.acquire_page(account["state_file"], "facebook")
+        try:
+            return await self.ensure_login(page, account)
+        finally:
+            await self.manager.release_page(page)
+
+    async def open_post(self, url: str):
+        """
+        Pega a conta da vez e uma página do pool e navega até o post. Usado pelo scrape_post
+        e, com antecedência, pelo prefetch do processador. Retorna {"account", "page", "error"},
+        ou None quando não há conta disponível.
+        """
+        # Conta da vez (LRU ou round-robin); contas em cooldown ou com challenge ficam de fora
+        account = self.accounts.checkout()
+        if account is None:
+            return None
+        opened = {"account": account, "page": None, "error": None, "payload": None}
+        try:
+            # Página de um contexto já aquecido do pool (devolvida em close_post)
+            opened["page"] = await self.manager.acquire_page(account["state_file"], "facebook")
+            # Respostas da API/GraphQL do post, ouvidas desde antes da navegação
+            if self.settings.NETWORK_CAPTURE:
+                opened["payload"] = PayloadListener(opened["page"], "facebook", url, self.settings.NETWORK_CAPTURE_RECORD_DIR)
+                opened["payload"].attach()
+            # Login verificado só quando a sessão é desconhecida ou velha (não a cada post)
+            await self.sessions.ensure("facebook", account["state_file"], lambda: self.refresh_session(account))
+            # O carregamento das mídias é aguardado por wait_until_ready (networkidle nunca chega com o long polling)
+            await self.rate_limiter.acquire("facebook", account["state_file"])
+            await opened["page"].goto(url, wait_until="domcontentloaded", timeout=90000)
+        except asyncio.CancelledError:
+            await self.close_post(opened)
+            raise
+        except Exception as e:
+            opened["error"] = e
+        return opened
+
+    async def close_post(self, opened: dict, recycle: bool = False):
+        """Devolve a conta e a página abertas por open_post."""
+        self.accounts.release(opened["account"])
+        if opened.get("payload"):
+            opened["payload"].detach()
+        if opened["page"]:
+            await self.manager.release_page(opened["page"], recycle=recycle)
 
     async def scrape_post(self, link_data: dict):
         """Captura posts do Facebook priorizando a visualização em Modal/Dialog."""
-        url = link_data.get('url')
+        url = canonical_url(link_data.get('url'))
         link_id = link_data.get('link_id', 'unknown')
-        image_path = f"captures/facebook_{link_id}.png"
-        text_path = f"captures/facebook_{link_id}.txt"
-        os.makedirs("captures", exist_ok=True)
+        image_path, text_path = await self.store.capture_paths("facebook", link_id)
 
-        context = await self.manager.new_context(storage_state=self.state_file)
-        page = await context.new_page()
+        # Página já navegada pelo prefetch do processador, ou aberta agora
+        opened = link_data.get('prefetched') or await self.open_post(url)
+        if opened is None:
+            return {"status": "error", "error": "Nenhuma conta disponível para facebook (todas removidas por challenge)"}
+        account, page = opened["account"], opened["page"]
+        state_file = account["state_file"]
+        recycle = False
 
         try:
             print(f"🔗 [Link {link_id}] Acessando Facebook: {url}")
-            # Navegação com networkidle para garantir carregamento de mídias
-            await page.goto(url, wait_until="networkidle", timeout=90000)
-            
-            # 1. ESPERA PELO CONTEÚDO (Priorizando o Modal/Dialog)
+            if opened["error"]:
+                raise opened["error"]
+
+            # 1. DADOS DO POST: payload GraphQL primeiro; o DOM dá o estado da página e só espera o conteúdo
+            # (até 30s, priorizando o Modal/Dialog em que o Facebook costuma abrir posts) se faltar algo
             print("⏳ Aguardando renderização do post...")
-            # O Facebook costuma abrir posts individuais em um [role='dialog']
-            main_selectors = ["[role='dialog']", "div[role='main']", "article", "div[data-ad-preview='message']"]
-            try:
-                await page.wait_for_selector(", ".join(main_selectors), timeout=30000)
-            except:
+            post = await read_post(page, "facebook", opened["payload"], self.settings.NETWORK_CAPTURE_WAIT, timeout=30000)
+            if not post["ready"] and post["source"] == "dom":
                 print("⚠️ Aviso: Post demorou a aparecer visualmente.")
+            if post["state"] == "not_found":
+                return {"status": "not_found", "error": "Post not found (404)"}
 
-            # Pausa para estabilização e carregamento de frames de vídeo/imagem
-            await asyncio.sleep(4)
+            throttle = None if post["state"] == "ok" else post["state"]
+            if throttle == "login_wall":
+                self.sessions.mark_expired("facebook", state_file, lambda: self.refresh_session(account))
+            if throttle:
+                self.rate_limiter.report_throttle("facebook", state_file, throttle)
+                self.accounts.report(account, throttle)
+                recycle = True # Sessão suspeita: o próximo link recomeça de um contexto novo
+                return {"status": "error", "error": f"Bloqueio do Facebook detectado ({throttle})", "throttle": throttle}
+
+            # Estabilização e carregamento de frames de vídeo/imagem (antes: pausa fixa de 4s)
+            ready_selector = "[role='dialog']" if post["dialog"] else "div[role='main'], article"
+            if not post["ready"]:
+                ready_selector = PLATFORM_FIELDS["facebook"]["ready"] # Dados vindos da API: o post ainda pode estar renderizando
+            await wait_until_ready(page, ready_selector, fallback=4, label=f"facebook {link_id}")
 
             # 2. EXTRAÇÃO DE TEXTO (Focada no Modal para evitar pegar o fundo)
-            post_text = ""
-            text_selectors = [
-                "[role='dialog'] [data-ad-preview='message']", 
-                "[role='dialog'] div[dir='auto']",
-                "div[data-ad-preview='message']",
-                "div[role='article'] div[dir='auto']"
-            ]
-            
-            for sel in text_selectors:
-                locator = page.locator(sel).first
-                if await locator.count() > 0:
-                    post_text = await locator.inner_text()
-                    if post_text and len(post_text) > 5: 
-                        print(f"📝 Legenda encontrada via: {sel}")
-                        break
+            # Texto do payload GraphQL do post; sem ele, o DOM é relido após a estabilização e só preenche
+            # o que falta (autor e data do payload são mantidos)
+            if len(post["caption"]) <= 5:
+                post = fill_gaps(post, await extract_post(page, "facebook"), min_caption=5)
+            post_text = post["caption"]
+            if post_text:
+                print(f"📝 Legenda encontrada via: {post['caption_source']}")
 
-            with open(text_path, "w", encoding="utf-8-sig") as f:
-                f.write(post_text if post_text else "Legenda não encontrada.")
+            await self.store.write_text(text_path, post_text if post_text else "Legenda não encontrada.", encoding="utf-8-sig")
 
             # 3. SCREENSHOT DO CONTEÚDO EM DESTAQUE
             # Se houver um dialog aberto, tiramos print dele. Se não, do contêiner principal.
@@ -92,7 +160,7 @@ class FacebookSpider:
                 
                 # Centraliza e captura
                 await target.scroll_into_view_if_needed()
-                await asyncio.sleep(1)
+                await wait_until_ready(page, target_selector, fallback=1, label=f"facebook {link_id} scroll")
                 
                 # Captura o elemento (Vídeo/Imagem + Legenda)
                 await target.screenshot(path=image_path)
@@ -101,16 +169,23 @@ class FacebookSpider:
                 # Fallback total
                 await page.screenshot(path=image_path)
 
+            self.rate_limiter.report_success("facebook", state_file)
+            self.accounts.report_success(account)
+            self.sessions.mark_valid("facebook", state_file)
             return {
                 "status": "success",
                 "image_path": image_path,
                 "text_path": text_path,
-                "text_content": post_text
+                "text_content": post_text,
+                "author": post["author"],
+                "published_at": post["published_at"]
             }
 
         except Exception as e:
+            recycle = True
             print(f"❌ Erro ao processar Facebook {link_id}: {e}")
-            await page.screenshot(path=f"captures/error_fb_{link_id}.png")
+            if page:
+                await page.screenshot(path=await self.store.file_path(f"error_fb_{link_id}.png"))
             return {"status": "error", "error": str(e)}
         finally:
-            await page.close()
+            await self.close_post(opened, recycle=recycle)
@@ -1,77 +1,135 @@
 import asyncio
-import os
 import unicodedata
 import re
 from playwright.async_api import Page, TimeoutError
 from src.scraper.core.browser import BrowserManager
 from src.database.connection import get_settings
 from src.scraper.instagram_reels_helper import handle_reel_capture
+from src.scraper.core.rate_limiter import AdaptiveRateLimiter
+from src.scraper.core.network_capture import PayloadListener, read_post
+from src.scraper.core.urls import canonical_url
+from src.scraper.core.account_pool import AccountPool
+from src.storage.capture_store import CaptureStore
+from src.scraper.core.session_manager import SessionManager
 
 class InstagramSpider:
-    def __init__(self, manager: BrowserManager):
+    def __init__(self, manager: BrowserManager, rate_limiter: AdaptiveRateLimiter = None, sessions: SessionManager = None, accounts: AccountPool = None):
         self.manager = manager
         self.settings = get_settings()
-        self.state_file = "instagram_state.json"
+        # Contas da plataforma (state file + credenciais), em rotação a cada post
+        self.accounts = accounts or AccountPool.from_settings(self.settings, "instagram")
+        self.state_file = self.accounts.accounts[0]["state_file"] # Conta padrão
+        self.store = CaptureStore(self.settings.CAPTURES_DIR)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.sessions = sessions or SessionManager()
 
-    async def ensure_login(self, page: Page):
-        """Gerencia o login no Instagram."""
+    async def ensure_login(self, page: Page, account: dict = None) -> bool:
+        """Gerencia o login no Instagram. Retorna True se a sessão está ativa."""
+        account = account or self.accounts.accounts[0]
         try:
             await page.goto("https://www.instagram.com/" )
             if await page.locator("svg[aria-label='Pesquisa'], svg[aria-label='Search']").count() > 0:
-                return
-            await page.fill("input[name='username']", self.settings.INSTAGRAM_USER)
-            await page.fill("input[name='password']", self.settings.INSTAGRAM_PASS)
+                return True
+            await page.fill("input[name='username']", account["user"])
+            await page.fill("input[name='password']", account["password"])
             await page.click("button[type='submit']")
             await page.wait_for_selector("svg[aria-label='Pesquisa']", timeout=15000)
-            await page.context.storage_state(path=self.state_file)
-        except: pass
+            await page.context.storage_state(path=account["state_file"])
+            return True
+        except:
+            return False
+
+    async def refresh_session(self, account: dict) -> bool:
+        """Verificação/renovação do login numa página própria (chamada pelo SessionManager)."""
+        await self.rate_limiter.acquire("instagram", account["state_file"])
+        page = await self.manager.acquire_page(account["state_file"], "instagram")
+        try:
+            return await self.ensure_login(page, account)
+        finally:
+            await self.manager.release_page(page)
+
+    async def open_post(self, url: str):
+        """
+        Pega a conta da vez e uma página do pool e navega até o post. Usado pelo scrape_post
+        e, com antecedência, pelo prefetch do processador. Retorna {"account", "page", "error"},
+        ou None quando não há conta disponível.
+        """
+        # Conta da vez (LRU ou round-robin); contas em cooldown ou com challenge ficam de fora
+        account = self.accounts.checkout()
+        if account is None:
+            return None
+        opened = {"account": account, "page": None, "error": None, "payload": None}
+        try:
+            # Página de um contexto já aquecido do pool (devolvida em close_post)
+            opened["page"] = await self.manager.acquire_page(account["state_file"], "instagram")
+            # Respostas da API/GraphQL do post, ouvidas desde antes da navegação
+            if self.settings.NETWORK_CAPTURE:
+                opened["payload"] = PayloadListener(opened["page"], "instagram", url, self.settings.NETWORK_CAPTURE_RECORD_DIR)
+                opened["payload"].attach()
+            # Sem ida à home a cada post: o login só é verificado quando a sessão é desconhecida ou velha
+            await self.sessions.ensure("instagram", account["state_file"], lambda: self.refresh_session(account))
+            await self.rate_limiter.acquire("instagram", account["state_file"])
+            await opened["page"].goto(url, wait_until="domcontentloaded", timeout=60000)
+        except asyncio.CancelledError:
+            await self.close_post(opened)
+            raise
+        except Exception as e:
+            opened["error"] = e
+        return opened
+
+    async def close_post(self, opened: dict, recycle: bool = False):
+        """Devolve a conta e a página abertas por open_post."""
+        self.accounts.release(opened["account"])
+        if opened.get("payload"):
+            opened["payload"].detach()
+        if opened["page"]:
+            await self.manager.release_page(opened["page"], recycle=recycle)
 
     async def scrape_post(self, link_data: dict):
         """Captura posts com substituição inteligente de legendas compostas apenas por emojis."""
         raw_url = link_data.get('url')
         link_id = link_data.get('link_id', 'unknown')
-        image_path = f"captures/instagram_{link_id}.png"
-        text_path = f"captures/instagram_{link_id}.txt"
-        os.makedirs("captures", exist_ok=True)
+        image_path, text_path = await self.store.capture_paths("instagram", link_id)
 
-        url = raw_url.split("?")[0] if "?" in raw_url else raw_url
-        if '/reel/' in url: url = url.replace('/reel/', '/p/')
+        # Reels viram /p/ (layout de captura estável) e a query string é descartada
+        url = canonical_url(raw_url)
 
-        context = await self.manager.new_context(storage_state=self.state_file)
-        page = await context.new_page()
+        # Página já navegada pelo prefetch do processador, ou aberta agora
+        opened = link_data.get('prefetched') or await self.open_post(url)
+        if opened is None:
+            return {"status": "error", "error": "Nenhuma conta disponível para instagram (todas removidas por challenge)"}
+        account, page = opened["account"], opened["page"]
+        state_file = account["state_file"]
+        recycle = False
         
         try:
-            await self.ensure_login(page)
-            await page.goto(url, wait_until="domcontentloaded", timeout=60000)
+            if opened["error"]:
+                raise opened["error"]
+
+            # Metadados do payload da API primeiro; o DOM dá o estado da página e só espera o post
+            # renderizar (até 5s) para os campos que o payload não trouxe
+            post = await read_post(page, "instagram", opened["payload"], self.settings.NETWORK_CAPTURE_WAIT, timeout=5000)
+            if post["state"] == "not_found":
+                return {"status": "not_found", "error": "Post not found (404)"}
+
+            # Login wall / challenge / "aguarde alguns minutos": reduz o ritmo e deixa para depois
+            throttle = None if post["state"] == "ok" else post["state"]
+            if throttle == "login_wall":
+                self.sessions.mark_expired("instagram", state_file, lambda: self.refresh_session(account))
+            if throttle:
+                self.rate_limiter.report_throttle("instagram", state_file, throttle)
+                self.accounts.report(account, throttle)
+                recycle = True # Sessão suspeita: o próximo link recomeça de um contexto novo
+                return {"status": "error", "error": f"Bloqueio do Instagram detectado ({throttle})", "throttle": throttle}
             
             # 1. Captura de Imagem/Vídeo
-            await handle_reel_capture(page, url, image_path)
-
-            # 2. Extração de Metadados (@Usuário e Localização)
-            username = ""
-            location = ""
-            try:
-                user_el = page.locator("header a[role='link']").first
-                if await user_el.count() > 0:
-                    username = await user_el.inner_text()
-                
-                loc_el = page.locator("header a[href*='/explore/locations/']").first
-                if await loc_el.count() > 0:
-                    location = await loc_el.inner_text()
-            except: pass
-
-            # 3. Extração de Legenda
-            caption = ""
-            try:
-                element = page.locator("article h1, article span._ap30").first
-                caption = await element.inner_text(timeout=5000)
-                caption = caption.strip('"')  # Remove aspas do início e fim
-            except:
-                try:
-                    meta_content = await page.locator('meta[property="og:description"]').get_attribute("content", timeout=3000)
-                    if meta_content and ":" in meta_content:
-                        caption = meta_content.split(":", 1)[-1].strip().strip('"')  # Remove aspas
-                except: caption = ""
+            await handle_reel_capture(page, url, image_path, navigate=False)
+
+            # 2. Metadados (@Usuário e Localização) e 3. Legenda: do payload da API quando chegou,
+            # senão os lidos do DOM (ou og:description)
+            username = post["author"]
+            location = post["location"]
+            caption = post["caption"].strip('"')  # Remove aspas do início e fim
 
             # 4. LÓGICA INTELIGENTE: Detectar se a legenda é apenas Emojis
             original_caption = caption.strip()
@@ -101,18 +159,23 @@ class InstagramSpider:
                 final_text = " ".join(final_text.split())
 
             # 6. Salvamento
-            with open(text_path, "w", encoding="utf-8") as f:
-                f.write(final_text if final_text else "Legenda nao encontrada.")
+            await self.store.write_text(text_path, final_text if final_text else "Legenda nao encontrada.", encoding="utf-8")
 
+            self.rate_limiter.report_success("instagram", state_file)
+            self.accounts.report_success(account)
+            self.sessions.mark_valid("instagram", state_file)
             return {
                 "status": "success",
                 "image_path": image_path,
                 "text_path": text_path,
-                "link_id": link_id
+                "link_id": link_id,
+                "author": username,
+                "published_at": post["published_at"]
             }
 
         except Exception as e:
+            recycle = True
             print(f"❌ Erro no Instagram {link_id}: {e}")
             return {"status": "error", "error": str(e)}
         finally:
-            await page.close()
+            await self.close_post(opened, recycle=recycle)
@@ -1,18 +1,30 @@
 import asyncio
-import os
 import unicodedata
 from playwright.async_api import Page, TimeoutError
 from src.scraper.core.browser import BrowserManager
 from src.database.connection import get_settings
+from src.scraper.core.rate_limiter import AdaptiveRateLimiter
+from src.scraper.core.network_capture import PayloadListener, read_post
+from src.scraper.core.urls import canonical_url
+from src.scraper.core.account_pool import AccountPool
+from src.storage.capture_store import CaptureStore
+from src.scraper.core.readiness import wait_until_ready
+from src.scraper.core.session_manager import SessionManager
 
 class TwitterSpider:
-    def __init__(self, manager: BrowserManager):
+    def __init__(self, manager: BrowserManager, rate_limiter: AdaptiveRateLimiter = None, sessions: SessionManager = None, accounts: AccountPool = None):
         self.manager = manager
         self.settings = get_settings()
-        self.state_file = "twitter_state.json"
-
-    async def ensure_login(self, page: Page):
+        # Contas da plataforma (state file + credenciais), em rotação a cada post
+        self.accounts = accounts or AccountPool.from_settings(self.settings, "twitter")
+        self.state_file = self.accounts.accounts[0]["state_file"] # Conta padrão
+        self.store = CaptureStore(self.settings.CAPTURES_DIR)
+        self.rate_limiter = rate_limiter or AdaptiveRateLimiter()
+        self.sessions = sessions or SessionManager()
+
+    async def ensure_login(self, page: Page, account: dict = None):
         """Garante que o usuário está logado no Twitter/X."""
+        account = account or self.accounts.accounts[0]
         try:
             # Verifica se já está logado por elementos da UI
             if await page.locator("[data-testid='SideNav_AccountSwitcher_Button']").count() > 0:
@@ -30,27 +42,62 @@ class TwitterSpider:
 
             # Usuário
             username_input = await page.wait_for_selector("input[autocomplete='username'], input[name='text']", timeout=10000)
-            await username_input.fill(self.settings.TWITTER_USER)
+            await username_input.fill(account["user"])
             await page.click("button:has-text('Próximo'), button:has-text('Next')")
 
-            # Senha
-            await asyncio.sleep(2)
-            password_input = await page.wait_for_selector("input[name='password'], input[type='password']", timeout=15000)
-            await password_input.fill(self.settings.TWITTER_PASS)
+            # Senha (espera o campo aparecer, em vez da pausa fixa de 2s)
+            password_selector = "input[name='password'], input[type='password']"
+            await wait_until_ready(page, password_selector, fallback=2, label="twitter login", media=False, network=False)
+            password_input = await page.wait_for_selector(password_selector, timeout=15000)
+            await password_input.fill(account["password"])
 
-            # Botão Entrar
-            await asyncio.sleep(1)
+            # Botão Entrar (o click já espera o botão ficar visível e habilitado)
             await page.click("button[data-testid='LoginForm_Login_Button'], button:has-text('Log in'), button:has-text('Entrar')")
 
             await page.wait_for_selector("[data-testid='SideNav_AccountSwitcher_Button']", timeout=20000)
             print("✅ Login realizado com sucesso.")
 
             # Salva o estado da sessão
-            await page.context.storage_state(path=self.state_file)
+            await page.context.storage_state(path=account["state_file"])
         except Exception as e:
             print(f"❌ Falha no login do Twitter: {e}")
             raise
 
+    async def open_post(self, url: str):
+        """
+        Pega a conta da vez e uma página do pool e navega até o post. Usado pelo scrape_post
+        e, com antecedência, pelo prefetch do processador. Retorna {"account", "page", "error"},
+        ou None quando não há conta disponível.
+        """
+        # Conta da vez (LRU ou round-robin); contas em cooldown ou com challenge ficam de fora
+        account = self.accounts.checkout()
+        if account is None:
+            return None
+        opened = {"account": account, "page": None, "error": None, "payload": None}
+        try:
+            # Página de um contexto já aquecido do pool (devolvida em close_post)
+            opened["page"] = await self.manager.acquire_page(account["state_file"], "twitter")
+            # Respostas da API/GraphQL do post, ouvidas desde antes da navegação
+            if self.settings.NETWORK_CAPTURE:
+                opened["payload"] = PayloadListener(opened["page"], "twitter", url, self.settings.NETWORK_CAPTURE_RECORD_DIR)
+                opened["payload"].attach()
+            await self.rate_limiter.acquire("twitter", account["state_file"])
+            await opened["page"].goto(url, timeout=90000, wait_until="domcontentloaded")
+        except asyncio.CancelledError:
+            await self.close_post(opened)
+            raise
+        except Exception as e:
+            opened["error"] = e
+        return opened
+
+    async def close_post(self, opened: dict, recycle: bool = False):
+        """Devolve a conta e a página abertas por open_post."""
+        self.accounts.release(opened["account"])
+        if opened.get("payload"):
+            opened["payload"].detach()
+        if opened["page"]:
+            await self.manager.release_page(opened["page"], recycle=recycle)
+
     async def scrape_post(self, link_data: dict):
         """Navega até um tweet e realiza a captura."""
         url = link_data.get('url')
@@ -59,78 +106,85 @@ class TwitterSpider:
         if not url:
              return {"status": "error", "error": "No URL provided"}
 
-        # Usa o contexto robusto do BrowserManager
-        context = await self.manager.new_context(storage_state=self.state_file)
-        page = await context.new_page()
+        # Normaliza a URL para x.com
+        url = canonical_url(url)
+
+        # Página já navegada pelo prefetch do processador, ou aberta agora
+        opened = link_data.get('prefetched') or await self.open_post(url)
+        if opened is None:
+            return {"status": "error", "error": "Nenhuma conta disponível para twitter (todas removidas por challenge)"}
+        account, page = opened["account"], opened["page"]
+        state_file = account["state_file"]
+        recycle = False
 
         try:
-            # Normaliza a URL para x.com
-            url = url.replace("twitter.com", "x.com").replace("http://", "https://" )
-            
             print(f"🔗 [Link {link_id}] Acessando: {url}")
-            await page.goto(url, timeout=90000, wait_until="domcontentloaded")
+            if opened["error"]:
+                raise opened["error"]
             
             # Verifica se foi redirecionado para login
             if "x.com/login" in page.url or await page.locator("[data-testid='loginButton']").count() > 0:
                 print("🔑 Redirecionado para login. Autenticando...")
-                await self.ensure_login(page)
-                await page.goto(url, timeout=90000, wait_until="networkidle")
-
-            # --- CORREÇÃO DOS SELETORES DE ERRO ---
-            # Usamos a sintaxe :has-text() que é a correta para o Playwright
-            error_patterns = [
-                ":has-text(\"Hmm...this page doesn't exist\")",
-                ":has-text(\"Página não encontrada\")",
-                ":has-text(\"Ih, esta página não existe\")",
-                ":has-text(\"Esta conta não existe\")",
-                ":has-text(\"This account doesn't exist\")"
-            ]
-            
-            # Espera pelo Tweet OU por uma mensagem de erro (sem quebrar o seletor)
-            try:
-                # Combinamos apenas seletores CSS válidos
-                await page.wait_for_selector("[data-testid='tweetText'], [data-testid='error-detail']", timeout=20000)
-            except TimeoutError:
-                print("⚠️ Timeout aguardando tweet. Verificando se a página existe...")
-
-            # Verifica se alguma mensagem de erro está visível
-            for pattern in error_patterns:
-                if await page.locator(pattern).count() > 0:
-                    print(f"⚠️ Erro do Twitter detectado: {pattern}")
-                    return {"status": "not_found", "error": "Tweet or account not found (404)"}
-
-            # Extração de conteúdo
-            tweet_locator = page.locator("[data-testid='tweetText']").first
-            tweet_text = await tweet_locator.inner_text() if await tweet_locator.count() > 0 else ""
-            
-            # Normalização de texto
-            if tweet_text:
-                tweet_text = unicodedata.normalize('NFKD', tweet_text).encode('ascii', 'ignore').decode('ascii')
+                await self.ensure_login(page, account)
+                await page.goto(url, timeout=90000, wait_until="domcontentloaded")
+
+            # Texto, autor e data do payload da API (TweetDetail, já com o texto completo de tweets longos)
+            # primeiro; o DOM dá o estado da página e só espera pelo Tweet OU por uma mensagem de erro
+            # (até 20s) quando o payload não trouxe tudo
+            post = await read_post(page, "twitter", opened["payload"], self.settings.NETWORK_CAPTURE_WAIT, timeout=20000)
+
+            if post["state"] == "not_found":
+                print("⚠️ Erro do Twitter detectado: página ou conta não existe")
+                return {"status": "not_found", "error": "Tweet or account not found (404)"}
+
+            # Página de erro genérica / login wall / página vazia: sinais de limite de taxa do X
+            throttle = None if post["state"] == "ok" else post["state"]
+            if throttle:
+                self.rate_limiter.report_throttle("twitter", state_file, throttle)
+                self.accounts.report(account, throttle)
+                recycle = True # Sessão suspeita: o próximo link recomeça de um contexto novo
+                return {"status": "error", "error": f"Bloqueio do X detectado ({throttle})", "throttle": throttle}
 
             # Caminhos de saída
-            image_path = f"captures/twitter_{link_id}.png"
-            text_path = f"captures/twitter_{link_id}.txt"
-            os.makedirs("captures", exist_ok=True)
+            image_path, text_path = await self.store.capture_paths("twitter", link_id)
             
-            # Screenshot do tweet (tentamos focar no elemento do tweet para um print melhor)
+            # Screenshot do tweet (tentamos focar no elemento do tweet para um print melhor); com os dados
+            # vindos da API o tweet pode ainda não ter renderizado
             tweet_article = page.locator("article[data-testid='tweet']").first
+            if not post["ready"]:
+                try:
+                    await tweet_article.wait_for(state="visible", timeout=20000)
+                except Exception:
+                    print("⚠️ Timeout aguardando tweet.")
             if await tweet_article.count() > 0:
                 await tweet_article.screenshot(path=image_path)
             else:
                 await page.screenshot(path=image_path)
+
+            tweet_text = post["caption"]
+            
+            # Normalização de texto
+            if tweet_text:
+                tweet_text = unicodedata.normalize('NFKD', tweet_text).encode('ascii', 'ignore').decode('ascii')
             
-            with open(text_path, "w", encoding="utf-8-sig") as f:
-                f.write(tweet_text)
+            await self.store.write_text(text_path, tweet_text, encoding="utf-8-sig")
 
+            self.rate_limiter.report_success("twitter", state_file)
+            self.accounts.report_success(account)
+            # O X já detecta a sessão expirada na própria navegação (redireciona para o login)
+            self.sessions.mark_valid("twitter", state_file)
             return {
                 "status": "success",
                 "image_path": image_path,
                 "text_path": text_path,
-                "text_content": tweet_text
+                "text_content": tweet_text,
+                "author": post["author"],
+                "published_at": post["published_at"]
             }
 
         except Exception as e:
+            recycle = True
             print(f"❌ Erro ao processar tweet {link_id}: {e}")
             return {"status": "error", "error": str(e)}
         finally:
-            await page.close()
+            await self.close_post(opened, recycle=recycle)
@@ -0,0 +1,92 @@
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Sinais que indicam sessão morta (e não uma falha isolada do link)
+SESSION_SIGNALS = ("login_wall", "challenge")
+
+class CircuitBreaker:
+    """
+    Circuit breaker for one platform.
+
+    closed    -> links are dispatched normally.
+    open      -> tripped after `failure_threshold` consecutive scrape failures or
+                 `login_wall_threshold` consecutive login walls/challenges; no links are
+                 dispatched (they stay pending) until `cooldown` seconds have passed.
+    half_open -> a single probe link is let through; success closes the breaker,
+                 failure opens it again with a doubled cooldown (up to `max_cooldown`).
+    """
+
+    def __init__(self, platform: str, failure_threshold: int = 5, login_wall_threshold: int = 2,
+                 cooldown: float = 300, max_cooldown: float = 3600):
+        self.platform = platform
+        self.failure_threshold = failure_threshold
+        self.login_wall_threshold = login_wall_threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.login_walls = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def cooling_down(self) -> bool:
+        """True while open and the cooldown has not passed (the platform should not even be fetched)."""
+        return self.state == OPEN and time.monotonic() - self.opened_at < self.cooldown
+
+    def allow(self) -> bool:
+        """Whether a link of this platform may start now."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if self.cooling_down():
+                return False
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        # Half open: exactly one probe at a time
+        if self.probe_in_flight:
+            return False
+        self.probe_in_flight = True
+        logger.info(f"🔎 [{self.platform}] Circuit half-open: sending a probe link.")
+        return True
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"🟢 [{self.platform}] Probe succeeded. Circuit closed, resuming dispatch.")
+        self.state = CLOSED
+        self.failures = 0
+        self.login_walls = 0
+        self.cooldown = self.base_cooldown
+        self.probe_in_flight = False
+
+    def record_failure(self, signal: str = None):
+        self.failures += 1
+        if signal in SESSION_SIGNALS:
+            self.login_walls += 1
+
+        if self.state == HALF_OPEN:
+            self.cooldown = min(self.max_cooldown, self.cooldown * 2)
+            self._trip(f"probe failed ({signal or 'error'})")
+        elif self.state == CLOSED and (self.failures >= self.failure_threshold
+                                       or self.login_walls >= self.login_wall_threshold):
+            self._trip(f"{self.failures} consecutive failures, {self.login_walls} login walls")
+
+    def _trip(self, reason: str):
+        self.state = OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        logger.error(f"🔴 [{self.platform}] Circuit opened: {reason}. Pausing this platform for {self.cooldown:.0f}s.")
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "login_walls": self.login_walls,
+            "cooldown": self.cooldown,
+        }
@@ -0,0 +1,191 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+class ProcessingPipeline:
+    """
+    Runs the SocialMediaProcessor stages (fetch -> scrape -> adapter -> status)
+    concurrently, joined by bounded queues:
+
+        link ids -> [fetch] -> scrape_queue -> [scrape] -> adapter_queue -> [adapter] -> status_queue -> [status]
+
+    Each stage has its own worker count. While link N is in LegacyAdapter, links
+    N+1..N+k are already loading in the browser. A scrape worker that finishes
+    while adapter_queue is full keeps its slot until the adapter catches up, so
+    captures never run more than `queue_size + scrape_workers` links ahead of the
+    adapter (and `captures/` does not fill up).
+    Jobs finished early (error, 404) skip straight to the status stage.
+
+    Links of the same post (same canonical URL) are scraped once: the first one
+    scrapes, the others wait outside the scrape slots and then go to the adapter
+    with the shared capture (or share the failure).
+    """
+
+    def __init__(self, processor, fetch_workers: int = 2, scrape_workers: int = 4, adapter_workers: int = 2,
+                 status_workers: int = 1, queue_size: int = 4, platform_limits: dict = None, before_scrape=None,
+                 prefetch=None):
+        self.processor = processor
+        self.fetch_workers = max(1, fetch_workers)
+        self.scrape_workers = max(1, scrape_workers)
+        self.adapter_workers = max(1, adapter_workers)
+        self.status_workers = max(1, status_workers)
+        self.queue_size = max(1, queue_size)
+        self.platform_slots = {
+            name.lower(): asyncio.Semaphore(max(1, cap))
+            for name, cap in (platform_limits or {}).items()
+        }
+        # Optional check (async job -> bool) run right before a scrape starts; False leaves the link untouched
+        self.before_scrape = before_scrape
+        # Optional hook (async job -> bool) run when a link holds its platform slot but every scrape
+        # worker is busy: it may admit the link early and open its page; False leaves the link untouched
+        self.prefetch = prefetch
+
+    async def run(self, link_ids: list) -> dict:
+        """Processes the links and returns {link_id: success}, or None for links that were skipped."""
+        fetch_queue = asyncio.Queue()
+        scrape_queue = asyncio.Queue(maxsize=self.queue_size)
+        adapter_queue = asyncio.Queue(maxsize=self.queue_size)
+        status_queue = asyncio.Queue()
+        outcomes = {lid: None for lid in link_ids}
+
+        for lid in link_ids:
+            fetch_queue.put_nowait(self.processor.new_job(lid))
+        fetch_queue.put_nowait(_DONE)
+
+        def skip(job):
+            job['skipped'] = True
+            job['finished'] = True
+
+        async def prepare_scrape(job, workers_busy: bool):
+            if job['result'] is not None or not workers_busy or not self.prefetch:
+                return
+            if not await self.prefetch(job):
+                skip(job)
+
+        async def scrape(job):
+            if job['result'] is not None:
+                return  # Capture cache hit: nothing to open, go on to the adapter
+            # Links admitted by the prefetch hook were already checked (and hold the breaker's probe)
+            if not job.get('admitted') and self.before_scrape and not await self.before_scrape(job):
+                skip(job)
+                return
+            await self.processor.scrape_stage(job)
+
+        async def status(job):
+            if job.get('skipped'):
+                return
+            await self.processor.status_stage(job)
+            outcomes[job['link_id']] = job['success']
+
+        await asyncio.gather(
+            self._stage("fetch", self.processor.fetch_stage, fetch_queue, scrape_queue, status_queue, self.fetch_workers),
+            self._stage("scrape", scrape, scrape_queue, adapter_queue, status_queue, self.scrape_workers,
+                        slot_for=lambda job: self.platform_slots.get(job['platform']),
+                        group_key=lambda job: job.get('canonical_url'), prepare=prepare_scrape),
+            self._stage("adapter", self.processor.adapter_stage, adapter_queue, status_queue, status_queue, self.adapter_workers),
+            self._stage("status", status, status_queue, None, None, self.status_workers, guarded=False),
+        )
+        return outcomes
+
+    async def _stage(self, name: str, handler, inbox: asyncio.Queue, outbox, finished_box, workers: int,
+                     slot_for=None, guarded: bool = True, group_key=None, prepare=None):
+        """
+        Dispatches jobs from `inbox` to at most `workers` concurrent handler calls.
+        slot_for(job) may return an extra semaphore (e.g. per-platform cap), acquired
+        before the stage slot so a job waiting on its platform does not hold a worker.
+        The dispatcher only takes a job off `inbox` when it has a dispatch slot
+        (`workers`, plus `queue_size` jobs waiting on their platform with slot_for), so a
+        busy stage leaves its inbox full and the upstream stage blocks.
+        group_key(job) groups jobs that share the result of a single handler call
+        (see SocialMediaProcessor.share_capture).
+        prepare(job, workers_busy) runs in the job's task once the extra slot is held and
+        before the stage slot is taken; a job it finishes skips the handler.
+        """
+        stage_slots = asyncio.Semaphore(workers)
+        dispatch_slots = asyncio.Semaphore(workers + (self.queue_size if slot_for else 0))
+        tasks = set()
+        groups = {}
+
+        async def forward(job):
+            await (finished_box if job['finished'] else outbox).put(job)
+
+        async def release_followers(leader):
+            group = groups.get(group_key(leader)) if group_key else None
+            if not group or group['leader'] is not leader or group['done']:
+                return
+            group['done'] = True
+            for follower in group['followers']:
+                await self.processor.share_capture(leader, follower)
+                await forward(follower)
+
+        async def run_job(job):
+            extra = slot_for(job) if slot_for else None
+            extra_held = slot_held = False
+            try:
+                if extra:
+                    await extra.acquire()
+                    extra_held = True
+                if prepare:
+                    workers_busy = stage_slots.locked()
+                    step = lambda job: prepare(job, workers_busy)
+                    await (self.processor.run_stage(step, job) if guarded else step(job))
+                # A job finished by prepare (skipped, failed) goes on without taking a worker
+                if not (prepare and job['finished']):
+                    await stage_slots.acquire()
+                    slot_held = True
+                    if guarded:
+                        await self.processor.run_stage(handler, job)
+                    else:
+                        await handler(job)
+                # Still holding the slot: a full outbox holds this stage back (backpressure)
+                if outbox is not None:
+                    await forward(job)
+                    await release_followers(job)
+            except Exception as e:
+                logger.error(f"Pipeline stage '{name}' failed for link {job['link_id']}: {e}")
+            finally:
+                if slot_held:
+                    stage_slots.release()
+                if extra_held:
+                    extra.release()
+                dispatch_slots.release()
+
+        while True:
+            # Only take a job when it can be dispatched: a busy stage leaves its inbox
+            # full and the upstream stage blocks
+            await dispatch_slots.acquire()
+            job = await inbox.get()
+            if job is _DONE or (job['finished'] and outbox is not None):
+                dispatch_slots.release()
+                if job is _DONE:
+                    break
+                await finished_box.put(job)
+                continue
+
+            key = group_key(job) if group_key else None
+            if key in groups:
+                # Same post already being handled: wait for it without taking a slot
+                dispatch_slots.release()
+                group = groups[key]
+                if group['done']:
+                    await self.processor.share_capture(group['leader'], job)
+                    await forward(job)
+                else:
+                    group['followers'].append(job)
+                continue
+            if key:
+                # The leader's job sees its followers too (their leases are renewed with its own)
+                groups[key] = {'leader': job, 'followers': job.setdefault('followers', []), 'done': False}
+
+            task = asyncio.create_task(run_job(job))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        if outbox is not None:
+            await outbox.put(_DONE)
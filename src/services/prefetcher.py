@@ -0,0 +1,72 @@
+import logging
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """
+    Bounded lookahead for the scrape stage: a link that already holds its platform slot
+    and was admitted (lease, circuit breaker) but finds every scrape worker busy opens
+    and navigates its page right away (spider.open_post), and the spider gets that
+    pre-warmed page when a worker frees up (link_data['prefetched']).
+
+    The page is opened by the link's own pipeline task, so it counts against the
+    per-platform cap, a half-open breaker still lets a single probe through, and
+    BrowserPool.interrupted() sees it as the task's page when an instance fails.
+
+    - At most `depth` pages are opened ahead at a time.
+    - A prefetched page older than `max_age` seconds is thrown away and opened again.
+    - Whatever was not taken by the end of a batch is closed by clear().
+    """
+
+    def __init__(self, spiders: dict, depth: int = 2, max_age: float = 120):
+        self.spiders = spiders
+        self.depth = depth
+        self.max_age = max_age
+        self._warming = 0
+        self._pages = {}  # link_id -> (job, opened, started)
+        self.stats = {"prefetched": 0, "used": 0, "stale": 0, "abandoned": 0}
+
+    def has_room(self) -> bool:
+        return self.depth > 0 and self._warming + len(self._pages) < self.depth
+
+    async def warm(self, job: dict):
+        """Opens and navigates the page of `job` ahead of its scrape (no-op when the lookahead is full)."""
+        if not self.has_room() or job['link_id'] in self._pages:
+            return
+        self._warming += 1
+        started = time.monotonic()
+        try:
+            opened = await self.spiders[job['platform']].open_post(job['canonical_url'])
+        finally:
+            self._warming -= 1
+        if opened is None:
+            return
+        self._pages[job['link_id']] = (job, opened, started)
+        self.stats["prefetched"] += 1
+
+    async def take(self, job: dict) -> Optional[dict]:
+        """The pre-warmed page of `job`, or None."""
+        entry = self._pages.pop(job['link_id'], None)
+        if entry is None:
+            return None
+        _, opened, started = entry
+        if time.monotonic() - started > self.max_age:
+            self.stats["stale"] += 1
+            await self.spiders[job['platform']].close_post(opened)
+            return None
+        self.stats["used"] += 1
+        logger.info(f"⏩ [Link {job['link_id']}] Using prefetched page ({time.monotonic() - started:.1f}s ahead).")
+        return opened
+
+    async def clear(self):
+        """Closes every prefetched page not taken (end of batch)."""
+        entries = list(self._pages.values())
+        self._pages.clear()
+        self.stats["abandoned"] += len(entries)
+        for job, opened, _ in entries:
+            try:
+                await self.spiders[job['platform']].close_post(opened)
+            except Exception as e:
+                logger.warning(f"Failed to close prefetched page of link {job['link_id']}: {e}")
@@ -1,176 +1,641 @@
 import logging
 import asyncio
+import os
+import socket
 from datetime import datetime
-from tenacity import AsyncRetrying, stop_after_attempt, wait_exponential
-from src.database.repository import SocialMediaRepository
+from src.database.connection import get_settings
+from src.database.repository import LEASE_COLUMNS, RETRY_COLUMNS, SocialMediaRepository
 from src.scraper.core.browser import BrowserManager
+from src.scraper.core.browser_pool import BrowserPool
+from src.scraper.core.account_pool import AccountPool
+from src.scraper.core.rate_limiter import AdaptiveRateLimiter
+from src.scraper.core.resource_watchdog import ResourceWatchdog
+from src.scraper.core.session_manager import SessionManager
+from src.scraper.core.urls import canonical_url, detect_platform
 from src.scraper.spiders.instagram import InstagramSpider
 from src.scraper.spiders.twitter import TwitterSpider
 from src.scraper.spiders.facebook import FacebookSpider
-from src.legacy_adapter.run_adapter import run_legacy_adapter
+from src.legacy_adapter.adapter_pool import AdapterPool
+from src.services.pipeline import ProcessingPipeline
+from src.services.prefetcher import Prefetcher
+from src.services.circuit_breaker import CircuitBreaker
+from src.services.quality_gate import QualityGate
+from src.services.scheduler import FairShareScheduler
+from src.services.retry_policy import PERMANENT, PermanentError, classify_error, retry_delay
+from src.storage.capture_cache import CaptureCache
+from src.storage.image_encoder import CaptureEncoder
 
 logger = logging.getLogger(__name__)
 
 class SocialMediaProcessor:
-    def __init__(self):
-        self.repo = SocialMediaRepository()
+    def __init__(self, force_refresh: bool = False):
+        self.settings = get_settings()
+        self.repo = SocialMediaRepository(retry_columns=self.settings.RETRY_SCHEDULING)
+        self._check_schema()
+        # Identifies this process when claiming leases on the shared queue
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
         self.browser_manager = None
         self.spiders = {}
+        self.prefetcher = None
+        self.rate_limiter = AdaptiveRateLimiter(
+            limits_per_minute=self.settings.RATE_LIMITS_PER_MINUTE,
+            burst=self.settings.RATE_LIMIT_BURST,
+            platform_limits_per_minute=self.settings.RATE_LIMITS_PER_MINUTE_PLATFORM
+        )
+        # Contas de cada plataforma, em rotação entre os posts (cooldown após bloqueio, fora após challenge)
+        self.accounts = {
+            name: AccountPool.from_settings(self.settings, name)
+            for name in ('instagram', 'twitter', 'facebook')
+        }
+        # Sessões verificadas por plataforma/conta: evita a ida à home antes de cada post
+        self.sessions = SessionManager(ttl=self.settings.SESSION_TTL)
+        self.breakers = {
+            name: CircuitBreaker(
+                name,
+                failure_threshold=self.settings.BREAKER_FAILURE_THRESHOLD,
+                login_wall_threshold=self.settings.BREAKER_LOGIN_WALL_THRESHOLD,
+                cooldown=self.settings.BREAKER_COOLDOWN
+            )
+            for name in ('instagram', 'twitter', 'facebook')
+        }
+        self.adapter_pool = AdapterPool(
+            max_parallel=self.settings.ADAPTER_MAX_PARALLEL,
+            timeout=self.settings.ADAPTER_TIMEOUT,
+            persistent=self.settings.ADAPTER_PERSISTENT
+        )
+        # Rejects blank / login-wall / error-page screenshots before they reach the adapter
+        self.quality_gate = None
+        if self.settings.QUALITY_GATE:
+            self.quality_gate = QualityGate(
+                refs_dir=self.settings.QUALITY_REFS_DIR,
+                min_entropy=self.settings.QUALITY_MIN_ENTROPY,
+                blank_max=self.settings.QUALITY_BLANK_MAX,
+                hash_distance=self.settings.QUALITY_HASH_DISTANCE
+            )
+        # Re-encodes screenshots (format, dimensions, byte budget) in a process pool
+        self.encoder = CaptureEncoder(
+            fmt=self.settings.CAPTURE_FORMAT,
+            quality=self.settings.CAPTURE_QUALITY,
+            max_width=self.settings.CAPTURE_MAX_WIDTH,
+            max_height=self.settings.CAPTURE_MAX_HEIGHT,
+            max_kb=self.settings.CAPTURE_MAX_KB,
+            workers=self.settings.CAPTURE_ENCODE_WORKERS
+        )
+        self.capture_cache = None
+        if self.settings.CAPTURE_CACHE_TTL > 0:
+            self.capture_cache = CaptureCache(
+                root=self.settings.CAPTURE_CACHE_DIR,
+                ttl=self.settings.CAPTURE_CACHE_TTL,
+                max_bytes=self.settings.CAPTURE_CACHE_MAX_MB * 1024 * 1024
+            )
+        self.scheduler = FairShareScheduler(
+            client_weights=self.settings.SCHEDULER_CLIENT_WEIGHTS,
+            platform_weights=self.settings.SCHEDULER_PLATFORM_WEIGHTS,
+            priority_hours=self.settings.SCHEDULER_PRIORITY_HOURS
+        )
+        # Memória do Chromium e do Python amostrada a cada N links, reciclando antes do OOM
+        self.watchdog = ResourceWatchdog(
+            every_links=self.settings.WATCHDOG_EVERY_LINKS,
+            renderer_max_mb=self.settings.WATCHDOG_RENDERER_MAX_MB,
+            browser_max_mb=self.settings.WATCHDOG_BROWSER_MAX_MB,
+            python_max_mb=self.settings.WATCHDOG_PYTHON_MAX_MB,
+            tracemalloc_frames=self.settings.WATCHDOG_TRACEMALLOC_FRAMES
+        )
+        # Ignore fresh cache entries and capture again (the new capture replaces the entry)
+        self.force_refresh = force_refresh
 
     async def initialize(self):
         if not self.browser_manager:
-            self.browser_manager = BrowserManager()
+            if self.settings.BROWSER_POOL:
+                self.browser_manager = BrowserPool(
+                    size=self.settings.BROWSER_POOL_SIZE,
+                    health_interval=self.settings.BROWSER_HEALTH_INTERVAL,
+                    health_timeout=self.settings.BROWSER_HEALTH_TIMEOUT
+                )
+            else:
+                self.browser_manager = BrowserManager()
             await self.browser_manager.start()
             
             self.spiders = {
-                'instagram': InstagramSpider(self.browser_manager),
-                'twitter': TwitterSpider(self.browser_manager),
-                'facebook': FacebookSpider(self.browser_manager)
+                'instagram': InstagramSpider(self.browser_manager, self.rate_limiter, self.sessions, self.accounts['instagram']),
+                'twitter': TwitterSpider(self.browser_manager, self.rate_limiter, self.sessions, self.accounts['twitter']),
+                'facebook': FacebookSpider(self.browser_manager, self.rate_limiter, self.sessions, self.accounts['facebook'])
             }
+            if self.settings.PREFETCH_DEPTH > 0:
+                # Opens and navigates the next links' pages while the current ones are captured
+                self.prefetcher = Prefetcher(self.spiders, depth=self.settings.PREFETCH_DEPTH, max_age=self.settings.PREFETCH_MAX_AGE)
             logger.info("Browser and Spiders initialized.")
 
     async def process_link(self, link_id: int):
-        """Process a single link by ID"""
+        """Process a single link by ID (all stages in sequence)"""
         await self.initialize()
-        
+
+        job = self.new_job(link_id)
+        for stage in (self.fetch_stage, self.scrape_stage, self.adapter_stage):
+            if job['finished']:
+                break
+            await self.run_stage(stage, job)
+        await self.status_stage(job)
+        return job['success']
+
+    # ------------------------------------------------------------------
+    # Stages (used in sequence by process_link and concurrently by ProcessingPipeline)
+    # Each stage fills the job dict; setting job['finished'] skips the remaining
+    # stages and sends the job straight to status_stage.
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def new_job(link_id: int) -> dict:
+        return {
+            'link_id': link_id,
+            'link_data': None,
+            'platform': None,
+            'canonical_url': None,
+            'spider_input': None,
+            'result': None,
+            'pub_date': None,
+            'status': None,     # Final LIMW_IN_STATUS to write (None = leave untouched)
+            'success': False,
+            'finished': False,
+            'skipped': False,
+            'admitted': False,  # Passed _may_start ahead of a free worker (see _prefetch)
+            'followers': [],    # Jobs of the same post waiting on this one's capture (see share_capture)
+            'lease_lost': False,
+            'adapter_report': None,
+            'error': None,
+            'retry_delay': None,  # Seconds until the next attempt (status 9, or in-line without RETRY_SCHEDULING)
+            'inline_attempts': 0,
+        }
+
+    @staticmethod
+    def finish(job: dict, status, success: bool = False):
+        job['status'] = status
+        job['success'] = success
+        job['finished'] = True
+
+    def _check_schema(self):
+        """Stops at startup when a setting needs columns whose migration was not applied."""
+        required = []
+        if self.settings.QUEUE_LEASES:
+            required.append(("QUEUE_LEASES", LEASE_COLUMNS, "001_link_lease.sql"))
+        if self.settings.RETRY_SCHEDULING:
+            required.append(("RETRY_SCHEDULING", RETRY_COLUMNS, "002_link_retry.sql"))
+        for setting, columns, migration in required:
+            missing = self.repo.missing_columns(columns)
+            if missing:
+                raise RuntimeError(
+                    f"{setting}=True but Link_MidiaSocial_Web has no {', '.join(missing)}. "
+                    f"Apply src/database/migrations/{migration} or set {setting}=False."
+                )
+
+    def fail(self, job: dict, error):
+        """
+        Finishes a failed job without sleeping: permanent errors (and links out of
+        attempts) go to status 3, transient ones to status 9 with a backoff delay,
+        to be picked up again by a later poll. Without RETRY_SCHEDULING there is no
+        attempt counter in the table: a transient failure gets a retry_delay and
+        run_stage runs the stage again in-line, up to RETRY_INLINE_ATTEMPTS.
+        """
+        attempts = (job['link_data'] or {}).get('LIMW_NR_TENTATIVAS') or 0
+        job['error'] = str(error)
+        if classify_error(error) == PERMANENT:
+            logger.warning(f"⛔ [Link {job['link_id']}] Permanent failure, no retry: {error}")
+            self.finish(job, 3) # Error
+        elif not self.settings.RETRY_SCHEDULING:
+            job['inline_attempts'] += 1
+            if job['inline_attempts'] < self.settings.RETRY_INLINE_ATTEMPTS:
+                job['retry_delay'] = retry_delay(job['inline_attempts'] - 1, self.settings.RETRY_INLINE_DELAY, self.settings.RETRY_INLINE_MAX_DELAY)
+                logger.warning(f"🔁 [Link {job['link_id']}] Attempt {job['inline_attempts']} failed ({error}). Retrying in {job['retry_delay']}s.")
+            else:
+                job['retry_delay'] = None
+                logger.warning(f"⛔ [Link {job['link_id']}] Giving up after {job['inline_attempts']} attempts: {error}")
+            self.finish(job, 3) # Error (unless run_stage retries it)
+        elif attempts + 1 >= self.settings.RETRY_MAX_ATTEMPTS:
+            logger.warning(f"⛔ [Link {job['link_id']}] Giving up after {attempts + 1} attempts: {error}")
+            self.finish(job, 3) # Error
+        else:
+            job['retry_delay'] = retry_delay(attempts, self.settings.RETRY_BASE_DELAY, self.settings.RETRY_MAX_DELAY)
+            logger.warning(f"🔁 [Link {job['link_id']}] Attempt {attempts + 1} failed ({error}). Retry in {job['retry_delay']}s.")
+            self.finish(job, 9) # Retry
+
+    async def run_stage(self, stage, job: dict):
+        """
+        Runs a stage, turning unexpected exceptions into a classified failure. Without
+        RETRY_SCHEDULING, a transient failure is retried in-line after its backoff.
+        """
+        while True:
+            try:
+                await stage(job)
+            except Exception as e:
+                logger.error(f"Critical error processing link {job['link_id']}: {e}")
+                import traceback
+                traceback.print_exc()
+                self.fail(job, e)
+            if self.settings.RETRY_SCHEDULING or not job['finished'] or job['status'] != 3 or job['retry_delay'] is None:
+                return
+            await asyncio.sleep(job['retry_delay'])
+            job.update(status=None, finished=False, error=None, retry_delay=None)
+
+    async def fetch_stage(self, job: dict):
+        """Loads the link row, detects the platform and builds the spider input."""
+        link_id = job['link_id']
         logger.info(f"🚀 [Link {link_id}] - Iniciando processamento...")
-        
-        # Get link data
-        link_data = self.repo.get_link_by_id(link_id)
+
+        # Get link data (pyodbc blocks: run it off the event loop, see SocialMediaRepository.conn)
+        link_data = await asyncio.to_thread(self.repo.get_link_by_id, link_id)
         if not link_data:
             logger.error(f"Link {link_id} not found in database.")
-            return False
-        
+            self.finish(job, None)
+            return
+        job['link_data'] = link_data
+
         url = link_data['LIMW_TX_LINK']
-        
+
         # Detect platform from URL
-        platform = None
-        if 'instagram.com' in url:
-            platform = 'instagram'
-        elif 'twitter.com' in url or 'x.com' in url:
-            platform = 'twitter'
-        elif 'facebook.com' in url:
-            platform = 'facebook'
-        
+        platform = detect_platform(url)
+
         if not platform:
             logger.error(f"Could not detect platform from URL: {url}")
-            self.repo.update_link_status(link_id, 3)  # Error status
-            return False
-        
-        logger.info(f"🔍 [Link {link_id}] - Passo 1: Preparando ambiente de captura...")
-        
-        spider = self.spiders.get(platform)
-        if not spider:
+            self.fail(job, PermanentError(f"Could not detect platform from URL: {url}"))
+            return
+
+        if not self.spiders.get(platform):
             logger.error(f"No spider found for platform: {platform}")
-            self.repo.update_link_status(link_id, 3)
-            return False
+            self.fail(job, PermanentError(f"No spider found for platform: {platform}"))
+            return
+        job['platform'] = platform
+        # Same post under different URLs (x.com/twitter.com, /reel/ vs /p/, query strings) shares one capture
+        job['canonical_url'] = canonical_url(url)
+
+        job['spider_input'] = {
+            'url': url,
+            'link_id': link_id,
+            'veiculo_code': link_data.get('VEIC_CD_VEICULO'),
+            'canal_code': link_data.get('CANA_CD_CANAL'),
+            'client_code': link_data.get('CLIE_CD_CLIENTE'),
+            'pub_date': link_data.get('LIMW_DT_DATA_PUBLICAÇÃO')
+        }
+
+        # A fresh capture of the same post goes straight to the adapter, without opening a page
+        if self.capture_cache and not self.force_refresh:
+            cached = await asyncio.to_thread(self.capture_cache.get, job['canonical_url'])
+            if cached:
+                logger.info(f"💾 [Link {link_id}] Capture cache hit ({cached['cache_age']}s old): {job['canonical_url']}")
+                job['result'] = cached
+                return
+
+    async def scrape_stage(self, job: dict):
+        """Captures the post with the platform spider (unless fetch_stage served it from the cache)."""
+        if job['result'] is not None:
+            return
+        link_id = job['link_id']
+        spider_input = job['spider_input']
+        spider = self.spiders[job['platform']]
+
+        logger.info(f"🔍 [Link {link_id}] - Passo 1: Preparando ambiente de captura...")
+        logger.info(f"🕷️ Scraping {spider_input['url']} via {job['platform']} spider...")
+        logger.info(f"📸 [Link {link_id}] - Passo 2: Capturando dados da rede social...")
+
+        breaker = self.breakers.get(job['platform'])
 
+        # Page already opened and navigated ahead of time by the prefetcher, if any
+        opened = await self.prefetcher.take(job) if self.prefetcher else None
+
+        # Single attempt: failures are rescheduled (status 9) instead of retried in-line
         try:
-            logger.info(f"🕷️ Scraping {url} via {platform} spider...")
-            logger.info(f"📸 [Link {link_id}] - Passo 2: Capturando dados da rede social...")
-            
-            spider_input = {
-                'url': url, 
-                'link_id': link_id,
-                'veiculo_code': link_data.get('VEIC_CD_VEICULO'),
-                'canal_code': link_data.get('CANA_CD_CANAL'),
-                'client_code': link_data.get('CLIE_CD_CLIENTE'),
-                'pub_date': link_data.get('LIMW_DT_DATA_PUBLICAÇÃO')
-            }
-            
-            # Retry logic for scraping
-            async for attempt in AsyncRetrying(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=4, max=10)):
-                with attempt:
-                    result = await spider.scrape_post(spider_input)
-                    
-                    # Handle 404 Not Found (skip retries and update status to 3)
-                    if result and result.get('status') == 'not_found':
-                        logger.warning(f"⚠️ [Link {link_id}] 404 Not Found detected. Skipping retries.")
-                        self.repo.update_link_status(link_id, 3)
-                        return False
-
-                    if not result or result.get('status') != 'success':
-                        raise Exception(result.get('error', 'Unknown scraping error'))
-            
-            logger.info(f"✅ Scraping success for Link {link_id}")
-            
-            # Get publication date
-            pub_date = result.get('pub_date') or link_data.get('LIMW_DT_DATA_PUBLICAÇÃO')
-            if isinstance(pub_date, datetime):
-                pub_date_str = pub_date.strftime('%Y-%m-%d')
-            else:
-                pub_date_str = str(pub_date) if pub_date else datetime.now().strftime('%Y-%m-%d')
-            
-            logger.info(f"📅 Using Publication Date: {pub_date_str}")
-            
-            # Platform Specific Overrides (Legacy Consistency)
-            # Codes found in VEICULO table:
-            # Instagram = 54108
-            # Twitter = 98411
-            # Facebook = 24247
-            
-            if platform == 'instagram':
-                spider_input['veiculo_code'] = 54108
-            elif platform == 'twitter':
-                spider_input['veiculo_code'] = 98411
-            elif platform == 'facebook':
-                spider_input['veiculo_code'] = 24247
-
-            # Ensure numeric codes are not None before adapter call
-            spider_input['veiculo_code'] = spider_input.get('veiculo_code') or 70963 # Generic "Rede Social" fallback
-            spider_input['canal_code'] = spider_input.get('canal_code') or 0
-            spider_input['client_code'] = spider_input.get('client_code') or 0
-            
-            # Call Legacy Adapter
-            logger.info(f"🔄 invoking LegacyAdapter...")
-            adapter_success = run_legacy_adapter(
-                link_id=link_id,
-                image_path=result['image_path'],
-                text_path=result['text_path'],
-                pub_date=pub_date_str,
-                veiculo=spider_input['veiculo_code'],
-                canal=spider_input['canal_code'],
-                cliente=spider_input['client_code']
-            )
-            
-            if adapter_success:
-                logger.info(f"✅ LegacyAdapter execution finished.")
-                self.repo.update_link_status(link_id, 2) # Success
-                return True
-            else:
-                logger.error(f"❌ LegacyAdapter failed (returned False).")
-                self.repo.update_link_status(link_id, 3) # Error
-                return False
-                
-        except Exception as e:
-            logger.error(f"Critical error processing link {link_id}: {e}")
-            self.repo.update_link_status(link_id, 3) # Error
-            import traceback
-            traceback.print_exc()
-            return False
+            result = await spider.scrape_post(dict(spider_input, prefetched=opened) if opened else spider_input)
+            # The browser instance crashed or hung mid-capture: run it again on a healthy one
+            for _ in range(2):
+                if (result or {}).get('status') == 'success' or not self.browser_manager.interrupted():
+                    break
+                logger.warning(f"🔁 [Link {link_id}] Browser instance failed during capture. Re-dispatching...")
+                result = await spider.scrape_post(spider_input)
+        except Exception:
+            if breaker:
+                breaker.record_failure()
+            raise
+
+        # Handle 404 Not Found (no retries, status 3)
+        if result and result.get('status') == 'not_found':
+            logger.warning(f"⚠️ [Link {link_id}] 404 Not Found detected. Skipping retries.")
+            if breaker:
+                breaker.record_success() # The platform answered: the post is what is missing
+            self.fail(job, PermanentError(result.get('error', 'Not found (404)')))
+            return
+
+        if not result or result.get('status') != 'success':
+            if breaker:
+                breaker.record_failure((result or {}).get('throttle'))
+            self.fail(job, (result or {}).get('error', 'Unknown scraping error'))
+            return
+
+        # A "success" that shows a blank frame or a known login wall/error page is retried later
+        if self.quality_gate:
+            verdict = await asyncio.to_thread(self.quality_gate.check, result['image_path'], job['platform'])
+            if not verdict['ok']:
+                logger.warning(f"🚮 [Link {link_id}] Capture rejected by quality gate: {verdict['reason']} ({verdict['ms']}ms).")
+                if breaker:
+                    breaker.record_failure()
+                self.fail(job, f"Capture rejected by quality gate ({verdict['reason']})")
+                return
+
+        if breaker:
+            breaker.record_success()
+
+        logger.info(f"✅ Scraping success for Link {link_id}")
+        result['image_path'] = await self.encoder.encode(result['image_path'], label=f"Link {link_id}")
+        job['result'] = result
+        if self.capture_cache:
+            await asyncio.to_thread(self.capture_cache.put, job['canonical_url'], job['platform'], result)
+
+    async def share_capture(self, leader: dict, follower: dict):
+        """
+        Gives `follower` (another link row of the same post) the outcome of the
+        leader's scrape: the shared capture goes to the adapter with the follower's
+        own link/client codes, and a failed scrape fails the follower the same way.
+        A follower whose lease was lost while it waited is skipped (left to its new owner).
+        """
+        if self.settings.QUEUE_LEASES and not follower['lease_lost']:
+            follower['lease_lost'] = not await asyncio.to_thread(self.repo.renew_lease, follower['link_id'], self.worker_id, self.settings.LEASE_SECONDS)
+        if follower['lease_lost']:
+            logger.warning(f"Lease lost for link {follower['link_id']} (claimed by another worker). Skipping.")
+            follower['skipped'] = True
+            follower['finished'] = True
+        elif leader['skipped']:
+            follower['skipped'] = True
+            follower['finished'] = True
+        elif leader['result'] is not None:
+            logger.info(f"♻️ [Link {follower['link_id']}] Reusing capture of link {leader['link_id']} ({leader['canonical_url']}).")
+            follower['result'] = dict(leader['result'])
+        else:
+            self.fail(follower, leader['error'] or f"Capture of link {leader['link_id']} failed")
+
+    async def adapter_stage(self, job: dict):
+        """Sends the capture to the legacy system through LegacyAdapter."""
+        link_id = job['link_id']
+        platform = job['platform']
+        result = job['result']
+        spider_input = job['spider_input']
+
+        # Get publication date
+        pub_date = result.get('pub_date') or job['link_data'].get('LIMW_DT_DATA_PUBLICAÇÃO')
+        if isinstance(pub_date, datetime):
+            pub_date_str = pub_date.strftime('%Y-%m-%d')
+        elif not pub_date and result.get('published_at'):
+            # Sem data no cadastro: usa a data lida na página (ISO 8601) em vez de hoje
+            pub_date_str = result['published_at'][:10]
+        else:
+            pub_date_str = str(pub_date) if pub_date else datetime.now().strftime('%Y-%m-%d')
+        job['pub_date'] = pub_date_str
+
+        logger.info(f"📅 Using Publication Date: {pub_date_str}")
+
+        # Platform Specific Overrides (Legacy Consistency)
+        # Codes found in VEICULO table:
+        # Instagram = 54108
+        # Twitter = 98411
+        # Facebook = 24247
+
+        if platform == 'instagram':
+            spider_input['veiculo_code'] = 54108
+        elif platform == 'twitter':
+            spider_input['veiculo_code'] = 98411
+        elif platform == 'facebook':
+            spider_input['veiculo_code'] = 24247
+
+        # Ensure numeric codes are not None before adapter call
+        spider_input['veiculo_code'] = spider_input.get('veiculo_code') or 70963 # Generic "Rede Social" fallback
+        spider_input['canal_code'] = spider_input.get('canal_code') or 0
+        spider_input['client_code'] = spider_input.get('client_code') or 0
+
+        # Call Legacy Adapter
+        logger.info(f"🔄 invoking LegacyAdapter...")
+        # Async subprocess: the event loop (and the browser) keeps working meanwhile
+        report = await self.adapter_pool.run(
+            link_id=link_id,
+            image_path=result['image_path'],
+            text_path=result['text_path'],
+            pub_date=pub_date_str,
+            veiculo=spider_input['veiculo_code'],
+            canal=spider_input['canal_code'],
+            cliente=spider_input['client_code']
+        )
+
+        job['adapter_report'] = report
+
+        if report['success']:
+            logger.info(f"✅ LegacyAdapter execution finished.")
+            self.finish(job, 2, success=True) # Success
+        else:
+            logger.error(f"❌ LegacyAdapter failed (exit code {report['exit_code']}, timed out: {report['timed_out']}).")
+            self.fail(job, f"LegacyAdapter failed (exit code {report['exit_code']}, timed out: {report['timed_out']})")
+
+    async def status_stage(self, job: dict):
+        """Writes the final status of the link."""
+        if job['status'] == 9 and job['retry_delay'] is not None:
+            await asyncio.to_thread(self.repo.schedule_retry, job['link_id'], job['retry_delay'], job['error'])
+        elif job['status'] is not None:
+            await asyncio.to_thread(self.repo.update_link_status, job['link_id'], job['status'])
+        if self.browser_manager:
+            self.watchdog.link_done(self.browser_manager)
+
+    async def process_batch(self, limit: int = 10, platform: str = None, concurrency: int = 1, platform_limits: dict = None, stop_event: asyncio.Event = None):
+        """
+        Processes a batch of pending links and returns {link_id: success}.
+        concurrency: max number of links processed at the same time (shared BrowserManager).
+        platform_limits: optional per-platform caps, e.g. {'instagram': 2, 'twitter': 4}.
+        stop_event: when set, links not yet started are skipped and stay pending.
+        """
+        # Platforms whose circuit is open stay in the queue; the others keep full speed
+        paused = [name for name, breaker in self.breakers.items() if breaker.cooling_down()]
+        if paused:
+            logger.info(f"⏸️ Circuit open, not fetching: {', '.join(paused)}")
 
-    async def process_batch(self, limit: int = 10, platform: str = None):
         logger.info(f"Fetching {limit} pending links (Platform: {platform or 'All'})...")
-        links = self.repo.get_pending_links(limit=limit, platform=platform)
+        links = await asyncio.to_thread(self._next_links, limit, platform, paused)
 
         if not links:
             logger.info("No pending links found.")
-            return
+            return {}
 
-        logger.info(f"Found {len(links)} links. Starting batch...")
+        concurrency = max(1, concurrency or 1)
+        logger.info(f"Found {len(links)} links. Starting batch (concurrency={concurrency}, limits={platform_limits or {}})...")
 
-        success_count = 0
         await self.initialize()
 
-        for link in links:
-            lid = link['LIMW_CD_LINK_MIDIA_SOCIAL_WEB']
-            success = await self.process_link(lid)
-            if success:
-                success_count += 1
+        pipeline = ProcessingPipeline(
+            self,
+            fetch_workers=self.settings.PIPELINE_FETCH_WORKERS,
+            scrape_workers=concurrency,
+            adapter_workers=self.settings.PIPELINE_ADAPTER_WORKERS,
+            status_workers=self.settings.PIPELINE_STATUS_WORKERS,
+            queue_size=self.settings.PIPELINE_QUEUE_SIZE,
+            platform_limits=platform_limits,
+            before_scrape=lambda job: self._may_start(job, stop_event),
+            prefetch=(lambda job: self._prefetch(job, stop_event)) if self.prefetcher else None
+        )
+        link_ids = [link['LIMW_CD_LINK_MIDIA_SOCIAL_WEB'] for link in links]
+        results = await pipeline.run(link_ids)
+        if self.prefetcher:
+            await self.prefetcher.clear()
+            logger.info(f"Prefetch: {self.prefetcher.stats}")
+
+        outcomes = {}
+        failed_ids = []
+        skipped_ids = []
+        for lid in link_ids:
+            outcome = results.get(lid)
+            if outcome is None:
+                skipped_ids.append(lid)
+                continue
+            outcomes[lid] = outcome
+            if not outcomes[lid]:
+                failed_ids.append(lid)
+
+        success_count = len(outcomes) - len(failed_ids)
+        logger.info(f"Batch completed. Success: {success_count}/{len(outcomes)}")
+        if failed_ids:
+            logger.info(f"Failed links: {', '.join(str(lid) for lid in failed_ids)}")
+        stats = self.browser_manager.request_stats
+        logger.info(f"Requests (policy {self.settings.REQUEST_POLICY}): {stats.totals()} | blocked by rule: {stats.snapshot()['blocked']}")
+        if isinstance(self.browser_manager, BrowserPool):
+            logger.info(f"Browser pool: {self.browser_manager.snapshot()}")
+        for name, pool in self.accounts.items():
+            if len(pool.accounts) > 1:
+                logger.info(f"Accounts ({name}): {pool.snapshot()}")
+        if self.quality_gate and self.quality_gate.stats['rejected']:
+            logger.info(f"Quality gate: {self.quality_gate.stats}")
+        if self.encoder.enabled:
+            logger.info(f"Capture encoding ({self.encoder.fmt}): {self.encoder.snapshot()}")
+        if any(self.watchdog.actions.values()):
+            logger.info(f"Resource watchdog actions: {self.watchdog.actions}")
+        limits = self.rate_limiter.snapshot()
+        if limits:
+            logger.info(f"Rate limits: {limits}")
+        if skipped_ids:
+            logger.info(f"Skipped (shutdown, lease lost or circuit open; left pending): {', '.join(str(lid) for lid in skipped_ids)}")
+            if self.settings.QUEUE_LEASES:
+                await asyncio.to_thread(self.repo.release_links, skipped_ids, self.worker_id)
+        return outcomes
+
+    def _next_links(self, limit: int, platform: str = None, paused: list = None) -> list:
+        """
+        Reads a wider candidate window (limit x SCHEDULER_WINDOW_FACTOR, at most `limit`
+        per client so one client's backlog cannot hide the others), lets the fair-share
+        scheduler pick `limit` of them and, with leases, claims exactly those.
+        """
+        if not self.settings.SCHEDULER_ENABLED:
+            if self.settings.QUEUE_LEASES:
+                return self.repo.claim_pending_links(
+                    self.worker_id,
+                    limit=limit,
+                    lease_seconds=self.settings.LEASE_SECONDS,
+                    platform=platform,
+                    exclude_platforms=paused
+                )
+            return self.repo.get_pending_links(limit=limit, platform=platform, exclude_platforms=paused)
+
+        candidates = self.repo.get_pending_links(
+            limit=limit * max(1, self.settings.SCHEDULER_WINDOW_FACTOR),
+            platform=platform,
+            exclude_platforms=paused,
+            include_expired_leases=self.settings.QUEUE_LEASES,
+            per_client=limit
+        )
+        picked = self.scheduler.select(candidates, limit)
+        if not picked or not self.settings.QUEUE_LEASES:
+            return picked
+
+        order = [link['LIMW_CD_LINK_MIDIA_SOCIAL_WEB'] for link in picked]
+        claimed = self.repo.claim_pending_links(
+            self.worker_id,
+            limit=len(order),
+            lease_seconds=self.settings.LEASE_SECONDS,
+            link_ids=order
+        )
+        # Keep the scheduler's order; links claimed by another worker meanwhile are dropped
+        position = {lid: i for i, lid in enumerate(order)}
+        return sorted(claimed, key=lambda link: position[link['LIMW_CD_LINK_MIDIA_SOCIAL_WEB']])
+
+    async def _prefetch(self, job: dict, stop_event: asyncio.Event = None) -> bool:
+        """
+        Runs while the link holds its platform slot and every scrape worker is busy.
+        With lookahead room, the link is admitted now (_may_start, which takes the
+        breaker's probe when half-open) and its page is opened and navigated before a
+        worker frees up. False leaves the link untouched (still pending).
+        """
+        if not self.prefetcher.has_room():
+            return True  # Checked when a worker frees up instead
+        if not await self._may_start(job, stop_event):
+            return False
+        job['admitted'] = True
+        await self.prefetcher.warm(job)
+        return True
+
+    async def _may_start(self, job: dict, stop_event: asyncio.Event = None) -> bool:
+        """
+        False when a shutdown was requested, the lease was lost or the platform's
+        circuit is open: the link is left untouched (still pending).
+        """
+        link_id = job['link_id']
+        if stop_event and stop_event.is_set():
+            return False
+        # The link may have waited for a slot longer than the lease: renew it before starting
+        if self.settings.QUEUE_LEASES and not await asyncio.to_thread(self.repo.renew_lease, link_id, self.worker_id, self.settings.LEASE_SECONDS):
+            logger.warning(f"Lease lost for link {link_id} (claimed by another worker). Skipping.")
+            return False
+        # Links of the same post wait on this one without passing here: renew theirs too
+        if self.settings.QUEUE_LEASES:
+            for follower in job['followers']:
+                if not follower['lease_lost']:
+                    follower['lease_lost'] = not await asyncio.to_thread(self.repo.renew_lease, follower['link_id'], self.worker_id, self.settings.LEASE_SECONDS)
+        # Checked last: in half-open state this lets exactly one probe through
+        breaker = self.breakers.get(job['platform'])
+        if breaker and not breaker.allow():
+            return False
+        return True
+
+    async def run_worker(self, interval: float = 30, limit: int = 10, platform: str = None, concurrency: int = 1, platform_limits: dict = None, stop_event: asyncio.Event = None):
+        """
+        Long-running mode: keeps the browser and spiders warm and polls the pending
+        queue every `interval` seconds until `stop_event` is set.
+        In-flight links are always finished before returning.
+        """
+        stop_event = stop_event or asyncio.Event()
+        await self.initialize()
+        logger.info(f"👷 Worker started (interval={interval}s, limit={limit}, platform={platform or 'All'}).")
+
+        while not stop_event.is_set():
+            try:
+                outcomes = await self.process_batch(
+                    limit=limit,
+                    platform=platform,
+                    concurrency=concurrency,
+                    platform_limits=platform_limits,
+                    stop_event=stop_event
+                )
+            except Exception as e:
+                logger.error(f"Worker cycle failed: {e}")
+                outcomes = {}
+
+            # A full batch means there is probably more backlog: poll again right away
+            if len(outcomes) >= limit:
+                continue
+
+            try:
+                await asyncio.wait_for(stop_event.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
 
-        logger.info(f"Batch completed. Success: {success_count}/{len(links)}")
+        logger.info("👋 Worker stopping: no more links will be started.")
 
     async def cleanup(self):
+        await self.watchdog.close()
+        if self.prefetcher:
+            await self.prefetcher.clear()
+        await self.sessions.close()
+        await self.adapter_pool.close()
+        self.encoder.close()
         if self.browser_manager:
             await self.browser_manager.close()
             logger.info("Resources released.")
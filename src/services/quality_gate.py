@@ -0,0 +1,118 @@
+import logging
+import os
+import threading
+import time
+
+try:
+    import numpy as np
+    from PIL import Image
+except ImportError: # Sem NumPy/Pillow o portão fica desligado (toda captura passa)
+    np = None
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Largura usada na análise (a imagem é reduzida antes: o custo fica em milissegundos)
+ANALYSIS_WIDTH = 256
+# dHash de 8x8 = 64 bits
+HASH_SIZE = 8
+REFERENCE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+def load_gray(path: str):
+    """Grayscale uint8 array of the image, reduced to ANALYSIS_WIDTH."""
+    with Image.open(path) as image:
+        image.draft("L", (ANALYSIS_WIDTH, ANALYSIS_WIDTH)) # JPEG: já decodifica reduzido
+        gray = image.convert("L")
+    if gray.width > ANALYSIS_WIDTH:
+        gray = gray.resize((ANALYSIS_WIDTH, max(1, gray.height * ANALYSIS_WIDTH // gray.width)), Image.BILINEAR)
+    return np.asarray(gray, dtype=np.uint8)
+
+def dhash(gray) -> int:
+    """64-bit difference hash: each bit says whether a pixel is brighter than its left neighbour."""
+    small = np.asarray(Image.fromarray(gray).resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+def blank_metrics(gray) -> tuple:
+    """(entropy in bits, share of pixels within +/-4 levels of the dominant tone)."""
+    hist = np.bincount(gray.ravel(), minlength=256).astype(np.float64)
+    total = hist.sum() or 1.0
+    p = hist[hist > 0] / total
+    entropy = max(0.0, float(-(p * np.log2(p)).sum()))
+    dominant = float(np.convolve(hist, np.ones(9), mode="same").max() / total)
+    return entropy, dominant
+
+class QualityGate:
+    """
+    Rejects screenshots that are not a post: blank or half-loaded frames (almost one
+    tone / very low entropy) and captures that look like a known-bad reference of the
+    platform (login wall, "content unavailable" box, error page), compared by dHash.
+
+    References are images in `<refs_dir>/<platform>/` (and `<refs_dir>/common/`),
+    hashed once on first use. check() does blocking file I/O: call it through
+    asyncio.to_thread.
+    """
+
+    def __init__(self, refs_dir: str = "quality_refs", min_entropy: float = 0.05, blank_max: float = 0.998,
+                 hash_distance: int = 6):
+        self.refs_dir = refs_dir
+        self.min_entropy = min_entropy
+        self.blank_max = blank_max
+        self.hash_distance = hash_distance
+        self.enabled = np is not None
+        self._refs = {}  # platform -> (names, np.uint64 hashes)
+        self._lock = threading.Lock()
+        self.stats = {"checked": 0, "rejected": 0, "ms": 0.0}
+        if not self.enabled:
+            logger.warning("NumPy/Pillow not installed: capture quality gate disabled.")
+
+    def _references(self, platform: str) -> tuple:
+        with self._lock:
+            if platform not in self._refs:
+                names, hashes = [], []
+                for folder in (platform, "common"):
+                    path = os.path.join(self.refs_dir, folder)
+                    if not os.path.isdir(path):
+                        continue
+                    for name in sorted(os.listdir(path)):
+                        if not name.lower().endswith(REFERENCE_EXTENSIONS):
+                            continue
+                        try:
+                            hashes.append(dhash(load_gray(os.path.join(path, name))))
+                            names.append(f"{folder}/{name}")
+                        except Exception as e:
+                            logger.warning(f"Ignoring quality reference {folder}/{name}: {e}")
+                self._refs[platform] = (names, np.array(hashes, dtype=np.uint64))
+                if names:
+                    logger.info(f"Quality gate: {len(names)} reference capture(s) for {platform}.")
+            return self._refs[platform]
+
+    def check(self, image_path: str, platform: str) -> dict:
+        """Returns {"ok", "reason", "entropy", "dominant", "hash", "match", "distance", "ms"}."""
+        if not self.enabled:
+            return {"ok": True, "reason": None}
+        started = time.perf_counter()
+        gray = load_gray(image_path)
+        entropy, dominant = blank_metrics(gray)
+        image_hash = dhash(gray)
+        verdict = {"ok": True, "reason": None, "entropy": round(entropy, 2), "dominant": round(dominant, 3),
+                   "hash": f"{image_hash:016x}", "match": None, "distance": None}
+
+        names, hashes = self._references(platform)
+        if len(names):
+            # Distância de Hamming para todas as referências de uma vez
+            xor = np.bitwise_xor(hashes, np.uint64(image_hash))
+            distances = np.unpackbits(xor.view(np.uint8)).reshape(len(names), 64).sum(axis=1)
+            best = int(distances.argmin())
+            verdict["match"], verdict["distance"] = names[best], int(distances[best])
+
+        if dominant >= self.blank_max or entropy < self.min_entropy:
+            verdict.update(ok=False, reason=f"blank frame (entropy {entropy:.2f}, {dominant:.1%} one tone)")
+        elif verdict["distance"] is not None and verdict["distance"] <= self.hash_distance:
+            verdict.update(ok=False, reason=f"looks like {verdict['match']} (distance {verdict['distance']})")
+
+        verdict["ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.stats["checked"] += 1
+        self.stats["rejected"] += not verdict["ok"]
+        self.stats["ms"] += verdict["ms"]
+        return verdict
@@ -0,0 +1,35 @@
+import random
+from src.legacy_adapter.run_adapter import AdapterNotFoundError
+
+PERMANENT = "permanent"
+TRANSIENT = "transient"
+
+class PermanentError(Exception):
+    """A failure that will not go away by retrying (bad URL, post removed, ...)."""
+
+# Trechos de mensagens de erro que indicam falha definitiva. O 404 só conta na mensagem dos próprios
+# spiders ("Post not found (404)"): um "404" solto casaria com IDs de tweets e shortcodes nas URLs
+PERMANENT_MESSAGES = (
+    "not found (404)",
+    "Cannot navigate to invalid URL",
+    "net::ERR_NAME_NOT_RESOLVED",
+    "net::ERR_INVALID_URL",
+)
+
+def classify_error(error) -> str:
+    """
+    Returns PERMANENT or TRANSIENT for an exception or error message.
+    Permanent: missing LegacyAdapter.exe, bad URL, post/account not found.
+    Everything else (timeouts, throttling, adapter/DB hiccups, missing capture files) is transient.
+    """
+    if isinstance(error, (PermanentError, AdapterNotFoundError)):
+        return PERMANENT
+    message = str(error)
+    if any(fragment in message for fragment in PERMANENT_MESSAGES):
+        return PERMANENT
+    return TRANSIENT
+
+def retry_delay(attempts: int, base_delay: float, max_delay: float) -> int:
+    """Exponential backoff (base, 2x base, 4x base, ...) capped at max_delay, with +/-20% jitter."""
+    delay = min(max_delay, base_delay * 2 ** max(0, attempts))
+    return int(delay * random.uniform(0.8, 1.2))
@@ -0,0 +1,107 @@
+import logging
+from collections import defaultdict, deque
+from datetime import date, datetime
+from typing import Optional
+from src.scraper.core.urls import detect_platform
+
+logger = logging.getLogger(__name__)
+
+class FairShareScheduler:
+    """
+    Picks which pending links a batch takes from a wider candidate window.
+
+    - Priority tiers: links published in the last `priority_hours` go first
+      (0 disables tiers). Inside a tier, the order is fair share.
+    - Weighted fair share per client (CLIE_CD_CLIENTE): each pick advances the client's
+      virtual time by 1/weight and the next link comes from the client with the lowest
+      time, so a client that dumps 2,000 links gets its share, not the whole queue.
+    - Inside that client, the platform with the lowest virtual time (counted over all
+      clients) goes next, so a slow platform backlog does not hold up the others.
+
+    Virtual times persist across batches (worker mode). A client or platform that comes
+    back after being idle starts at the current minimum instead of its old, lower time,
+    so it cannot burst ahead of the ones that kept waiting.
+    """
+
+    def __init__(self, client_weights: dict = None, platform_weights: dict = None, priority_hours: float = 24):
+        self.client_weights = {str(k): float(v) for k, v in (client_weights or {}).items()}
+        self.platform_weights = {str(k).lower(): float(v) for k, v in (platform_weights or {}).items()}
+        self.priority_hours = priority_hours
+        self.client_time = defaultdict(float)
+        self.platform_time = defaultdict(float)
+        # Keys that had links waiting in the previous call
+        self._backlogged = {'client': set(), 'platform': set()}
+
+    def select(self, candidates: list, limit: int, now: datetime = None) -> list:
+        """Returns up to `limit` candidate rows, in the order they should be processed."""
+        now = now or datetime.now()
+        tiers = defaultdict(lambda: defaultdict(lambda: defaultdict(deque)))
+        for link in candidates:
+            client = str(link.get('CLIE_CD_CLIENTE'))
+            platform = detect_platform(link.get('LIMW_TX_LINK') or '') or 'unknown'
+            tiers[self._tier(link, now)][client][platform].append(link)
+
+        selected = []
+        for tier in sorted(tiers):
+            queues = tiers[tier]
+            self._catch_up(self.client_time, set(queues), self._backlogged['client'])
+            self._catch_up(self.platform_time, {p for platforms in queues.values() for p in platforms},
+                           self._backlogged['platform'])
+            while queues and len(selected) < limit:
+                client = min(queues, key=lambda c: (self.client_time[c], c))
+                platforms = queues[client]
+                platform = min(platforms, key=lambda p: (self.platform_time[p], p))
+
+                selected.append(platforms[platform].popleft())
+                self.client_time[client] += 1 / self._weight(self.client_weights, client)
+                self.platform_time[platform] += 1 / self._weight(self.platform_weights, platform)
+
+                if not platforms[platform]:
+                    del platforms[platform]
+                if not platforms:
+                    del queues[client]
+
+        # Whatever was left behind is still waiting at the next call
+        self._backlogged = {
+            'client': {str(l.get('CLIE_CD_CLIENTE')) for l in candidates},
+            'platform': {detect_platform(l.get('LIMW_TX_LINK') or '') or 'unknown' for l in candidates},
+        }
+        if len(candidates) > len(selected):
+            logger.info(f"🗂️ Scheduler: picked {len(selected)} of {len(candidates)} candidates "
+                        f"({len({str(l.get('CLIE_CD_CLIENTE')) for l in candidates})} clients).")
+        return selected
+
+    def _tier(self, link: dict, now: datetime) -> int:
+        """0 = recent publication (goes first), 1 = the rest."""
+        if not self.priority_hours:
+            return 0
+        published = self._as_datetime(link.get('LIMW_DT_DATA_PUBLICAÇÃO'))
+        if published and (now - published).total_seconds() <= self.priority_hours * 3600:
+            return 0
+        return 1
+
+    @staticmethod
+    def _as_datetime(value) -> Optional[datetime]:
+        if isinstance(value, datetime):
+            return value
+        if isinstance(value, date):
+            return datetime(value.year, value.month, value.day)
+        return None
+
+    @staticmethod
+    def _weight(weights: dict, key: str) -> float:
+        return max(weights.get(key, 1.0), 0.01)
+
+    @staticmethod
+    def _catch_up(times: dict, active: set, previously_backlogged: set):
+        """
+        Raises keys that were not waiting in the previous call (new or returning) to the
+        lowest time among the ones that kept waiting (or to the highest known time).
+        """
+        waiting = active & previously_backlogged
+        if waiting:
+            floor = min(times[key] for key in waiting)
+        else:
+            floor = max(times.values(), default=0.0)
+        for key in active - waiting:
+            times[key] = max(times.get(key, floor), floor)
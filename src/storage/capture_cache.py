@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+class CaptureCache:
+    """
+    Content-addressed cache of captures, keyed by canonical post URL.
+
+    Each entry lives in `<root>/<hh>/<sha256>/` with the image, the text and a
+    meta.json (URL, platform, creation time, extra result fields). Entries older
+    than `ttl` seconds are stale and ignored; when the cache grows past `max_bytes`
+    the least recently used entries are evicted.
+
+    Methods do blocking file I/O: call them through asyncio.to_thread from the event loop.
+    """
+
+    META_FILE = "meta.json"
+
+    def __init__(self, root: str = "captures/cache", ttl: float = 86400, max_bytes: int = 2 * 1024 ** 3):
+        self.root = root
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._index = None  # key -> {"size": int, "accessed": float}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(canonical_url: str) -> str:
+        return hashlib.sha256(canonical_url.encode("utf-8")).hexdigest()
+
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def get(self, canonical_url: str) -> Optional[dict]:
+        """Returns a spider-style result for a fresh entry, or None."""
+        key = self.key_for(canonical_url)
+        entry_dir = self._entry_dir(key)
+        meta_path = os.path.join(entry_dir, self.META_FILE)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        age = time.time() - meta.get("created_at", 0)
+        if age > self.ttl:
+            return None
+
+        image_path = os.path.join(entry_dir, meta["image_file"])
+        text_path = os.path.join(entry_dir, meta["text_file"])
+        if not (os.path.exists(image_path) and os.path.exists(text_path)):
+            return None
+
+        with self._lock:
+            self._load_index()
+            if key in self._index:
+                self._index[key]["accessed"] = time.time()
+        os.utime(meta_path)  # LRU order survives restarts
+
+        result = dict(meta.get("extra", {}))
+        result.update({
+            "status": "success",
+            "image_path": image_path,
+            "text_path": text_path,
+            "cached": True,
+            "cache_age": round(age),
+        })
+        return result
+
+    def put(self, canonical_url: str, platform: str, result: dict) -> Optional[dict]:
+        """Stores a successful capture and returns the cached result (paths inside the cache)."""
+        key = self.key_for(canonical_url)
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp{threading.get_ident()}"
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            os.makedirs(tmp_dir, exist_ok=True)
+            image_file = "image" + os.path.splitext(result["image_path"])[1]
+            text_file = "text.txt"
+            shutil.copyfile(result["image_path"], os.path.join(tmp_dir, image_file))
+            shutil.copyfile(result["text_path"], os.path.join(tmp_dir, text_file))
+            meta = {
+                "canonical_url": canonical_url,
+                "platform": platform,
+                "created_at": time.time(),
+                "image_file": image_file,
+                "text_file": text_file,
+                # Extra fields the adapter stage may use (e.g. pub_date); paths are not kept
+                "extra": {k: v for k, v in result.items()
+                          if k not in ("status", "image_path", "text_path") and isinstance(v, (str, int, float, bool))},
+            }
+            with open(os.path.join(tmp_dir, self.META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+
+            # Swap the new entry in (replaces a stale one)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.replace(tmp_dir, entry_dir)
+        except (OSError, KeyError) as e:
+            logger.warning(f"⚠️ Could not cache capture of {canonical_url}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            return None
+
+        with self._lock:
+            self._load_index()
+            self._index[key] = {"size": self._dir_size(entry_dir), "accessed": time.time()}
+            self._evict()
+        return self.get(canonical_url)
+
+    def invalidate(self, canonical_url: str):
+        key = self.key_for(canonical_url)
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+        with self._lock:
+            if self._index is not None:
+                self._index.pop(key, None)
+
+    def _load_index(self):
+        """Scans the cache directory once; afterwards the index is kept in memory."""
+        if self._index is not None:
+            return
+        self._index = {}
+        if not os.path.isdir(self.root):
+            return
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                meta_path = os.path.join(entry.path, self.META_FILE)
+                if entry.is_dir() and os.path.exists(meta_path):
+                    self._index[entry.name] = {
+                        "size": self._dir_size(entry.path),
+                        "accessed": os.path.getmtime(meta_path),
+                    }
+
+    def _evict(self):
+        total = sum(item["size"] for item in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, item in sorted(self._index.items(), key=lambda kv: kv[1]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            total -= item["size"]
+            del self._index[key]
+            logger.info(f"🧹 Capture cache: evicted {key[:12]} ({item['size']} bytes).")
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import logging
+import os
+import re
+import shutil
+import time
+from datetime import date, timedelta
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Pastas de dia (<root>/AAAA-MM-DD/) e arquivos de captura (<plataforma>_<link_id>.<ext>)
+DAY_DIR = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+CAPTURE_FILE = re.compile(r"^(?P<platform>[a-z]+)_(?P<link_id>\d+)\.\w+$")
+# Status do link quando o LegacyAdapter confirmou o envio
+CONFIRMED_STATUS = 2
+# Margem antes de apagar capturas confirmadas (links da mesma URL ainda podem estar no adapter)
+CONFIRMED_MIN_AGE = 3600
+
+class CaptureStore:
+    """
+    Where the spiders write their captures: `<root>/<YYYY-MM-DD>/<hh>/<platform>_<link_id>.<ext>`,
+    with `hh` taken from a hash of the file name, so no directory grows past a few
+    hundred entries and a whole day can be dropped at once.
+
+    gc() applies the retention policy: day folders (and old flat files from the
+    previous layout) older than `retention_days` are removed; with `prune_confirmed`,
+    captures of links the adapter already confirmed (status 2) are removed sooner.
+    Other folders under the root (e.g. the capture cache) are left alone.
+    """
+
+    def __init__(self, root: str = "captures", retention_days: int = 30, prune_confirmed: bool = True):
+        self.root = root
+        self.retention_days = retention_days
+        self.prune_confirmed = prune_confirmed
+
+    async def file_path(self, name: str, day: Optional[date] = None) -> str:
+        """Path of `name` in its shard for `day` (today by default); the folder is created in a worker thread."""
+        shard = hashlib.sha1(name.encode("utf-8")).hexdigest()[:2]
+        folder = os.path.join(self.root, (day or date.today()).isoformat(), shard)
+        await asyncio.to_thread(os.makedirs, folder, exist_ok=True)
+        return os.path.join(folder, name)
+
+    async def capture_paths(self, platform: str, link_id) -> tuple:
+        """(image_path, text_path) for a new capture of a link."""
+        return (
+            await self.file_path(f"{platform}_{link_id}.png"),
+            await self.file_path(f"{platform}_{link_id}.txt"),
+        )
+
+    @staticmethod
+    async def write_text(path: str, text: str, encoding: str = "utf-8"):
+        """Writes the caption file in a worker thread (the event loop keeps going)."""
+        def write():
+            with open(path, "w", encoding=encoding) as f:
+                f.write(text)
+        await asyncio.to_thread(write)
+
+    # ------------------------------------------------------------------
+    # Retenção
+    # ------------------------------------------------------------------
+
+    def gc(self, link_statuses: Optional[Callable[[list], dict]] = None, dry_run: bool = False, today: Optional[date] = None) -> dict:
+        """
+        Prunes captures and returns {"files", "bytes", "days", "confirmed"}.
+        link_statuses(link_ids) -> {link_id: status} is used for `prune_confirmed`.
+        """
+        report = {"files": 0, "bytes": 0, "days": 0, "confirmed": 0}
+        if not os.path.isdir(self.root):
+            return report
+        cutoff = (today or date.today()) - timedelta(days=self.retention_days)
+        cutoff_ts = time.time() - self.retention_days * 86400
+        candidates = []  # (path, link_id) ainda dentro da retenção
+
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and DAY_DIR.match(entry.name):
+                if date.fromisoformat(entry.name) < cutoff:
+                    files, size = self._tree_size(entry.path)
+                    report["files"] += files
+                    report["bytes"] += size
+                    report["days"] += 1
+                    if not dry_run:
+                        shutil.rmtree(entry.path, ignore_errors=True)
+                else:
+                    for shard in os.scandir(entry.path):
+                        if shard.is_dir():
+                            candidates.extend(self._captures_in(shard.path))
+            elif entry.is_file():
+                # Arquivos soltos do layout antigo (captures/<plataforma>_<id>.png)
+                if entry.stat().st_mtime < cutoff_ts:
+                    self._remove(entry.path, report, dry_run)
+                else:
+                    capture = self._capture(entry)
+                    if capture:
+                        candidates.append(capture)
+
+        if self.prune_confirmed and link_statuses and candidates:
+            statuses = link_statuses(sorted({link_id for _, link_id in candidates}))
+            min_mtime = time.time() - CONFIRMED_MIN_AGE
+            for path, link_id in candidates:
+                if statuses.get(link_id) == CONFIRMED_STATUS and os.path.getmtime(path) < min_mtime:
+                    self._remove(path, report, dry_run)
+                    report["confirmed"] += 1
+
+        if not dry_run:
+            self._remove_empty_dirs()
+        return report
+
+    @staticmethod
+    def _capture(entry: os.DirEntry) -> Optional[tuple]:
+        """(path, link_id) when the entry is a capture file."""
+        match = CAPTURE_FILE.match(entry.name)
+        return (entry.path, int(match.group("link_id"))) if match else None
+
+    @classmethod
+    def _captures_in(cls, folder: str) -> list:
+        captures = (cls._capture(entry) for entry in os.scandir(folder) if entry.is_file())
+        return [capture for capture in captures if capture]
+
+    @staticmethod
+    def _remove(path: str, report: dict, dry_run: bool):
+        try:
+            size = os.path.getsize(path)
+            if not dry_run:
+                os.remove(path)
+        except OSError as e:
+            logger.warning(f"Could not remove {path}: {e}")
+            return
+        report["files"] += 1
+        report["bytes"] += size
+
+    @staticmethod
+    def _tree_size(path: str) -> tuple:
+        files = size = 0
+        for folder, _, names in os.walk(path):
+            for name in names:
+                try:
+                    size += os.path.getsize(os.path.join(folder, name))
+                    files += 1
+                except OSError:
+                    pass
+        return files, size
+
+    def _remove_empty_dirs(self):
+        for entry in os.scandir(self.root):
+            if not (entry.is_dir() and DAY_DIR.match(entry.name)):
+                continue
+            for shard in os.scandir(entry.path):
+                if shard.is_dir() and not any(os.scandir(shard.path)):
+                    os.rmdir(shard.path)
+            if not any(os.scandir(entry.path)):
+                os.rmdir(entry.path)
@@ -0,0 +1,170 @@
+import asyncio
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+try:
+    from PIL import Image
+except ImportError: # Sem Pillow as capturas seguem em PNG, como o spider gravou
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+# Formato -> (nome no Pillow, extensão do arquivo)
+FORMATS = {
+    "png": ("PNG", ".png"),
+    "jpeg": ("JPEG", ".jpg"),
+    "webp": ("WEBP", ".webp"),
+}
+# O LegacyAdapter abre a captura com GDI+ (new Bitmap(caminho)), que não lê WebP
+ADAPTER_FORMATS = ("png", "jpeg")
+# Degraus para caber no orçamento de bytes: primeiro a qualidade, depois a escala
+MIN_QUALITY = 40
+QUALITY_STEP = 10
+MIN_WIDTH = 480
+
+def _save(image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "PNG":
+        image.save(buffer, fmt, optimize=True)
+    elif fmt == "WEBP":
+        image.save(buffer, fmt, quality=quality, method=4)
+    else:
+        image.save(buffer, fmt, quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+def encode_image(src: str, fmt: str = "jpeg", quality: int = 85, max_width: int = 0,
+                 max_height: int = 0, max_bytes: int = 0) -> dict:
+    """
+    Re-encodes a screenshot (runs in a worker process). Downscales to fit
+    max_width x max_height, then, while the output is above `max_bytes`, lowers the
+    quality (JPEG/WebP) and after that the scale. Writes `<src base><ext>` and removes
+    `src` when the extension changed. Returns a report with sizes, dimensions and time.
+    """
+    started = time.perf_counter()
+    pil_format, ext = FORMATS[fmt]
+    bytes_in = os.path.getsize(src)
+    with Image.open(src) as opened:
+        image = opened.copy()
+    original_size = image.size
+
+    if pil_format == "JPEG" and image.mode != "RGB":
+        # JPEG não tem transparência: compõe sobre fundo branco
+        background = Image.new("RGB", image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert("RGBA").split()[-1])
+        image = background
+    elif image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA")
+
+    if max_width or max_height:
+        image.thumbnail((max_width or image.width, max_height or image.height), Image.LANCZOS)
+
+    data = _save(image, pil_format, quality)
+    while max_bytes and len(data) > max_bytes:
+        if pil_format != "PNG" and quality - QUALITY_STEP >= MIN_QUALITY:
+            quality -= QUALITY_STEP
+        elif image.width > MIN_WIDTH:
+            scale = max(0.5, min(0.9, (max_bytes / len(data)) ** 0.5))
+            width = max(MIN_WIDTH, int(image.width * scale))
+            image = image.resize((width, max(1, int(image.height * width / image.width))), Image.LANCZOS)
+        else:
+            break # Menor não fica legível: entrega acima do orçamento
+        data = _save(image, pil_format, quality)
+
+    dest = os.path.splitext(src)[0] + ext
+    tmp = dest + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, dest)
+    if os.path.abspath(dest) != os.path.abspath(src):
+        os.remove(src)
+
+    return {
+        "path": dest,
+        "format": fmt,
+        "bytes_in": bytes_in,
+        "bytes_out": len(data),
+        "size_in": original_size,
+        "size_out": image.size,
+        "quality": quality if pil_format != "PNG" else None,
+        "over_budget": bool(max_bytes and len(data) > max_bytes),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+class CaptureEncoder:
+    """
+    Encoding stage for screenshots: format (png/jpeg/webp), quality, max dimensions
+    and a byte budget. The work runs in a process pool so the event loop (and the
+    browser) keeps going; each image's sizes and encode time are logged and summed.
+
+    With the defaults (png, no limits) it is off and the spider's PNG is used as is.
+    With `for_adapter` (the captures go to LegacyAdapter), only ADAPTER_FORMATS are
+    accepted, so a format the adapter cannot open stops the run at startup instead
+    of failing every link.
+    """
+
+    def __init__(self, fmt: str = "png", quality: int = 85, max_width: int = 0, max_height: int = 0,
+                 max_kb: int = 0, workers: int = 2, for_adapter: bool = True):
+        self.fmt = fmt.lower()
+        self.quality = quality
+        self.max_width = max_width
+        self.max_height = max_height
+        self.max_bytes = max_kb * 1024
+        self.workers = max(1, workers)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.totals = {"images": 0, "bytes_in": 0, "bytes_out": 0, "seconds": 0.0, "over_budget": 0, "failed": 0}
+        self.enabled = self.fmt != "png" or bool(max_width or max_height or max_kb)
+        if self.fmt not in FORMATS:
+            raise ValueError(f"Unknown capture format '{fmt}' (use one of: {', '.join(FORMATS)})")
+        if for_adapter and self.fmt not in ADAPTER_FORMATS:
+            raise ValueError(
+                f"Capture format '{fmt}' cannot be read by LegacyAdapter (System.Drawing.Bitmap); "
+                f"use one of: {', '.join(ADAPTER_FORMATS)}"
+            )
+        if self.enabled and Image is None:
+            logger.warning("Pillow not installed: captures are kept as the spiders' PNGs.")
+            self.enabled = False
+
+    async def encode(self, image_path: str, label: str = "") -> str:
+        """Re-encodes `image_path` and returns the new path (the original one if disabled or on failure)."""
+        if not self.enabled:
+            return image_path
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            report = await asyncio.get_running_loop().run_in_executor(
+                self._pool, encode_image, image_path, self.fmt, self.quality,
+                self.max_width, self.max_height, self.max_bytes
+            )
+        except Exception as e:
+            self.totals["failed"] += 1
+            logger.warning(f"[{label}] Could not encode {image_path}, keeping it as is: {e}")
+            return image_path
+
+        self.totals["images"] += 1
+        self.totals["bytes_in"] += report["bytes_in"]
+        self.totals["bytes_out"] += report["bytes_out"]
+        self.totals["seconds"] += report["seconds"]
+        self.totals["over_budget"] += report["over_budget"]
+        quality = f", q{report['quality']}" if report["quality"] else ""
+        budget = " (over budget)" if report["over_budget"] else ""
+        logger.info(
+            f"🗜️ [{label}] {report['bytes_in'] // 1024}KB {report['size_in'][0]}x{report['size_in'][1]} -> "
+            f"{report['bytes_out'] // 1024}KB {report['size_out'][0]}x{report['size_out'][1]} {report['format']}{quality} "
+            f"in {report['seconds']:.2f}s{budget}"
+        )
+        return report["path"]
+
+    def snapshot(self) -> dict:
+        totals = dict(self.totals, seconds=round(self.totals["seconds"], 2))
+        if totals["bytes_in"]:
+            totals["ratio"] = round(totals["bytes_out"] / totals["bytes_in"], 3)
+        return totals
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
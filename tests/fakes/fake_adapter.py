@@ -0,0 +1,88 @@
+"""
+Stand-in for LegacyAdapter.exe: same arguments, same exit codes, no .NET or database.
+
+    python fake_adapter.py <LinkID> <FilePath> <Text> <Date> <Veiculo> <Canal> <Client>
+    python fake_adapter.py --serve   (JSON lines over stdin/stdout, as Program.Serve)
+
+Behaviour comes from the environment (inherited from the test process):
+    FAKE_ADAPTER_SLEEP        seconds to "work" before answering (default 0)
+    FAKE_ADAPTER_EXIT         exit code of the run (default 0)
+    FAKE_ADAPTER_LOG          file that receives "start <link>" / "end <link>" lines
+    FAKE_ADAPTER_SERVE=0      old binary: --serve is not understood (usage error, exit 1)
+    FAKE_ADAPTER_CRASH_ON     --serve: exit without answering when this link id arrives
+    FAKE_ADAPTER_EXIT_AFTER   --serve: exit after answering this many jobs
+    FAKE_ADAPTER_OUTPUT_SIZE  --serve: extra characters appended to each job log
+"""
+import json
+import os
+import sys
+import time
+
+
+def log(event: str, link_id: str):
+    path = os.environ.get("FAKE_ADAPTER_LOG")
+    if path:
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(f"{event} {link_id} {time.monotonic()}\n")
+
+
+def main(args: list) -> int:
+    if len(args) < 7:
+        print("Error: Missing arguments. Expected: LinkID FilePath Text Date(yyyy-MM-dd) Veiculo Canal Client")
+        return 1
+    link_id = args[0]
+    log("start", link_id)
+    time.sleep(float(os.environ.get("FAKE_ADAPTER_SLEEP", "0")))
+    log("end", link_id)
+    exit_code = int(os.environ.get("FAKE_ADAPTER_EXIT", "0"))
+    print("SUCCESS" if exit_code == 0 else f"ERROR: fake failure for link {link_id}", flush=True)
+    return exit_code
+
+
+def serve() -> int:
+    protocol = sys.stdout
+    protocol.reconfigure(encoding="utf-8", newline="\n")
+    protocol.write(json.dumps({"ready": True}) + "\n")
+    protocol.flush()
+
+    served = 0
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        job = json.loads(line)
+        link_id = str(job["link_id"])
+        if os.environ.get("FAKE_ADAPTER_CRASH_ON") == link_id:
+            os._exit(3)
+        log("start", link_id)
+        time.sleep(float(os.environ.get("FAKE_ADAPTER_SLEEP", "0")))
+        log("end", link_id)
+        print(f"[fake] job {job['id']} done", file=sys.stderr, flush=True)
+
+        # Log de várias linhas, com acentos, como o do ManagerDB
+        output = f"processing link {link_id}\nmatéria gravada ✓\n" + "x" * int(os.environ.get("FAKE_ADAPTER_OUTPUT_SIZE", "0"))
+        response = json.dumps({
+            "id": job["id"],
+            "link_id": job["link_id"],
+            "success": True,
+            "materia_id": 1000 + int(link_id),
+            "error": None,
+            "output": output,
+        }, ensure_ascii=False)
+        # A resposta chega em dois pedaços: quem lê precisa esperar o fim da linha
+        half = len(response) // 2
+        protocol.write(response[:half])
+        protocol.flush()
+        time.sleep(0.01)
+        protocol.write(response[half:] + "\n")
+        protocol.flush()
+
+        served += 1
+        if served == int(os.environ.get("FAKE_ADAPTER_EXIT_AFTER", "0")):
+            return 0
+    return 0
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--serve"] and os.environ.get("FAKE_ADAPTER_SERVE") != "0":
+        sys.exit(serve())
+    sys.exit(main(sys.argv[1:]))
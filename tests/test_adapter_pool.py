@@ -0,0 +1,80 @@
+import asyncio
+import os
+import sys
+import time
+
+from src.legacy_adapter.adapter_pool import AdapterPool
+
+FAKE_ADAPTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fakes", "fake_adapter.py")
+
+
+def capture_files(tmp_path):
+    image, text = tmp_path / "capture.png", tmp_path / "capture.txt"
+    image.write_bytes(b"png")
+    text.write_text("legenda", encoding="utf-8")
+    return str(image), str(text)
+
+
+def run_links(pool: AdapterPool, tmp_path, link_ids) -> list:
+    image, text = capture_files(tmp_path)
+
+    async def main():
+        return await asyncio.gather(*(
+            pool.run(link_id, image, text, "2025-12-29", 1, 2, 3) for link_id in link_ids
+        ))
+
+    return asyncio.run(main())
+
+
+def make_pool(**kwargs) -> AdapterPool:
+    return AdapterPool(command=[sys.executable, FAKE_ADAPTER], **kwargs)
+
+
+def test_successful_run_reports_output(tmp_path):
+    [report] = run_links(make_pool(), tmp_path, [10])
+
+    assert report["success"] is True
+    assert report["exit_code"] == 0
+    assert report["timed_out"] is False
+    assert "SUCCESS" in report["stdout"]
+
+
+def test_hung_adapter_is_killed_after_timeout(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADAPTER_SLEEP", "30")
+
+    started = time.monotonic()
+    [report] = run_links(make_pool(timeout=0.5), tmp_path, [11])
+
+    assert time.monotonic() - started < 10
+    assert report["timed_out"] is True
+    assert report["success"] is False
+    assert report["exit_code"] != 0
+
+
+def test_non_zero_exit_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADAPTER_EXIT", "3")
+
+    [report] = run_links(make_pool(), tmp_path, [12])
+
+    assert report["success"] is False
+    assert report["timed_out"] is False
+    assert report["exit_code"] == 3
+    assert "fake failure for link 12" in report["stdout"]
+
+
+def test_parallel_runs_are_capped(tmp_path, monkeypatch):
+    log = tmp_path / "adapter.log"
+    monkeypatch.setenv("FAKE_ADAPTER_SLEEP", "0.3")
+    monkeypatch.setenv("FAKE_ADAPTER_LOG", str(log))
+
+    reports = run_links(make_pool(max_parallel=2), tmp_path, range(20, 26))
+
+    assert all(report["success"] for report in reports)
+    events = sorted(
+        (float(at), event) for event, _, at in (line.split() for line in log.read_text().splitlines())
+    )
+    running = peak = 0
+    for _, event in events:
+        running += 1 if event == "start" else -1
+        peak = max(peak, running)
+    assert peak == 2
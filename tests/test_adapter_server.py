@@ -0,0 +1,85 @@
+import asyncio
+import os
+import sys
+
+from src.legacy_adapter.adapter_pool import AdapterPool
+
+FAKE_ADAPTER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fakes", "fake_adapter.py")
+
+
+def run_in_sequence(tmp_path, link_ids, between=None, **pool_kwargs):
+    """Runs the links one after the other on a persistent pool; returns (reports, server pids, pool)."""
+    image, text = tmp_path / "capture.png", tmp_path / "capture.txt"
+    image.write_bytes(b"png")
+    text.write_text("legenda", encoding="utf-8")
+    pool = AdapterPool(command=[sys.executable, FAKE_ADAPTER], persistent=True, startup_timeout=10, **pool_kwargs)
+
+    async def main():
+        reports, pids = [], []
+        try:
+            for link_id in link_ids:
+                reports.append(await pool.run(link_id, str(image), str(text), "2025-12-29", 1, 2, 3))
+                pids.append(pool._idle_servers[-1].process.pid if pool._idle_servers else None)
+                if between:
+                    await asyncio.sleep(between)
+        finally:
+            await pool.close()
+        return reports, pids
+
+    reports, pids = asyncio.run(main())
+    return reports, pids, pool
+
+
+def test_jobs_reuse_one_server(tmp_path):
+    reports, pids, pool = run_in_sequence(tmp_path, [1, 2, 3])
+
+    assert [report["success"] for report in reports] == [True, True, True]
+    assert [report["materia_id"] for report in reports] == [1001, 1002, 1003]
+    assert len(set(pids)) == 1
+    assert pool.persistent is True
+
+
+def test_replies_are_framed_by_line(tmp_path, monkeypatch):
+    # Log grande e com quebras de linha, enviado em dois pedaços, mais ruído no stderr
+    monkeypatch.setenv("FAKE_ADAPTER_OUTPUT_SIZE", str(256 * 1024))
+
+    reports, _, _ = run_in_sequence(tmp_path, [7, 8])
+
+    for link_id, report in zip((7, 8), reports):
+        assert report["success"] is True
+        assert report["materia_id"] == 1000 + link_id
+        assert report["stdout"].startswith(f"processing link {link_id}\nmatéria gravada ✓\n")
+        assert len(report["stdout"]) > 256 * 1024
+
+
+def test_falls_back_to_one_shot_without_serve(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADAPTER_SERVE", "0")
+
+    reports, pids, pool = run_in_sequence(tmp_path, [1, 2])
+
+    assert pool.persistent is False
+    assert all(report["success"] for report in reports)
+    assert all("SUCCESS" in report["stdout"] for report in reports)
+    assert pids == [None, None]
+
+
+def test_server_is_replaced_after_crashing_mid_job(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADAPTER_CRASH_ON", "2")
+
+    reports, pids, pool = run_in_sequence(tmp_path, [1, 2, 3])
+
+    assert [report["success"] for report in reports] == [True, False, True]
+    assert reports[1]["exit_code"] == 3
+    assert "exited" in reports[1]["stderr"]
+    assert pids[1] is None
+    assert pids[0] != pids[2]
+    assert pool.persistent is True
+
+
+def test_server_that_exited_while_idle_is_replaced(tmp_path, monkeypatch):
+    monkeypatch.setenv("FAKE_ADAPTER_EXIT_AFTER", "1")
+
+    reports, pids, _ = run_in_sequence(tmp_path, [1, 2], between=0.5)
+
+    assert [report["success"] for report in reports] == [True, True]
+    assert pids[0] != pids[1]
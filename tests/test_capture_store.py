@@ -0,0 +1,50 @@
+import os
+import time
+from datetime import date
+
+from src.storage import capture_store
+from src.storage.capture_store import CaptureStore
+
+TODAY = date(2026, 3, 31)
+
+
+def touch(path, age_days: float = 0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 10)
+    mtime = time.time() - age_days * 86400
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_old_layout_is_pruned_in_a_single_pass(tmp_path, monkeypatch):
+    for link_id in range(1, 501):
+        touch(tmp_path / f"twitter_{link_id}.png", age_days=1)
+    expired = touch(tmp_path / "instagram_9001.png", age_days=40)
+    touch(tmp_path / "notes.txt", age_days=1)
+    scans = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(capture_store.os, "scandir", lambda path: scans.append(path) or real_scandir(path))
+
+    report = CaptureStore(root=str(tmp_path), retention_days=30).gc(
+        link_statuses=lambda ids: {link_id: 2 if link_id % 2 else 1 for link_id in ids}, today=TODAY)
+
+    assert scans.count(str(tmp_path)) <= 2  # gc pass + empty-folder sweep, not one per flat file
+    assert not expired.exists()
+    assert report["confirmed"] == 250
+    assert report["files"] == 251
+    assert not (tmp_path / "twitter_1.png").exists()
+    assert (tmp_path / "twitter_2.png").exists()
+    assert (tmp_path / "notes.txt").exists()
+
+
+def test_day_folders_past_retention_are_dropped(tmp_path):
+    touch(tmp_path / "2026-02-01" / "ab" / "twitter_1.png")
+    touch(tmp_path / "2026-03-30" / "cd" / "twitter_2.png", age_days=1)
+    touch(tmp_path / "cache" / "ef" / "entry.png", age_days=60)
+
+    report = CaptureStore(root=str(tmp_path), retention_days=30).gc(
+        link_statuses=lambda ids: {link_id: 2 for link_id in ids}, today=TODAY)
+
+    assert report["days"] == 1
+    assert report["confirmed"] == 1
+    assert sorted(os.listdir(tmp_path)) == ["cache"]
@@ -0,0 +1,231 @@
+import random
+import re
+import threading
+import time
+
+import pyodbc
+import pytest
+
+from src.database.repository import RETRY_COLUMNS, STATUS_IN_PROGRESS, SocialMediaRepository
+
+
+class LinkTable:
+    """
+    In-memory Link_MidiaSocial_Web that answers the claim statement the way SQL Server
+    does with UPDLOCK + READPAST: the statement is atomic, and rows locked by another
+    connection's open transaction are skipped (not waited for, not read).
+
+    This stand-in is atomic by construction, so the concurrency test below covers the
+    repository's side (one statement per claim, commit/rollback, rows handed back); the
+    SQL tests at the end pin down the statement that makes SQL Server behave this way.
+    """
+
+    def __init__(self, rows: dict, columns: tuple = ()):
+        self.rows = rows  # link_id -> {"status", "worker", "lease_expires"}
+        self.columns = set(columns)  # Migration columns that exist (002_link_retry.sql not applied by default)
+        self.lock = threading.Lock()
+        self.locked_by = {}  # link_id -> connection holding the row lock
+        self.statements = []  # (query, params) of every statement but the connection check
+
+    def claim(self, connection, limit: int, worker: str, lease_seconds: int) -> list:
+        now = time.monotonic()
+        with self.lock:
+            claimable = [
+                link_id for link_id, row in self.rows.items()
+                if link_id not in self.locked_by
+                and (row["status"] in (1, 9)
+                     or (row["status"] == STATUS_IN_PROGRESS and row["lease_expires"] < now))
+            ]
+            picked = sorted(claimable, reverse=True)[:limit]
+            for link_id in picked:
+                self.locked_by[link_id] = connection
+                connection.pending[link_id] = dict(self.rows[link_id])
+                self.rows[link_id].update(status=STATUS_IN_PROGRESS, worker=worker, lease_expires=now + lease_seconds)
+            return picked
+
+    def end_transaction(self, connection, commit: bool):
+        with self.lock:
+            for link_id, before in connection.pending.items():
+                if not commit:
+                    self.rows[link_id] = before
+                self.locked_by.pop(link_id, None)
+            connection.pending.clear()
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self._rows = []
+
+    def execute(self, query, *params):
+        params = list(params[0]) if len(params) == 1 and isinstance(params[0], (list, tuple)) else list(params)
+        if query != "SELECT 1":
+            self.connection.table.statements.append((query, params))
+        if "COL_LENGTH" in query:
+            self._rows = [(4 if params[0] in self.connection.table.columns else None,)]
+            return self
+        unknown = [c for c in RETRY_COLUMNS if c in query and c not in self.connection.table.columns]
+        if unknown:
+            raise pyodbc.ProgrammingError(f"Invalid column name '{unknown[0]}'.")
+        if "UPDATE candidates" in query:
+            # Without platform/client/link filters: [limit, in_progress, in_progress, worker, lease]
+            limit, worker, lease_seconds = params[0], params[-2], params[-1]
+            claimed = self.connection.table.claim(self.connection, limit, worker, lease_seconds)
+            self.description = [("LIMW_CD_LINK_MIDIA_SOCIAL_WEB",), ("LIMW_TX_LINK",)]
+            self._rows = [(link_id, f"https://x.com/a/status/{link_id}") for link_id in claimed]
+        return self
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        # Gives the other claimers a chance to run while this transaction is still open
+        time.sleep(random.uniform(0, 0.002))
+        return self._rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, table: LinkTable):
+        self.table = table
+        self.pending = {}
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.table.end_transaction(self, commit=True)
+
+    def rollback(self):
+        self.table.end_transaction(self, commit=False)
+
+    def close(self):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self, table: LinkTable):
+        self.table = table
+
+    def get_connection(self):
+        return FakeConnection(self.table)
+
+
+def pending_rows(count: int) -> dict:
+    return {link_id: {"status": 1, "worker": None, "lease_expires": 0.0} for link_id in range(1, count + 1)}
+
+
+def test_concurrent_claimers_never_get_the_same_link():
+    table = LinkTable(pending_rows(60))
+    claims = {}
+    start = threading.Barrier(8)
+
+    def claimer(worker: str):
+        repo = SocialMediaRepository(db=FakeDatabase(table))
+        start.wait()
+        claims[worker] = []
+        while True:
+            links = repo.claim_pending_links(worker, limit=3, lease_seconds=600)
+            if not links:
+                break
+            claims[worker].extend(link["LIMW_CD_LINK_MIDIA_SOCIAL_WEB"] for link in links)
+
+    threads = [threading.Thread(target=claimer, args=(f"host:{i}",)) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    claimed = [link_id for ids in claims.values() for link_id in ids]
+    assert len(claimed) == len(set(claimed)), "a link was handed to two workers"
+    assert sorted(claimed) == list(range(1, 61))
+    for worker, ids in claims.items():
+        assert all(table.rows[link_id]["worker"] == worker for link_id in ids)
+
+
+def test_expired_lease_is_claimable_again():
+    rows = pending_rows(3)
+    rows[1].update(status=STATUS_IN_PROGRESS, worker="dead:1", lease_expires=time.monotonic() - 1)
+    rows[2].update(status=STATUS_IN_PROGRESS, worker="alive:2", lease_expires=time.monotonic() + 600)
+    repo = SocialMediaRepository(db=FakeDatabase(LinkTable(rows)))
+
+    links = repo.claim_pending_links("host:1", limit=10, lease_seconds=600)
+
+    assert sorted(link["LIMW_CD_LINK_MIDIA_SOCIAL_WEB"] for link in links) == [1, 3]
+    assert rows[1]["worker"] == "host:1"
+    assert rows[2]["worker"] == "alive:2"
+
+
+def test_retry_columns_are_only_used_when_enabled():
+    repo = SocialMediaRepository(db=FakeDatabase(LinkTable(pending_rows(2))))
+
+    assert len(repo.claim_pending_links("host:1", limit=10)) == 2
+    assert repo.missing_columns(RETRY_COLUMNS) == list(RETRY_COLUMNS)
+
+
+def test_missing_migration_is_an_error_not_an_empty_queue():
+    repo = SocialMediaRepository(db=FakeDatabase(LinkTable(pending_rows(2))), retry_columns=True)
+
+    with pytest.raises(pyodbc.ProgrammingError):
+        repo.claim_pending_links("host:1", limit=10)
+
+
+def test_retry_columns_after_migration():
+    table = LinkTable(pending_rows(2), columns=RETRY_COLUMNS)
+    repo = SocialMediaRepository(db=FakeDatabase(table), retry_columns=True)
+
+    assert repo.missing_columns(RETRY_COLUMNS) == []
+    assert len(repo.claim_pending_links("host:1", limit=10)) == 2
+
+
+def claim_statement(**claim) -> tuple:
+    """The single statement claim_pending_links sends, whitespace collapsed, and its parameters."""
+    table = LinkTable(pending_rows(3))
+    SocialMediaRepository(db=FakeDatabase(table)).claim_pending_links("host:1", **claim)
+    claims = [(q, p) for q, p in table.statements if "COL_LENGTH" not in q]
+    assert len(claims) == 1, "the claim must be a single statement (read and update in one go)"
+    query, params = claims[0]
+    return " ".join(query.split()), params
+
+
+def test_claim_locks_skips_and_updates_in_one_statement():
+    query, _ = claim_statement(limit=5)
+
+    # Reads and locks candidates (skipping rows locked by other claimers) and updates them in the same statement
+    assert re.search(r"WITH candidates AS \( SELECT TOP \(\?\) \* FROM \S+Link_MidiaSocial_Web "
+                     r"WITH \(UPDLOCK, READPAST, ROWLOCK\)", query)
+    assert re.search(r"\) UPDATE candidates SET LIMW_IN_STATUS = \?, LIMW_TX_WORKER = \?, "
+                     r"LIMW_DT_LEASE_EXPIRA = DATEADD\(second, \?, GETDATE\(\)\) OUTPUT inserted\.", query)
+    # The rows handed back are the ones this statement updated
+    assert "OUTPUT inserted.LIMW_CD_LINK_MIDIA_SOCIAL_WEB, inserted.LIMW_TX_LINK," in query
+    assert "SELECT" not in query.split("UPDATE candidates")[1]
+
+
+def test_claim_takes_pending_retries_and_expired_leases_only():
+    query, params = claim_statement(limit=5, lease_seconds=900)
+
+    assert ("WHERE (LIMW_IN_STATUS IN (1, 9) OR (LIMW_IN_STATUS = ? AND LIMW_DT_LEASE_EXPIRA < GETDATE()))"
+            in query)
+    assert params[:2] == [5, STATUS_IN_PROGRESS]
+    assert params[-3:] == [STATUS_IN_PROGRESS, "host:1", 900]
+
+
+def test_claim_of_the_scheduler_picks():
+    query, params = claim_statement(limit=2, link_ids=[7, 3])
+
+    assert "AND LIMW_CD_LINK_MIDIA_SOCIAL_WEB IN (?, ?) ORDER BY LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC )" in query
+    assert params[2:4] == [7, 3]
+
+
+def test_failed_claim_is_rolled_back_and_raised():
+    table = LinkTable(pending_rows(2))
+    repo = SocialMediaRepository(db=FakeDatabase(table), retry_columns=True)
+    rolled_back = []
+    repo.conn.rollback = lambda: rolled_back.append(True)
+
+    with pytest.raises(pyodbc.ProgrammingError):
+        repo.claim_pending_links("host:1", limit=10)
+    assert rolled_back == [True]
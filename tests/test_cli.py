@@ -0,0 +1,15 @@
+import argparse
+
+import pytest
+
+from cli import parse_platform_limits
+
+
+def test_per_platform_caps_are_parsed():
+    assert parse_platform_limits(" Instagram=2, twitter=4 ,facebook=1") == {"instagram": 2, "twitter": 4, "facebook": 1}
+
+
+@pytest.mark.parametrize("raw", ["x=2", "insta=3", "instagram=2,tiktok=1"])
+def test_unknown_platform_is_rejected(raw):
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_platform_limits(raw)
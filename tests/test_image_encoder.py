@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+import pytest
+
+from src.storage.image_encoder import CaptureEncoder
+
+
+def test_webp_is_refused_while_the_captures_go_to_the_adapter():
+    with pytest.raises(ValueError, match="LegacyAdapter"):
+        CaptureEncoder(fmt="webp")
+
+
+def test_unknown_format():
+    with pytest.raises(ValueError, match="Unknown capture format"):
+        CaptureEncoder(fmt="gif", for_adapter=False)
+
+
+def test_defaults_keep_the_spider_png():
+    assert CaptureEncoder().enabled is False
+
+
+def test_jpeg_within_budget(tmp_path):
+    pytest.importorskip("PIL")
+    np = pytest.importorskip("numpy")
+    from PIL import Image
+
+    src = tmp_path / "twitter_1.png"
+    pixels = np.random.default_rng(0).integers(0, 255, (900, 1200, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(src)
+    encoder = CaptureEncoder(fmt="jpeg", max_width=800, max_kb=150, workers=1)
+    try:
+        path = asyncio.run(encoder.encode(str(src), label="Link 1"))
+    finally:
+        encoder.close()
+
+    assert path == str(tmp_path / "twitter_1.jpg")
+    assert not src.exists()
+    with Image.open(path) as image:
+        assert image.format == "JPEG"
+        assert image.width <= 800
+    assert os.path.getsize(path) <= 150 * 1024 or encoder.totals["over_budget"] == 1
@@ -0,0 +1,318 @@
+import asyncio
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from src.scraper.core.network_capture import (PayloadListener, fill_gaps, load_payloads, merge_post, parse_body,
+                                              post_id_from_url, read_post)
+
+FIXTURES = Path(__file__).parent / "fixtures" / "network"
+
+
+def fixture(name: str) -> str:
+    return (FIXTURES / name).read_text(encoding="utf-8")
+
+
+def dom_post(**fields) -> dict:
+    """What extract_post returns for a page that rendered nothing useful, with `fields` on top."""
+    post = {"state": "ok", "ready": True, "author": "", "location": "", "caption": "", "caption_source": "",
+            "published_at": None, "media": None, "dialog": False, "url": "", "ms": 0}
+    post.update(fields)
+    return post
+
+
+class FakeResponse:
+    def __init__(self, url: str, body: str, resource_type: str = "xhr"):
+        self.url = url
+        self.request = SimpleNamespace(resource_type=resource_type)
+        self.body = body
+
+    async def text(self):
+        return self.body
+
+
+class FakePage:
+    """
+    page.on("response")/page.evaluate: responses are served to the listeners by respond(), and
+    evaluate returns the DOM read `dom` (a dict, or a callable of the elapsed seconds).
+    """
+
+    def __init__(self, dom=None):
+        self.dom = dom
+        self.timeouts = []
+        self.handlers = []
+        self.started = time.monotonic()
+
+    def on(self, event, handler):
+        self.handlers.append(handler)
+
+    def remove_listener(self, event, handler):
+        self.handlers.remove(handler)
+
+    def respond(self, url: str, body: str, resource_type: str = "xhr"):
+        for handler in list(self.handlers):
+            handler(FakeResponse(url, body, resource_type))
+
+    async def evaluate(self, script, config):
+        self.timeouts.append(config["timeout"])
+        dom = self.dom(time.monotonic() - self.started) if callable(self.dom) else self.dom
+        return dict(dom)
+
+
+def listen(page: FakePage, platform: str, url: str, record_dir: str = "") -> PayloadListener:
+    listener = PayloadListener(page, platform, url, record_dir)
+    listener.attach()
+    return listener
+
+
+async def settle():
+    """Lets the listener's body-reading tasks run."""
+    for _ in range(3):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.parametrize("platform, url, post_id", [
+    ("instagram", "https://www.instagram.com/p/C8xYz12AbCd/", "C8xYz12AbCd"),
+    ("instagram", "https://www.instagram.com/reel/DA1bC2dEfGh/?igsh=x", "DA1bC2dEfGh"),
+    ("twitter", "https://x.com/defesacivil/status/1790000000000000001", "1790000000000000001"),
+    ("facebook", "https://www.facebook.com/camara/posts/987654321098765", "987654321098765"),
+    ("facebook", "https://www.facebook.com/permalink.php?story_fbid=987654321098765&id=1", "987654321098765"),
+    ("facebook", "https://www.facebook.com/share/p/abcDEF/", None),
+])
+def test_post_id_from_url(platform, url, post_id):
+    assert post_id_from_url(platform, url) == post_id
+
+
+def test_instagram_web_info():
+    post = parse_body("instagram", fixture("instagram_web_info.json"), "C8xYz12AbCd")
+
+    assert post == {
+        "caption": "Nova ciclovia entregue na zona leste 🚲 #mobilidade",
+        "author": "prefeitura.sp",
+        "location": "São Paulo, Brazil",
+        "media": "carousel",
+        "published_at": "2024-05-01T12:00:00+00:00",
+    }
+
+
+def test_instagram_shortcode_media():
+    post = parse_body("instagram", fixture("instagram_shortcode_media.json"), "DA1bC2dEfGh")
+
+    assert post["caption"] == "Chuva forte alaga avenida no centro"
+    assert post["author"] == "jornal.local"
+    assert post["location"] == ""
+    assert post["media"] == "video"
+    assert post["published_at"] == "2024-06-01T12:00:00+00:00"
+
+
+def test_instagram_other_post_is_ignored():
+    assert parse_body("instagram", fixture("instagram_web_info.json"), "OutroPost") is None
+
+
+def test_twitter_long_tweet_comes_from_note_tweet():
+    post = parse_body("twitter", fixture("twitter_tweet_detail.json"), "1790000000000000001")
+
+    assert post["caption"].endswith("Acompanhe as atualizações pelo nosso perfil.")
+    assert "t.co" not in post["caption"]
+    assert post["author"] == "@defesacivil"
+    assert post["media"] == "image"
+    assert post["published_at"] == "2024-05-14T12:00:00+00:00"
+
+
+def test_twitter_reply_in_the_same_payload():
+    post = parse_body("twitter", fixture("twitter_tweet_detail.json"), "1790000000000000002")
+
+    # display_text_range tira a menção inicial e o link t.co da mídia
+    assert post["caption"] == "Aqui já está alagado"
+    assert post["author"] == "@morador123"
+    assert post["media"] == "video"
+
+
+def test_facebook_streamed_graphql_with_prefix():
+    body = fixture("facebook_graphql.json")
+
+    assert len(load_payloads(body)) == 3
+    post = parse_body("facebook", body, "987654321098765")
+    assert post == {
+        "caption": "Sessão extraordinária hoje às 15h, com transmissão ao vivo.",
+        "author": "Câmara Municipal",
+        "location": "",
+        "media": "video",
+        "published_at": "2024-05-06T12:53:20+00:00",
+    }
+
+
+def test_facebook_picks_the_story_of_the_post_id():
+    post = parse_body("facebook", fixture("facebook_graphql.json"), "111111111111111")
+
+    assert post["caption"] == "Post de outra página no feed"
+    assert post["media"] == "image"
+
+
+def test_unparseable_body():
+    assert parse_body("twitter", "<html>rate limited</html>", "1") is None
+
+
+def test_merge_post_keeps_dom_values_for_missing_fields():
+    dom = dom_post(caption="legenda do DOM", caption_source="article h1", author="@dom", location="Recife")
+    network = {"caption": "legenda da API", "author": "", "location": "", "media": "image", "published_at": None}
+
+    merged = merge_post(dom, network)
+
+    assert merged["caption"] == "legenda da API"
+    assert merged["caption_source"] == "network"
+    assert merged["author"] == "@dom"
+    assert merged["location"] == "Recife"
+    assert merged["source"] == "network"
+    assert merge_post(dom, None)["source"] == "dom"
+
+
+def test_fill_gaps_keeps_the_payload_author_and_date():
+    post = merge_post(dom_post(), {"caption": "ok", "author": "Câmara Municipal", "location": "", "media": None,
+                                   "published_at": "2024-05-06T12:53:20+00:00"})
+    later = dom_post(caption="Sessão extraordinária hoje às 15h", caption_source="[role='dialog']",
+                     author="Outro nome", media="video")
+
+    filled = fill_gaps(post, later, min_caption=5)
+
+    assert filled["caption"] == "Sessão extraordinária hoje às 15h"
+    assert filled["caption_source"] == "[role='dialog']"
+    assert filled["author"] == "Câmara Municipal"
+    assert filled["published_at"] == "2024-05-06T12:53:20+00:00"
+    assert filled["media"] == "video"
+
+
+TWEET_URL = "https://x.com/defesacivil/status/1790000000000000001"
+TWEET_DETAIL = "https://x.com/i/api/graphql/abc123/TweetDetail?variables=%7B%7D"
+
+
+def test_listener_parses_the_matching_xhr_of_the_post():
+    async def main():
+        page = FakePage()
+        listener = listen(page, "twitter", TWEET_URL)
+        page.respond("https://x.com/i/api/graphql/abc123/HomeTimeline", fixture("twitter_tweet_detail.json"))
+        page.respond(TWEET_DETAIL, fixture("twitter_tweet_detail.json"), resource_type="document")
+        await settle()
+        assert listener.responses == 0  # Wrong endpoint, and not an xhr/fetch
+        page.respond(TWEET_DETAIL, fixture("twitter_tweet_detail.json"), resource_type="fetch")
+        return await listener.result(1), listener
+
+    post, listener = asyncio.run(main())
+
+    assert listener.responses == 1
+    assert post["author"] == "@defesacivil"
+    assert post["source"] == "network"
+
+
+def test_listener_matches_the_post_id_of_the_page():
+    async def main():
+        reply, other = FakePage(), FakePage()
+        listeners = (listen(reply, "twitter", "https://x.com/morador123/status/1790000000000000002"),
+                     listen(other, "twitter", "https://x.com/someone/status/1111"))
+        for page in (reply, other):
+            page.respond(TWEET_DETAIL, fixture("twitter_tweet_detail.json"))
+        return [await listener.result(0.2) for listener in listeners]
+
+    reply, other = asyncio.run(main())
+
+    assert reply["caption"] == "Aqui já está alagado"
+    assert other is None
+
+
+@pytest.mark.parametrize("platform, url, endpoint, name", [
+    ("instagram", "https://www.instagram.com/p/C8xYz12AbCd/", "https://www.instagram.com/graphql/query",
+     "instagram_web_info.json"),
+    ("instagram", "https://www.instagram.com/reel/DA1bC2dEfGh/", "https://www.instagram.com/api/graphql",
+     "instagram_shortcode_media.json"),
+    ("facebook", "https://www.facebook.com/camara/posts/987654321098765", "https://www.facebook.com/api/graphql/",
+     "facebook_graphql.json"),
+])
+def test_listener_url_patterns(platform, url, endpoint, name, tmp_path):
+    async def main():
+        page = FakePage()
+        listener = listen(page, platform, url, record_dir=str(tmp_path))
+        page.respond(endpoint, fixture(name))
+        post = await listener.result(1)
+        listener.detach()
+        page.respond(endpoint, fixture(name))
+        return post, listener
+
+    post, listener = asyncio.run(main())
+
+    assert post and post["caption"]
+    assert listener.responses == 1  # Detached: the second response is not read
+    assert (tmp_path / f"{platform}_{listener.post_id}_1.json").read_text(encoding="utf-8") == fixture(name)
+
+
+def test_read_post_returns_as_soon_as_the_payload_arrives():
+    async def main():
+        page = FakePage(dom_post(state="empty", ready=False))
+        listener = listen(page, "twitter", TWEET_URL)
+        asyncio.get_running_loop().call_later(0.2, page.respond, TWEET_DETAIL, fixture("twitter_tweet_detail.json"))
+        started = time.monotonic()
+        post = await read_post(page, "twitter", listener, wait=5, timeout=20000)
+        return post, time.monotonic() - started, page
+
+    post, elapsed, page = asyncio.run(main())
+
+    assert elapsed < 1
+    assert set(page.timeouts) == {0}  # The DOM never waited for the post to render
+    assert post["state"] == "ok"
+    assert post["author"] == "@defesacivil"
+
+
+@pytest.mark.parametrize("state", ["not_found", "login_wall", "rate_limited"])
+def test_read_post_does_not_wait_for_a_payload_on_an_error_page(state):
+    async def main():
+        # The error shows up 0.3s after the navigation; no API response ever matches
+        page = FakePage(lambda elapsed: dom_post(state=state if elapsed > 0.3 else "empty", ready=elapsed > 0.3))
+        started = time.monotonic()
+        post = await read_post(page, "twitter", listen(page, "twitter", TWEET_URL), wait=5, timeout=20000)
+        return post, time.monotonic() - started, page
+
+    post, elapsed, page = asyncio.run(main())
+
+    assert post["state"] == state
+    assert elapsed < 1.5
+    assert set(page.timeouts) == {0}
+
+
+def test_read_post_stops_waiting_when_the_dom_shows_the_whole_post():
+    async def main():
+        page = FakePage(dom_post(caption="texto", author="@dom", published_at="2024-05-14T12:00:00+00:00"))
+        started = time.monotonic()
+        post = await read_post(page, "twitter", listen(page, "twitter", TWEET_URL), wait=5, timeout=20000)
+        return post, time.monotonic() - started
+
+    post, elapsed = asyncio.run(main())
+
+    assert elapsed < 1
+    assert (post["caption"], post["source"]) == ("texto", "dom")
+
+
+def test_read_post_waits_for_the_dom_when_fields_are_missing():
+    async def main():
+        page = FakePage(dom_post(state="empty", ready=False))
+        listener = listen(page, "twitter", TWEET_URL)
+        listener.post = {"caption": "texto", "author": "", "location": "", "media": None, "published_at": None}
+        page.dom = dom_post(author="@defesacivil", published_at="2024-05-14T12:00:00+00:00", ready=False)
+        return await read_post(page, "twitter", listener, wait=5, timeout=20000), page
+
+    post, page = asyncio.run(main())
+
+    assert page.timeouts == [0, 20000]
+    assert (post["caption"], post["author"]) == ("texto", "@defesacivil")
+
+
+def test_read_post_without_a_listener_is_the_dom_read():
+    page = FakePage(dom_post(state="not_found", ready=True))
+
+    post = asyncio.run(read_post(page, "facebook", None, wait=5, timeout=30000))
+
+    assert page.timeouts == [30000]
+    assert post["state"] == "not_found"
+    assert post["source"] == "dom"
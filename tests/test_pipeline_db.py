@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+from src.database.repository import SocialMediaRepository
+from src.services.pipeline import ProcessingPipeline
+from src.services.processing_service import SocialMediaProcessor
+
+
+class SlowConnection:
+    """pyodbc-like connection that blocks for `delay` seconds per statement and remembers its thread."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.thread = threading.get_ident()
+        self.used_from = set()
+
+    def cursor(self):
+        return SlowCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SlowCursor:
+    def __init__(self, connection: SlowConnection):
+        self.connection = connection
+        self.description = [("LIMW_CD_LINK_MIDIA_SOCIAL_WEB",), ("LIMW_TX_LINK",)]
+        self.rowcount = 1
+        self._row = None
+
+    def execute(self, query, *params):
+        self.connection.used_from.add(threading.get_ident())
+        if query != "SELECT 1":
+            time.sleep(self.connection.delay)
+        if "WHERE LIMW_CD_LINK_MIDIA_SOCIAL_WEB = ?" in query and "SELECT" in query:
+            link_id = params[0][0]
+            self._row = (link_id, f"https://x.com/a/status/{link_id}")
+        return self
+
+    def fetchone(self):
+        return self._row
+
+    def close(self):
+        pass
+
+
+class SlowDatabase:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.connections = []
+
+    def get_connection(self):
+        self.connections.append(SlowConnection(self.delay))
+        return self.connections[-1]
+
+
+class DbProcessor:
+    """The processor's fetch and status stages over a slow repository; scrape and adapter are instant."""
+
+    fetch_stage = SocialMediaProcessor.fetch_stage
+    status_stage = SocialMediaProcessor.status_stage
+    run_stage = SocialMediaProcessor.run_stage
+    fail = SocialMediaProcessor.fail
+    share_capture = SocialMediaProcessor.share_capture
+    new_job = staticmethod(SocialMediaProcessor.new_job)
+    finish = staticmethod(SocialMediaProcessor.finish)
+
+    def __init__(self, db: SlowDatabase):
+        self.settings = SimpleNamespace(RETRY_SCHEDULING=False)
+        self.repo = SocialMediaRepository(db=db)
+        self.spiders = {"twitter": object()}
+        self.capture_cache = None
+        self.browser_manager = None
+        self.loop_stalls = []
+
+    async def scrape_stage(self, job: dict):
+        job['result'] = {"status": "success"}
+
+    async def adapter_stage(self, job: dict):
+        self.finish(job, 2, success=True)
+
+
+async def watch_loop(processor: DbProcessor, stop: asyncio.Event):
+    """Records how late a 10ms timer fires: a blocking DB call on the loop shows up as a stall."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        processor.loop_stalls.append(time.perf_counter() - started - 0.01)
+
+
+def test_db_calls_run_off_the_event_loop_with_a_connection_per_thread():
+    db = SlowDatabase(delay=0.1)
+    processor = DbProcessor(db)
+    pipeline = ProcessingPipeline(processor, fetch_workers=4, scrape_workers=4, status_workers=4)
+
+    async def main():
+        stop = asyncio.Event()
+        watcher = asyncio.create_task(watch_loop(processor, stop))
+        started = time.perf_counter()
+        outcomes = await pipeline.run(list(range(1, 9)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await watcher
+        return outcomes, elapsed
+
+    outcomes, elapsed = asyncio.run(main())
+
+    assert all(outcomes.values())
+    # 8 reads + 8 status writes of 0.1s each: 1.6s one after the other, about 0.4s with 4+4 workers
+    assert elapsed < 1.0
+    assert max(processor.loop_stalls) < 0.08
+    assert all(len(connection.used_from) <= 1 for connection in db.connections)  # Never shared across threads
+    assert len(db.connections) > 1
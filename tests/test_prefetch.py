@@ -0,0 +1,163 @@
+import asyncio
+from types import SimpleNamespace
+
+from src.services.circuit_breaker import CircuitBreaker, HALF_OPEN
+from src.services.pipeline import ProcessingPipeline
+from src.services.prefetcher import Prefetcher
+from src.services.processing_service import SocialMediaProcessor
+
+
+class FakeSpider:
+    """open_post/scrape_post that only count pages: who opened them and how many are open per platform."""
+
+    def __init__(self, scrape_seconds: float = 0.05):
+        self.scrape_seconds = scrape_seconds
+        self.open_pages = 0
+        self.peak_open_pages = 0
+
+    async def open_post(self, url: str):
+        self.open_pages += 1
+        self.peak_open_pages = max(self.peak_open_pages, self.open_pages)
+        await asyncio.sleep(0.01)
+        return {"url": url, "task": asyncio.current_task()}
+
+    async def close_post(self, opened: dict):
+        self.open_pages -= 1
+
+    async def scrape_post(self, link_data: dict):
+        opened = link_data.get('prefetched') or await self.open_post(link_data['url'])
+        try:
+            await asyncio.sleep(self.scrape_seconds)
+        finally:
+            await self.close_post(opened)
+        return {"status": "success", "same_task": opened["task"] is asyncio.current_task()}
+
+
+class FakeProcessor:
+    """The processor's admission and prefetch logic over in-memory stages."""
+
+    _may_start = SocialMediaProcessor._may_start
+    _prefetch = SocialMediaProcessor._prefetch
+    share_capture = SocialMediaProcessor.share_capture
+    new_job = staticmethod(SocialMediaProcessor.new_job)
+    finish = staticmethod(SocialMediaProcessor.finish)
+
+    def __init__(self, spider: FakeSpider, depth: int, breaker: CircuitBreaker = None):
+        self.settings = SimpleNamespace(QUEUE_LEASES=False)
+        self.spiders = {"instagram": spider}
+        self.breakers = {"instagram": breaker} if breaker else {}
+        self.prefetcher = Prefetcher(self.spiders, depth=depth)
+        self.results = {}
+
+    async def run_stage(self, stage, job: dict):
+        await stage(job)
+
+    async def fetch_stage(self, job: dict):
+        job['platform'] = "instagram"
+        job['canonical_url'] = f"https://www.instagram.com/p/{job['link_id']}/"
+        job['spider_input'] = {"url": job['canonical_url'], "link_id": job['link_id']}
+
+    async def scrape_stage(self, job: dict):
+        opened = await self.prefetcher.take(job)
+        result = await self.spiders[job['platform']].scrape_post(dict(job['spider_input'], prefetched=opened))
+        self.results[job['link_id']] = dict(result, prefetched=opened is not None)
+        job['result'] = result
+
+    async def adapter_stage(self, job: dict):
+        self.finish(job, 2, success=True)
+
+    async def status_stage(self, job: dict):
+        pass
+
+
+def run_batch(processor: FakeProcessor, link_ids, scrape_workers: int, platform_limits: dict = None) -> dict:
+    pipeline = ProcessingPipeline(
+        processor,
+        scrape_workers=scrape_workers,
+        platform_limits=platform_limits,
+        before_scrape=lambda job: processor._may_start(job),
+        prefetch=lambda job: processor._prefetch(job),
+    )
+
+    async def main():
+        outcomes = await pipeline.run(list(link_ids))
+        await processor.prefetcher.clear()
+        return outcomes
+
+    return asyncio.run(main())
+
+
+def test_prefetched_pages_count_against_the_platform_cap():
+    spider = FakeSpider()
+    processor = FakeProcessor(spider, depth=4)
+
+    outcomes = run_batch(processor, range(1, 13), scrape_workers=1, platform_limits={"instagram": 2})
+
+    assert all(outcomes.values())
+    assert processor.prefetcher.stats["prefetched"] > 0
+    assert spider.peak_open_pages <= 2
+    assert spider.open_pages == 0
+
+
+def test_prefetched_page_is_opened_by_the_task_that_scrapes_it():
+    spider = FakeSpider()
+    processor = FakeProcessor(spider, depth=2)
+
+    run_batch(processor, range(1, 9), scrape_workers=1)
+
+    assert processor.prefetcher.stats["used"] > 0
+    assert all(result["same_task"] for result in processor.results.values())
+
+
+def test_half_open_breaker_lets_a_single_probe_through_the_prefetch():
+    breaker = CircuitBreaker("instagram", cooldown=0)
+    breaker.state = HALF_OPEN
+    processor = FakeProcessor(FakeSpider(scrape_seconds=0.2), depth=4, breaker=breaker)
+
+    outcomes = run_batch(processor, range(1, 7), scrape_workers=1)
+
+    started = [link_id for link_id, outcome in outcomes.items() if outcome is not None]
+    assert len(started) == 1  # The others stay pending until the probe reports back
+    assert processor.prefetcher.stats["prefetched"] <= 1
+
+
+class FakeLeases:
+    """renew_lease over an in-memory table: links in `lost` were re-claimed by another worker."""
+
+    def __init__(self, lost=()):
+        self.lost = set(lost)
+        self.renewed = []
+
+    def renew_lease(self, link_id: int, worker_id: str, lease_seconds: int = 600) -> bool:
+        self.renewed.append(link_id)
+        return link_id not in self.lost
+
+
+class SamePostProcessor(FakeProcessor):
+    """Every link is a row of the same post: one scrape, the others follow its capture."""
+
+    def __init__(self, spider: FakeSpider, leases: FakeLeases):
+        super().__init__(spider, depth=0)
+        self.settings = SimpleNamespace(QUEUE_LEASES=True, LEASE_SECONDS=600)
+        self.worker_id = "worker-1"
+        self.repo = leases
+        self.adapted = []
+
+    async def fetch_stage(self, job: dict):
+        await super().fetch_stage(job)
+        job['canonical_url'] = "https://www.instagram.com/p/same/"
+
+    async def adapter_stage(self, job: dict):
+        self.adapted.append(job['link_id'])
+        await super().adapter_stage(job)
+
+
+def test_followers_leases_are_renewed_and_a_lost_one_is_skipped():
+    leases = FakeLeases(lost={3})
+    processor = SamePostProcessor(FakeSpider(scrape_seconds=0.2), leases)
+
+    outcomes = run_batch(processor, range(1, 5), scrape_workers=1)
+
+    assert sorted(set(leases.renewed)) == [1, 2, 3, 4]
+    assert sorted(processor.adapted) == [1, 2, 4]
+    assert outcomes[3] is None  # Left to the worker that holds it now
@@ -0,0 +1,102 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("PIL")
+
+from PIL import Image, ImageDraw
+
+from src.services.quality_gate import QualityGate
+
+
+def save(image: Image.Image, path) -> str:
+    image.save(path)
+    return str(path)
+
+
+def blank(tmp_path, color="white", size=(600, 300)) -> str:
+    return save(Image.new("RGB", size, color), tmp_path / f"blank_{color}.png")
+
+
+def sparse_text(tmp_path) -> str:
+    """A short text post: two lines on a white 600x300 frame."""
+    image = Image.new("RGB", (600, 300), "white")
+    draw = ImageDraw.Draw(image)
+    draw.text((20, 20), "Prefeitura anuncia nova obra na avenida central", fill="black")
+    draw.text((20, 40), "#noticias 12:30", fill="black")
+    return save(image, tmp_path / "sparse_text.png")
+
+
+def photo(tmp_path) -> str:
+    rng = np.random.default_rng(0)
+    pixels = rng.integers(0, 255, (300, 600, 3), dtype=np.uint8)
+    return save(Image.fromarray(pixels), tmp_path / "photo.png")
+
+
+def login_wall(path, shift: int = 0) -> str:
+    """A login-wall-like page: logo bar, centred box with fields and a button."""
+    image = Image.new("RGB", (800, 600), (250, 250, 250))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 800, 60), fill=(255, 255, 255))
+    draw.rectangle((250, 120 + shift, 550, 480 + shift), outline=(200, 200, 200), fill=(255, 255, 255))
+    draw.rectangle((280, 220 + shift, 520, 260 + shift), outline=(180, 180, 180))
+    draw.rectangle((280, 280 + shift, 520, 320 + shift), outline=(180, 180, 180))
+    draw.rectangle((280, 350 + shift, 520, 390 + shift), fill=(0, 149, 246))
+    draw.text((330, 160 + shift), "Log in to see this post", fill="black")
+    return save(image, path)
+
+
+@pytest.mark.parametrize("color", ["white", "black"])
+def test_blank_frame_is_rejected(tmp_path, color):
+    verdict = QualityGate(refs_dir=str(tmp_path / "refs")).check(blank(tmp_path, color), "twitter")
+
+    assert verdict["ok"] is False
+    assert verdict["reason"].startswith("blank frame")
+
+
+def test_spinner_on_blank_page_is_rejected(tmp_path):
+    image = Image.new("RGB", (600, 300), "white")
+    ImageDraw.Draw(image).ellipse((290, 140, 310, 160), outline=(200, 200, 200))
+
+    verdict = QualityGate(refs_dir=str(tmp_path / "refs")).check(save(image, tmp_path / "spinner.png"), "twitter")
+
+    assert verdict["ok"] is False
+
+
+def test_sparse_text_post_passes(tmp_path):
+    verdict = QualityGate(refs_dir=str(tmp_path / "refs")).check(sparse_text(tmp_path), "twitter")
+
+    assert verdict["ok"] is True, verdict["reason"]
+
+
+def test_photo_passes(tmp_path):
+    verdict = QualityGate(refs_dir=str(tmp_path / "refs")).check(photo(tmp_path), "instagram")
+
+    assert verdict["ok"] is True, verdict["reason"]
+
+
+def test_known_bad_reference_is_rejected(tmp_path):
+    refs = tmp_path / "refs" / "instagram"
+    refs.mkdir(parents=True)
+    login_wall(refs / "login_wall.png")
+    gate = QualityGate(refs_dir=str(tmp_path / "refs"))
+
+    # Mesma tela, com a caixa alguns pixels abaixo e regravada em JPEG
+    capture = login_wall(tmp_path / "capture.png", shift=6)
+    Image.open(capture).convert("RGB").save(tmp_path / "capture.jpg", quality=70)
+    verdict = gate.check(str(tmp_path / "capture.jpg"), "instagram")
+
+    assert verdict["ok"] is False
+    assert verdict["match"] == "instagram/login_wall.png"
+    assert "looks like" in verdict["reason"]
+
+
+def test_references_of_another_platform_do_not_match(tmp_path):
+    refs = tmp_path / "refs" / "instagram"
+    refs.mkdir(parents=True)
+    login_wall(refs / "login_wall.png")
+    gate = QualityGate(refs_dir=str(tmp_path / "refs"))
+
+    verdict = gate.check(login_wall(tmp_path / "capture.png"), "twitter")
+
+    assert verdict["ok"] is True
+    assert verdict["match"] is None
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from src.scraper.core.request_policy import BLOCKED_BY_CLIENT, RequestPolicy, RequestStats
+
+
+class FakeSession:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, method, params=None):
+        self.sent.append((method, params))
+
+
+class FakeContext:
+    def __init__(self):
+        self.handlers = {}
+        self.routes = []
+        self.sessions = []
+
+    def on(self, event, handler):
+        self.handlers[event] = handler
+
+    async def route(self, url, handler):
+        self.routes.append(url)
+
+    async def new_cdp_session(self, page):
+        self.sessions.append(FakeSession())
+        return self.sessions[-1]
+
+
+def install(**options) -> tuple:
+    stats = RequestStats()
+    policy = RequestPolicy("twitter", stats, **options)
+    context = FakeContext()
+    page = SimpleNamespace(context=context)
+
+    async def main():
+        await policy.install(context)
+        await policy.prepare_page(page)
+
+    asyncio.run(main())
+    return policy, context, stats
+
+
+def failed(url: str, failure: str, resource_type: str = "xhr"):
+    return SimpleNamespace(url=url, failure=failure, resource_type=resource_type)
+
+
+def test_url_rules_go_to_chromium_without_routing():
+    policy, context, _ = install()
+
+    assert context.routes == []  # No interception: the context keeps its HTTP cache
+    method, params = context.sessions[0].sent[-1]
+    assert method == "Network.setBlockedURLs"
+    assert "*/live_pipeline/*" in params["urls"]
+    assert "*google-analytics.com*" in params["urls"]
+
+
+def test_intercept_adds_the_routed_rules():
+    policy, context, _ = install(intercept=True)
+
+    assert context.routes == ["**/*"]
+    assert {rule["name"] for rule in policy.rules} >= {"third_party", "prefetch", "media_segments"}
+
+
+def test_policy_off_blocks_nothing_but_still_counts():
+    _, context, _ = install(enabled=False, intercept=True)
+
+    assert context.routes == []
+    assert context.sessions == []
+    assert set(context.handlers) == {"response", "requestfailed"}
+
+
+def test_skipped_rules_are_not_sent():
+    policy, context, _ = install(skip_rules=["analytics"])
+
+    assert context.sessions[0].sent[-1][1]["urls"] == ["*/live_pipeline/*", "*/1.1/promoted_content/*"]
+
+
+def test_blocked_requests_are_counted_per_rule():
+    _, context, stats = install()
+    on_failed = context.handlers["requestfailed"]
+
+    on_failed(failed("https://x.com/i/api/1.1/jot/client_event.json", BLOCKED_BY_CLIENT))
+    on_failed(failed("https://www.google-analytics.com/g/collect?v=2", BLOCKED_BY_CLIENT, "ping"))
+    on_failed(failed("https://api.x.com/live_pipeline/events", BLOCKED_BY_CLIENT))
+    on_failed(failed("https://api.x.com/live_pipeline/events", "net::ERR_ABORTED"))
+
+    blocked = stats.snapshot()["blocked"]
+    assert blocked["twitter/analytics"]["hits"] == 2
+    assert blocked["twitter/twitter_live_pipeline"]["hits"] == 1
+    assert stats.totals()["blocked"] == 3
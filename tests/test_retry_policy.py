@@ -0,0 +1,82 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.processing_service import SocialMediaProcessor
+from src.services.retry_policy import PERMANENT, TRANSIENT, PermanentError, classify_error
+
+
+@pytest.mark.parametrize("error", [
+    PermanentError("Could not detect platform from URL: ftp://x"),
+    "Post not found (404)",
+    "Tweet or account not found (404)",
+    "Page.goto: net::ERR_NAME_NOT_RESOLVED at https://www.instagrm.com/p/abc/",
+])
+def test_permanent(error):
+    assert classify_error(error) == PERMANENT
+
+
+@pytest.mark.parametrize("error", [
+    'Page.goto: Timeout 90000ms exceeded.\nCall log:\n  - navigating to "https://x.com/u/status/1794046123456789012"',
+    "Timeout aguardando https://www.instagram.com/p/C404xYz/",
+    "LegacyAdapter failed (exit code 404, timed out: False)",
+    "Capture rejected by quality gate (blank frame)",
+])
+def test_digits_404_in_a_transient_error_are_not_a_404(error):
+    assert classify_error(error) == TRANSIENT
+
+
+class FlakyProcessor:
+    """The processor's fail/run_stage with a stage that fails `failures` times before succeeding."""
+
+    def __init__(self, failures: int, retry_scheduling: bool = False, inline_attempts: int = 3):
+        self.fail = SocialMediaProcessor.fail.__get__(self)
+        self.run_stage = SocialMediaProcessor.run_stage.__get__(self)
+        self.finish = SocialMediaProcessor.finish
+        self.job = SocialMediaProcessor.new_job(1)
+        self.settings = SimpleNamespace(
+            RETRY_SCHEDULING=retry_scheduling, RETRY_MAX_ATTEMPTS=5, RETRY_BASE_DELAY=60, RETRY_MAX_DELAY=3600,
+            RETRY_INLINE_ATTEMPTS=inline_attempts, RETRY_INLINE_DELAY=0, RETRY_INLINE_MAX_DELAY=0,
+        )
+        self.failures = failures
+        self.calls = 0
+
+    async def stage(self, job: dict):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise TimeoutError("Page.goto: Timeout 90000ms exceeded (https://x.com/u/status/1794046123456789012)")
+        self.finish(job, 2, success=True)
+
+    def run(self) -> dict:
+        asyncio.run(self.run_stage(self.stage, self.job))
+        return self.job
+
+
+def test_transient_failure_is_retried_in_line_without_scheduling():
+    processor = FlakyProcessor(failures=2)
+
+    job = processor.run()
+
+    assert processor.calls == 3
+    assert (job['status'], job['success']) == (2, True)
+
+
+def test_in_line_retries_are_bounded():
+    processor = FlakyProcessor(failures=10, inline_attempts=3)
+
+    job = processor.run()
+
+    assert processor.calls == 3
+    assert job['status'] == 3
+    assert job['retry_delay'] is None
+
+
+def test_scheduled_retry_does_not_retry_in_line():
+    processor = FlakyProcessor(failures=1, retry_scheduling=True)
+
+    job = processor.run()
+
+    assert processor.calls == 1
+    assert job['status'] == 9
+    assert job['retry_delay'] > 0
@@ -0,0 +1,103 @@
+import re
+import sqlite3
+from datetime import datetime, timedelta
+
+from src.database.repository import SocialMediaRepository
+from src.services.scheduler import FairShareScheduler
+
+
+class SqliteDatabase:
+    """Link_MidiaSocial_Web in SQLite, answering the repository's T-SQL after a few dialect rewrites."""
+
+    def __init__(self, rows: list):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.execute(
+            "CREATE TABLE Link_MidiaSocial_Web (LIMW_CD_LINK_MIDIA_SOCIAL_WEB INTEGER PRIMARY KEY, LIMW_TX_LINK TEXT,"
+            " VEIC_CD_VEICULO INTEGER, CANA_CD_CANAL INTEGER, CLIE_CD_CLIENTE INTEGER, LIMW_DT_DATA_PUBLICAÇÃO TEXT,"
+            " LIMW_IN_STATUS INTEGER, MATE_CD_MATERIA INTEGER)"
+        )
+        self.conn.executemany("INSERT INTO Link_MidiaSocial_Web VALUES (?, ?, NULL, NULL, ?, ?, ?, NULL)", rows)
+        self.queries = []
+
+    def get_connection(self):
+        return self
+
+    def cursor(self):
+        return SqliteCursor(self)
+
+
+class SqliteCursor:
+    def __init__(self, db: SqliteDatabase):
+        self.db = db
+        self.cursor = db.conn.cursor()
+
+    def execute(self, query, params=()):
+        self.db.queries.append(query)
+        params = list(params)
+        query = query.replace("TopClipPreProducao.dbo.", "")
+        query = query.replace("DATEADD(day, -15, GETDATE())", "datetime('now', '-15 days')")
+        query = query.replace("GETDATE()", "datetime('now')")
+        if "TOP (?)" in query:
+            # SELECT TOP (?) ... -> ... LIMIT ? (the TOP parameter is always the first one)
+            query = query.replace("TOP (?) ", "", 1) + " LIMIT ?"
+            params = params[1:] + params[:1]
+        self.cursor.execute(query, params)
+        self.description = self.cursor.description
+        return self
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        self.cursor.close()
+
+
+def backlog(dominant: int = 2000, others: int = 5) -> list:
+    """Client 1 dumped `dominant` links after clients 2 and 3 sent `others` each (so theirs have lower IDs)."""
+    published = (datetime.now() - timedelta(hours=2)).strftime("%Y-%m-%d %H:%M:%S")
+    rows = []
+    for client in (2, 3):
+        for _ in range(others):
+            rows.append((len(rows) + 1, f"https://x.com/c{client}/status/{len(rows) + 1}", client, published, 1))
+    for _ in range(dominant):
+        rows.append((len(rows) + 1, f"https://www.instagram.com/p/P{len(rows) + 1}/", 1, published, 1))
+    return rows
+
+
+def clients(links: list) -> dict:
+    counts = {}
+    for link in links:
+        counts[link['CLIE_CD_CLIENTE']] = counts.get(link['CLIE_CD_CLIENTE'], 0) + 1
+    return counts
+
+
+def test_dominant_client_does_not_fill_the_candidate_window():
+    repo = SocialMediaRepository(db=SqliteDatabase(backlog()))
+
+    candidates = repo.get_pending_links(limit=50, per_client=10)
+
+    assert clients(candidates) == {1: 10, 2: 5, 3: 5}
+    assert re.search(r"PARTITION BY CLIE_CD_CLIENTE\s+ORDER BY LIMW_CD_LINK_MIDIA_SOCIAL_WEB DESC", repo._db.queries[-1])
+
+
+def test_global_window_is_what_the_per_client_window_fixes():
+    repo = SocialMediaRepository(db=SqliteDatabase(backlog()))
+
+    assert clients(repo.get_pending_links(limit=50)) == {1: 50}
+
+
+def test_scheduler_shares_the_batch_with_the_small_clients():
+    repo = SocialMediaRepository(db=SqliteDatabase(backlog()))
+    candidates = repo.get_pending_links(limit=50, per_client=10)
+
+    batch = FairShareScheduler().select(candidates, 9)
+
+    assert clients(batch) == {1: 3, 2: 3, 3: 3}
+
+
+def test_client_weights():
+    candidates = SocialMediaRepository(db=SqliteDatabase(backlog())).get_pending_links(limit=50, per_client=10)
+
+    batch = FairShareScheduler(client_weights={"1": 2}).select(candidates, 8)
+
+    assert clients(batch) == {1: 4, 2: 2, 3: 2}
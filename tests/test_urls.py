@@ -0,0 +1,18 @@
+import pytest
+
+from src.scraper.core.urls import canonical_url
+
+
+@pytest.mark.parametrize("url", [
+    "https://twitter.com/DefesaCivil/status/1790000000000000001",
+    "https://x.com/defesacivil/status/1790000000000000001/photo/1?s=20",
+    "https://mobile.x.com/DefesaCivil/statuses/1790000000000000001",
+    "https://x.com/i/web/status/1790000000000000001",
+    "x.com/i/status/1790000000000000001#m",
+])
+def test_x_status_links_collapse_to_the_id(url):
+    assert canonical_url(url) == "https://x.com/i/web/status/1790000000000000001"
+
+
+def test_x_profile_is_left_alone():
+    assert canonical_url("https://twitter.com/DefesaCivil") == "https://x.com/DefesaCivil"